@@ -0,0 +1,69 @@
+"""
+Benchmark: rows/sec of reading a csv file of synthetic tweets (as written by TweetAnalyzer.write_to_csv),
+pandas.read_csv followed by compact_schema vs. the typed reader of TweetAnalyzer.read_from_csv and the chunked TweetAnalyzer.iter_csv.
+
+    $ python benchmarks/bench_read_csv.py --tweets 1000000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from yatclient import TweetAnalyzer
+from yatclient.mock_api import synthetic_tweet
+from yatclient.schema import compact_schema
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tweets", type = int, default = 1000000)
+    parser.add_argument("--accounts", type = int, default = 50)
+    parser.add_argument("--chunksize", type = int, default = 100000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    start = datetime(2019, 1, 1)
+    payloads = [synthetic_tweet("account%d" % rng.randrange(args.accounts), start + timedelta(seconds = 30 * i),
+                                retweet = rng.random() < 0.2, rng = rng) for i in range(args.tweets)]
+    analyzer = TweetAnalyzer()
+    analyzer.df = analyzer.json_to_dataframe(payloads)
+    del payloads
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "tweets.csv")
+        analyzer.write_to_csv(path)
+        print("%.0f MB csv" % (os.path.getsize(path) / 1024 ** 2))
+
+        def legacy():
+            return compact_schema(pd.read_csv(path, index_col = 0))
+
+        def typed():
+            reader = TweetAnalyzer()
+            reader.read_from_csv(path)
+            return reader.df
+
+        def chunked():
+            # a streaming aggregation: the likes per account, chunk by chunk
+            rows, likes = 0, {}
+            for chunk in TweetAnalyzer().iter_csv(path, chunksize = args.chunksize):
+                rows += len(chunk.df)
+                for account, total in chunk.df.groupby("author", observed = True).likes.sum().items():
+                    likes[account] = likes.get(account, 0) + total
+            return rows
+
+        print("%-40s %10s %14s" % ("reader", "seconds", "rows/sec"))
+        for name, function in [("pandas.read_csv + compact_schema", legacy), ("read_from_csv (typed)", typed),
+                               ("iter_csv (chunked, likes per account)", chunked)]:
+            start = time.perf_counter()
+            result = function()
+            seconds = time.perf_counter() - start
+            rows = result if isinstance(result, int) else len(result)
+            print("%-40s %9.2fs %14.0f" % (name, seconds, rows / seconds))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Benchmark: wall-clock time of TwitterClient.get_user_timeline_tweets for a growing number of accounts,
+sequential (workers = 1) vs. concurrent (workers = number of accounts).
+With --lean the lean fetch mode is measured and checked to fetch the same tweets as the normal one, with --client-filter
+(retweets filtered out by the client instead of twitter, server_filter = False) also with no more requests.
+
+The twitter API is replaced by the local MockTwitterServer (see yatclient.mock_api), so no credentials are needed:
+
+    $ python benchmarks/bench_timeline_fetch.py --latency 0.2 --tweets 600
+    $ python benchmarks/bench_timeline_fetch.py --latency 0.05 --rate-limit 20 --window 5 --lean --client-filter
+"""
+import argparse
+import time
+
+from yatclient import TwitterClient
+from yatclient.mock_api import MockTwitterAPI, MockTwitterServer, synthetic_fixtures
+from yatclient.twitter_client import RateLimitScheduler
+
+
+def run(fixtures, accounts, workers, args, lean):
+    # a fresh server per run, so every run starts with a full rate limit window
+    with MockTwitterServer(fixtures, latency = args.latency, rate_limit = args.rate_limit, window = args.window) as server:
+        scheduler = RateLimitScheduler(burst = 10**6 if args.rate_limit is None else 1)
+        client = TwitterClient(None, None, None, None, accounts, scheduler = scheduler, api = MockTwitterAPI(server.url))
+        start = time.perf_counter()
+        tweets = client.get_user_timeline_tweets(start_date = "2019-05-01", end_date = "2019-06-01", workers = workers, lean = lean,
+                                                 server_filter = not args.client_filter)
+        return time.perf_counter() - start, len(tweets), sum(server.requests.values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type = float, default = 0.1, help = "seconds per request")
+    parser.add_argument("--tweets", type = int, default = 600, help = "tweets per account timeline")
+    parser.add_argument("--accounts", type = int, nargs = "+", default = [1, 3, 9, 27])
+    parser.add_argument("--rate-limit", type = int, default = None, help = "requests per window, default: no rate limit")
+    parser.add_argument("--window", type = float, default = 900, help = "seconds per rate limit window")
+    parser.add_argument("--lean", action = "store_true", help = "fetch in the lean mode (and check it fetches the same tweets as the normal one)")
+    parser.add_argument("--client-filter", action = "store_true",
+                        help = "filter the retweets out in the client (and check the lean mode sends no more requests than the normal one)")
+    args = parser.parse_args()
+
+    names = ["account%d" % i for i in range(max(args.accounts))]
+    fixtures = synthetic_fixtures(names, tweets_per_account = args.tweets)
+    print("%8s %12s %12s %8s %8s %9s" % ("accounts", "sequential", "concurrent", "speedup", "tweets", "requests"))
+    for n in args.accounts:
+        t_seq, count, _ = run(fixtures, names[:n], 1, args, args.lean)
+        t_con, _, requests = run(fixtures, names[:n], n, args, args.lean)
+        print("%8d %11.2fs %11.2fs %7.1fx %8d %9d" % (n, t_seq, t_con, t_seq / t_con, count, requests))
+        if args.lean:
+            _, normal_count, normal_requests = run(fixtures, names[:n], n, args, False)
+            assert count == normal_count, "lean mode fetched %d tweets, the normal one %d" % (count, normal_count)
+            assert not args.client_filter or requests <= normal_requests, "lean mode sent %d requests, the normal one %d" % (requests, normal_requests)
+
+
+if __name__ == "__main__":
+    main()
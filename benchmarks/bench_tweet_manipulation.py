@@ -0,0 +1,85 @@
+"""
+Benchmark: seconds per million tweets of TweetAnalyzer.tweet_manipulation,
+the former one pass per option (pandas str.replace) vs. the compiled pipeline of yatclient.cleaning.
+The tweets are synthetic ones or the ones of a csv file (--csv), repeated to --tweets.
+
+    $ python benchmarks/bench_tweet_manipulation.py --tweets 1000000
+    $ python benchmarks/bench_tweet_manipulation.py --csv tweets2019-07-05_h12.43.csv
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from yatclient import TweetAnalyzer
+from yatclient.cleaning import URL_PATTERN, cleaning_pipeline
+from yatclient.mock_api import synthetic_tweet
+from yatclient.schema import TEXT_DTYPE
+
+OPTIONS = [("default (html)", dict(delete_htmlent = True)),
+           ("html, hyperlinks", dict(delete_htmlent = True, delete_hyperlinks = True)),
+           ("all options", dict(delete_htmlent = True, delete_hyperlinks = True, delete_numbers = True, delete_hashtags = True,
+                                only_small_letters = True, delete_diamonds_from_hashtags = True, delete_accountlinks = True,
+                                delete_at_from_accountlinks = True))]
+
+
+def legacy_tweet_manipulation(tweets, delete_htmlent = True, delete_hyperlinks = False, delete_numbers = False, delete_hashtags = False,
+                              only_small_letters = False, delete_diamonds_from_hashtags = False, delete_accountlinks = False,
+                              delete_at_from_accountlinks = False):
+    # one str.replace per option, as tweet_manipulation did before yatclient.cleaning
+    if delete_htmlent:
+        tweets = tweets.str.replace('<[^<]+?>', '', regex = True)
+        tweets = tweets.str.replace("&amp;+|&lt;+|&gt;+|&quot;+|&apos;+", '', regex = True)
+    if delete_hyperlinks:
+        tweets = tweets.str.replace(URL_PATTERN, " ", regex = True)
+    if delete_numbers:
+        tweets = tweets.str.replace('[0-9]+', '', regex = True)
+    if delete_hashtags:
+        tweets = tweets.str.replace(r'#\S+\s*', '', regex = True)
+    if only_small_letters:
+        tweets = tweets.str.lower()
+    if delete_diamonds_from_hashtags:
+        tweets = tweets.str.replace('#+', '', regex = True)
+    if delete_accountlinks:
+        tweets = tweets.str.replace(r'@\S+\s*', '', regex = True)
+    if delete_at_from_accountlinks:
+        tweets = tweets.str.replace('@+', '', regex = True)
+    return tweets
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tweets", type = int, default = 1000000)
+    parser.add_argument("--csv", default = None, help = "take the tweets of this csv file (written by TweetAnalyzer.write_to_csv)")
+    args = parser.parse_args()
+
+    if args.csv:
+        analyzer = TweetAnalyzer()
+        analyzer.read_from_csv(args.csv)
+        texts = analyzer.df.tweets.tolist()
+    else:
+        rng = random.Random(0)
+        start = datetime(2019, 1, 1)
+        texts = [synthetic_tweet("account%d" % rng.randrange(50), start + timedelta(seconds = 30 * i), rng = rng)["full_text"]
+                 for i in range(min(args.tweets, 100000))]
+    tweets = pd.Series((texts * (args.tweets // len(texts) + 1))[:args.tweets], dtype = TEXT_DTYPE)
+
+    print("%-20s %8s %16s %16s %8s %10s" % ("options", "passes", "legacy s/1M", "pipeline s/1M", "speedup", "differing"))
+    for name, options in OPTIONS:
+        start = time.perf_counter()
+        expected = legacy_tweet_manipulation(tweets, **options)
+        legacy = time.perf_counter() - start
+        pipeline = cleaning_pipeline(**options)
+        start = time.perf_counter()
+        cleaned = pipeline.clean_series(tweets)
+        fused = time.perf_counter() - start
+        differing = int((cleaned != expected).sum())
+        per_million = 1e6 / len(tweets)
+        print("%-20s %8d %15.2fs %15.2fs %7.1fx %10d" % (name, len(pipeline.passes), legacy * per_million, fused * per_million,
+                                                        legacy / fused, differing))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Benchmark: rows/sec of building the TweetAnalyzer dataframe from synthetic tweets,
+the former row by row conversion of tweepy Status objects vs. TweetAnalyzer.tweets_to_dataframe and TweetAnalyzer.json_to_dataframe.
+
+    $ python benchmarks/bench_tweets_to_dataframe.py --tweets 1000000
+"""
+import argparse
+import gc
+import random
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+import tweepy
+
+from yatclient import TweetAnalyzer
+from yatclient.mock_api import synthetic_tweet
+
+
+def legacy_tweets_to_dataframe(tweets):
+    # the conversion tweets_to_dataframe did before it was routed through json_to_dataframe
+    L = []
+    for tweet in tweets:
+        L.append([tweet.full_text, tweet.user.screen_name, tweet.created_at,
+                                tweet.retweeted_status.favorite_count if hasattr(tweet, 'retweeted_status') else tweet.favorite_count,
+                                tweet.retweet_count,
+                                ", ".join([hashtag_item['text'] for hashtag_item in tweet.entities['hashtags'] if tweet.entities["hashtags"]]),
+                                ", ".join([mention["screen_name"] for mention in tweet.entities['user_mentions'] if tweet.entities["user_mentions"]]),
+                                ", ".join([link['url'] for link in tweet.entities['urls'] if tweet.entities["urls"]]),
+                                tweet.id,
+                                "retweet" if hasattr(tweet, 'retweeted_status') else "tweet"
+                                ])
+    return (pd.DataFrame(L, columns = ["tweets", "author", "date", "likes", "retweets", "hashtags", "linked_accounts", "urls", "id", "tweet_type"]))
+
+
+def timed(function, *args):
+    # the millions of objects alive make every cyclic garbage collection expensive, it would blur the comparison
+    gc.collect()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        df = function(*args)
+        return time.perf_counter() - start, df
+    finally:
+        gc.enable()
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tweets", type = int, default = 1000000)
+    parser.add_argument("--accounts", type = int, default = 50)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    start = datetime(2019, 1, 1)
+    payloads = [synthetic_tweet("account%d" % rng.randrange(args.accounts), start + timedelta(seconds = 30 * i),
+                                retweet = rng.random() < 0.2, rng = rng) for i in range(args.tweets)]
+    statuses = tweepy.models.Status.parse_list(None, payloads)
+
+    analyzer = TweetAnalyzer()
+    print("%-40s %10s %14s %10s" % ("conversion", "seconds", "rows/sec", "memory"))
+    for name, function, data in [("legacy rows (json -> Status -> rows)", lambda p: legacy_tweets_to_dataframe(tweepy.models.Status.parse_list(None, p)), payloads),
+                                 ("legacy rows (Status)", legacy_tweets_to_dataframe, statuses),
+                                 ("tweets_to_dataframe (Status)", analyzer.tweets_to_dataframe, statuses),
+                                 ("json_to_dataframe (json payloads)", analyzer.json_to_dataframe, payloads)]:
+        seconds, df = timed(function, data)
+        megabytes = df.memory_usage(deep = True).sum() / 1024 ** 2
+        print("%-40s %9.2fs %14.0f %8.0fMB" % (name, seconds, len(df) / seconds, megabytes))
+
+
+if __name__ == "__main__":
+    main()
@@ -22,8 +22,8 @@ VERSION = '0.1.0'
 
 # What packages are required for this module to be executed?
 REQUIRED = [
-    'matplotlib','numpy','tweepy','pandas','scikit-learn','wordcloud',
-    # 'nltk',,'scipy','seaborn','Bokeh',
+    'matplotlib','numpy','tweepy','pandas','pyarrow','scipy','wordcloud','requests',
+    # 'nltk','seaborn','Bokeh',
 ]
 
 # What packages are optional?
@@ -0,0 +1,15 @@
+import os
+
+import pytest
+
+from yatclient import TweetAnalyzer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TWEETS_CSV = os.path.join(ROOT, "tweets2019-07-05_h12.43.csv")
+
+
+@pytest.fixture
+def tweet_analyzer():
+    tweet_analyzer = TweetAnalyzer()
+    tweet_analyzer.read_from_csv(TWEETS_CSV)
+    return tweet_analyzer
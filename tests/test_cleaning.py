@@ -0,0 +1,46 @@
+import re
+
+import pytest
+
+from yatclient.cleaning import OPTIONS, URL_PATTERN, cleaning_pipeline, text_array
+
+# the cleaning of tweet_manipulation before it was compiled to a pipeline: one re.sub after the other
+SEQUENTIAL = [("delete_htmlent", "<[^<]+?>", ""),
+              ("delete_htmlent", "&amp;+|&lt;+|&gt;+|&quot;+|&apos;+", ""),
+              ("delete_hyperlinks", URL_PATTERN, " "),
+              ("delete_numbers", "[0-9]+", ""),
+              ("delete_hashtags", r"#\S+\s*", ""),
+              ("only_small_letters", None, None),
+              ("delete_diamonds_from_hashtags", "#+", ""),
+              ("delete_accountlinks", r"@\S+\s*", ""),
+              ("delete_at_from_accountlinks", "@+", "")]
+
+
+def sequential(text, options):
+    for option, pattern, replacement in SEQUENTIAL:
+        if options.get(option):
+            text = text.lower() if pattern is None else re.sub(pattern, replacement, text)
+    return text
+
+
+COMBINATIONS = [dict.fromkeys(OPTIONS, True), dict(delete_hashtags = True, delete_accountlinks = True),
+                dict(delete_htmlent = True, delete_hyperlinks = True, delete_numbers = True),
+                dict(delete_numbers = True, delete_hashtags = True, delete_accountlinks = True, only_small_letters = True)]
+
+
+@pytest.mark.parametrize("options", COMBINATIONS, ids = lambda options: "+".join(options))
+def test_pipeline_matches_sequential_substitutions(tweet_analyzer, options):
+    texts = tweet_analyzer.df.tweets.tolist()
+    pipeline = cleaning_pipeline(**options)
+    cleaned = pipeline.clean_array(text_array(tweet_analyzer.df.tweets)).to_pylist()
+    assert [i for i, (text, result) in enumerate(zip(texts, cleaned)) if result != sequential(text, options)] == []
+    assert [pipeline.clean_text(text) for text in texts[:200]] == cleaned[:200]
+
+
+@pytest.mark.parametrize("text", ["RT @ju_name: 35 Jahre", "@ZDF-#TVDuell gezeigt", "#klima jetzt @spdde heute",
+                                  "⁦@cdu⁩ #wahl morgen", "#ard @zdf　heute", "&am<b>p; <i>x</i> 100%"])
+def test_pipeline_matches_sequential_substitutions_on_unicode_spaces(text):
+    options = dict.fromkeys(OPTIONS, True)
+    assert cleaning_pipeline(**options).clean_text(text) == sequential(text, options)
+    for option in OPTIONS:
+        assert cleaning_pipeline(**{option: True}).clean_text(text) == sequential(text, {option: True})
@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+from yatclient.cleaning import STOPWORDS_DE, WORD_CLEANING, cleaning_pipeline, text_array, tokenize
+from yatclient.corpus import Corpus
+
+
+def fresh_corpus(df):
+    # the corpus of the tweets tokenized on their own
+    return Corpus.from_tokens(tokenize(cleaning_pipeline(**WORD_CLEANING).clean_array(text_array(df.tweets))))
+
+
+@pytest.mark.parametrize("rows", [slice(100, 900), "mask", "positions"])
+def test_take_counts_like_fresh_tokenization(tweet_analyzer, rows):
+    df = tweet_analyzer.df
+    if rows == "mask":
+        rows = (df.author == "CDU").to_numpy()
+    elif rows == "positions":
+        rows = np.random.default_rng(0).choice(len(df), 500, replace = False)
+    corpus = tweet_analyzer.get_corpus().take(rows)
+    expected = fresh_corpus(df.iloc[rows])
+    assert len(corpus) == len(expected)
+    assert corpus.counts(STOPWORDS_DE).equals(expected.counts(STOPWORDS_DE))
+    matrix, words = corpus.matrix()
+    expected_matrix, expected_words = expected.matrix()
+    assert (words == expected_words).all() and (matrix != expected_matrix).nnz == 0
+
+
+def test_corpus_of_filtered_analyzer(tweet_analyzer):
+    filtered = tweet_analyzer.tweet_filter_hashtags(["Europawahl"]).tweet_filter_likes(5)
+    assert 0 < len(filtered.df) < len(tweet_analyzer.df)
+    assert filtered.get_corpus().counts().equals(fresh_corpus(filtered.df).counts())
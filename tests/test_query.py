@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+from yatclient.query import AuthorCondition, Condition, DateCondition, EntityCondition
+
+CONDITIONS = [EntityCondition("hashtags", ["Europawahl", "EUWahl"]),
+              EntityCondition("linked_accounts", ["katarinabarley", "ZDF"], all_in_one = True),
+              AuthorCondition(["spdde", "dieLinke"]),
+              DateCondition("2019-05-20", "2019-05-27")]
+
+
+def test_condition_is_abstract():
+    with pytest.raises(TypeError):
+        Condition()
+
+
+@pytest.mark.parametrize("condition", CONDITIONS, ids = lambda condition: condition.describe())
+def test_mask_of_indexed_conditions(tweet_analyzer, condition):
+    rows = np.arange(0, len(tweet_analyzer.df), 3)
+    positions = condition.positions(tweet_analyzer)
+    assert len(positions)
+    np.testing.assert_array_equal(rows[condition.mask(tweet_analyzer, rows)], np.intersect1d(rows, positions))
+    assert 0 < condition.selectivity(tweet_analyzer) < 1
+
+
+def test_query_matches_filters(tweet_analyzer):
+    result = tweet_analyzer.query("(author == 'spdde' or has_hashtag('Europawahl')) and likes >= 10")
+    expected = tweet_analyzer.df[((tweet_analyzer.df.author == "spdde") | tweet_analyzer.df.index.isin(
+        tweet_analyzer.tweet_filter_hashtags(["Europawahl"], reset_drop_index = False).df.index)) & (tweet_analyzer.df.likes >= 10)]
+    assert result.df.id.tolist() == expected.id.tolist()
+
+
+def test_plan_repr_lists_the_conditions(tweet_analyzer):
+    plan = tweet_analyzer.lazy()
+    assert repr(plan) == "QueryPlan(0 conditions)"
+    plan = plan.tweet_filter_likes(100).tweet_filter_hashtags(["klima"])
+    assert repr(plan) == "QueryPlan(2 conditions: RangeCondition, EntityCondition)"
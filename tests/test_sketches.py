@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+import pyarrow.compute as pc
+import pytest
+
+from yatclient.schema import entity_values
+from yatclient.sketches import HeavyHitters
+
+
+def exact_counts(tweet_analyzer, kind, stopwords, author = None):
+    if author is not None:
+        tweet_analyzer = tweet_analyzer.tweet_filter_account([author])
+    if kind == "words":
+        return tweet_analyzer.get_corpus().counts(stopwords)
+    _, values = entity_values(tweet_analyzer.df[kind])
+    counts = pd.Series(pc.utf8_lower(values.cast("string")).to_pylist()).value_counts()
+    return counts.sort_index(kind = "stable").sort_values(ascending = False, kind = "stable")
+
+
+@pytest.mark.parametrize("kind", ["hashtags", "words"])
+def test_top_of_one_batch_is_exact(tweet_analyzer, kind):
+    heavy_hitters = HeavyHitters(k = 50, k_author = 50)
+    heavy_hitters.update(tweet_analyzer)
+    for author in [None, "spdde"]:
+        top = heavy_hitters.top(kind, 20, author = author)
+        exact = exact_counts(tweet_analyzer, kind, heavy_hitters.stopwords, author).head(20)
+        assert top.item.tolist() == exact.index.tolist()
+        assert top["count"].tolist() == exact.tolist()
+
+
+@pytest.mark.parametrize("kind", ["hashtags", "words"])
+def test_top_of_chunks_bounds_the_exact_counts(tweet_analyzer, kind):
+    heavy_hitters = HeavyHitters(k = 50, k_author = 50)
+    for rows in np.array_split(np.arange(len(tweet_analyzer.df)), 20):
+        heavy_hitters.update(tweet_analyzer.df.iloc[rows])
+    top = heavy_hitters.top(kind, 10)
+    exact = exact_counts(tweet_analyzer, kind, heavy_hitters.stopwords)
+    assert set(top.item) == set(exact.index[:10])
+    true = exact[top.item].to_numpy()
+    assert (top["count"].to_numpy() >= true).all() and (top["count"].to_numpy() - top["error"].to_numpy() <= true).all()
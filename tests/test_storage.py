@@ -0,0 +1,69 @@
+import pandas as pd
+import pytest
+
+from yatclient import TweetAnalyzer, storage
+from yatclient.mock_api import synthetic_fixtures
+from yatclient.schema import DATE_DTYPE, flat_schema
+
+from .conftest import TWEETS_CSV
+
+
+@pytest.fixture
+def json_analyzer():
+    fixtures = synthetic_fixtures(["spdde", "fdp", "cdu"], 300, retweet_share = 0.2)
+    return TweetAnalyzer(df = TweetAnalyzer().json_to_dataframe(tweet for timeline in fixtures["timelines"].values() for tweet in timeline))
+
+
+def by_date(df):
+    return df.sort_values(["date", "id"], kind = "stable").reset_index(drop = True)
+
+
+@pytest.mark.parametrize("file_format", ["parquet", "feather"])
+def test_dataset_round_trip(tmp_path, json_analyzer, file_format):
+    json_analyzer.write_dataset(str(tmp_path / "tweets"), file_format = file_format)
+    tweet_analyzer = TweetAnalyzer()
+    tweet_analyzer.read_dataset(str(tmp_path / "tweets"), file_format = file_format)
+    assert tweet_analyzer.df.date.dtype == DATE_DTYPE
+    pd.testing.assert_frame_equal(tweet_analyzer.df, by_date(json_analyzer.df))
+
+
+def test_archive_round_trip(tmp_path, json_analyzer):
+    json_analyzer.write_archive(str(tmp_path / "tweets.feather"))
+    tweet_analyzer = TweetAnalyzer()
+    tweet_analyzer.open_archive(str(tmp_path / "tweets.feather"))
+    pd.testing.assert_frame_equal(tweet_analyzer.df, json_analyzer.df)
+
+
+def test_typed_csv_matches_pandas_csv(tweet_analyzer):
+    pandas_analyzer = TweetAnalyzer()
+    pandas_analyzer.read_from_csv(TWEETS_CSV, sep = ",")
+    pd.testing.assert_frame_equal(tweet_analyzer.df, pandas_analyzer.df)
+
+
+def test_csv_dates_with_zone_offset_after_the_first_block(tmp_path, tweet_analyzer):
+    path = str(tmp_path / "tweets.csv")
+    df = tweet_analyzer.get_dataframe()
+    half = len(df) // 2
+    # the dates of the second half are written with offset, in another zone
+    dates = df.date.astype(str).where(df.index < half, (df.date.dt.tz_localize("UTC").dt.tz_convert("Europe/Berlin")).astype(str))
+    # as TweetAnalyzer.write_to_csv does
+    flat_schema(df.assign(date = dates)).to_csv(path)
+    assert "+02:00" not in open(path, encoding = "utf-8").read(64 * 1024)
+
+    expected = tweet_analyzer.df.reset_index(drop = True)
+    pd.testing.assert_frame_equal(storage.read_csv(path, block_size = 64 * 1024), expected)
+    chunks = list(storage.iter_csv(path, chunksize = 1000, block_size = 64 * 1024))
+    assert len(chunks) == 5
+    pd.testing.assert_series_equal(pd.concat([chunk.date for chunk in chunks], ignore_index = True), expected.date)
+
+
+@pytest.mark.parametrize("typed", [True, False])
+def test_csv_round_trip(tmp_path, json_analyzer, typed):
+    path = str(tmp_path / "tweets.csv")
+    json_analyzer.write_to_csv(path, index = False)
+    tweet_analyzer = TweetAnalyzer()
+    if typed:
+        tweet_analyzer.read_from_csv(path)
+    else:
+        tweet_analyzer.read_from_csv(path, sep = ",")
+    pd.testing.assert_frame_equal(tweet_analyzer.df, json_analyzer.df)
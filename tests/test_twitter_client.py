@@ -0,0 +1,112 @@
+import os
+
+import pytest
+
+from yatclient import TweetAnalyzer, TwitterClient
+from yatclient.mock_api import MockTwitterAPI, MockTwitterServer, synthetic_fixtures
+from yatclient.twitter_client import CheckpointStore, ResponseCache
+
+ACCOUNTS = ["spdde", "fdp", "cdu"]
+
+
+def fetch(fixtures, **kargs):
+    # returns the ids of the fetched tweets and the number of timeline requests the server got
+    with MockTwitterServer(fixtures, rate_limit = None) as server:
+        client = TwitterClient(None, None, None, None, ACCOUNTS, api = MockTwitterAPI(server.url))
+        tweets = client.get_user_timeline_tweets(start_date = "2019-05-01", end_date = "2019-06-01", **kargs)
+        return [tweet.id for tweet in tweets], server.requests.get("user_timeline", 0)
+
+
+@pytest.mark.parametrize("tweets_per_account", [150, 600, 1000])
+@pytest.mark.parametrize("retweet_share", [0.0, 0.2, 0.95])
+def test_lean_fetch_matches_normal_fetch(tweets_per_account, retweet_share):
+    fixtures = synthetic_fixtures(ACCOUNTS, tweets_per_account, retweet_share = retweet_share)
+    ids, requests = fetch(fixtures)
+    lean_ids, lean_requests = fetch(fixtures, lean = True, server_filter = False)
+    assert lean_ids == ids
+    assert lean_requests <= requests
+    assert fetch(fixtures, lean = True)[0] == ids
+
+
+def test_fetch_without_retweets_from_the_api():
+    fixtures = synthetic_fixtures(ACCOUNTS, 600, retweet_share = 0.95)
+    ids, _ = fetch(fixtures)
+    lean_ids, _ = fetch(fixtures, lean = True, include_rts = False)
+    assert lean_ids == ids
+
+
+@pytest.mark.parametrize("lean, server_filter, retweets, include_rts",
+                         [(True, True, False, "False"), (True, False, False, None), (True, True, True, None), (False, True, False, None)])
+def test_server_filter_query_parameters(lean, server_filter, retweets, include_rts):
+    fixtures = synthetic_fixtures(ACCOUNTS, 150)
+    with MockTwitterServer(fixtures, rate_limit = None) as server:
+        client = TwitterClient(None, None, None, None, ACCOUNTS, api = MockTwitterAPI(server.url))
+        client.get_user_timeline_tweets(start_date = "2019-05-01", end_date = "2019-06-01", retweets = retweets, lean = lean,
+                                        server_filter = server_filter)
+        queries = server.queries["user_timeline"]
+    assert [query.get("include_rts") for query in queries] == [include_rts] * len(queries)
+    assert [query.get("trim_user") for query in queries] == ["True" if lean else None] * len(queries)
+    assert sorted({query["id"] for query in queries}) == sorted(ACCOUNTS)
+
+
+def test_cache_replays_responses_stored_by_another_instance(tmp_path):
+    fixtures = synthetic_fixtures(ACCOUNTS, 300)
+    directory = str(tmp_path / "cache")
+    offline = ResponseCache(directory, offline = True)
+    with MockTwitterServer(fixtures, rate_limit = None) as server:
+        client = TwitterClient(None, None, None, None, ACCOUNTS, cache = ResponseCache(directory), api = MockTwitterAPI(server.url))
+        users = [user.screen_name for user in client.get_user_data()]
+        ids = [tweet.id for tweet in client.get_user_timeline_tweets(start_date = "2019-05-01", end_date = "2019-06-01", lean = True)]
+    # the server is gone: everything has to come from the files stored by the other cache
+    client = TwitterClient(None, None, None, None, ACCOUNTS, cache = offline, api = MockTwitterAPI(server.url))
+    assert [user.screen_name for user in client.get_user_data()] == users
+    assert [tweet.id for tweet in client.get_user_timeline_tweets(start_date = "2019-05-01", end_date = "2019-06-01", lean = True)] == ids
+    client.twitter_user = ["unknown"]
+    with pytest.raises(LookupError):
+        client.get_user_data()
+
+
+def test_checkpoint_resume(tmp_path):
+    fixtures = synthetic_fixtures(ACCOUNTS, 600, retweet_share = 0.2)
+    # the first run only sees the older half of the timelines
+    older = dict(fixtures, timelines = {name: timeline[300:] for name, timeline in fixtures["timelines"].items()})
+    path = str(tmp_path / "checkpoints.json")
+    checkpoints = CheckpointStore(path)
+    ids, _ = fetch(older, checkpoint = checkpoints)
+    assert not os.path.exists(path)
+    checkpoints.save()
+
+    new_ids, requests = fetch(fixtures, checkpoint = CheckpointStore(path), lean = True)
+    all_ids, all_requests = fetch(fixtures)
+    assert sorted(ids + new_ids) == sorted(all_ids)
+    assert not set(ids) & set(new_ids)
+    assert requests < all_requests
+
+
+def test_get_user_data_skips_chunks_of_unknown_accounts():
+    fixtures = synthetic_fixtures(ACCOUNTS, 10)
+    accounts = ["fdp"] + ["unknown%d" % i for i in range(TwitterClient.LOOKUP_CHUNK_SIZE)] + ["spdde"]
+    with MockTwitterServer(fixtures, rate_limit = None) as server:
+        client = TwitterClient(None, None, None, None, accounts, api = MockTwitterAPI(server.url))
+        assert [user.screen_name for user in client.get_user_data(workers = 2)] == ["fdp", "spdde"]
+        client.twitter_user = ["unknown"]
+        assert client.get_user_data() == []
+
+
+@pytest.mark.parametrize("keep_tweets", [True, False])
+def test_analyzer_from_generator_and_batches(keep_tweets):
+    fixtures = synthetic_fixtures(ACCOUNTS, 450, retweet_share = 0.2)
+    ids, _ = fetch(fixtures)
+    with MockTwitterServer(fixtures, rate_limit = None) as server:
+        client = TwitterClient(None, None, None, None, ACCOUNTS, api = MockTwitterAPI(server.url))
+        tweets = client.iter_user_timeline_tweets(start_date = "2019-05-01", end_date = "2019-06-01")
+        analyzer = TweetAnalyzer(tweets, keep_tweets = keep_tweets)
+        batches = [TweetAnalyzer(batch, keep_tweets = keep_tweets)
+                   for batch in client.iter_user_timeline_batches(start_date = "2019-05-01", end_date = "2019-06-01", batch_size = 100)]
+    assert analyzer.df.id.tolist() == ids
+    assert [tweet_id for batch in batches for tweet_id in batch.df.id.tolist()] == ids
+    if keep_tweets:
+        assert [tweet.id for tweet in analyzer.tweets] == ids
+        assert [tweet.id for batch in batches for tweet in batch.tweets] == ids
+    else:
+        assert analyzer.tweets is None and all(batch.tweets is None for batch in batches)
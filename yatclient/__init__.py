@@ -1,6 +1,8 @@
 __version__ = "0.1"
-__all__ = ["twitter_client","tweet_analyzer","user_analyzer"]
+__all__ = ["twitter_client","tweet_analyzer","user_analyzer","snowflake","mock_api","schema","indexes","query","storage","cleaning","corpus","sketches"]
 
 from .tweet_analyzer import TweetAnalyzer
 from .tweet_analyzer import UserAnalyzer
 from .twitter_client import TwitterClient
+from .twitter_client import CheckpointStore
+from .twitter_client import ResponseCache
@@ -0,0 +1,318 @@
+"""
+The text cleaning of TweetAnalyzer.tweet_manipulation.
+
+The options are compiled to a pipeline once (see cleaning_pipeline): the regular expressions of the selected options, one after
+the other, exactly as tweet_manipulation applied them with re.sub. They are evaluated by pyarrow (RE2) on the whole column at once;
+a single tweet takes the same way, so both give the same result. The expressions are not combined into one alternation, as a
+deletion may create or take apart a match of the next expression (e.g. "@ZDF-#TVDuell gezeigt").
+
+RE2 knows only the ASCII whitespace as \s, so the whitespace of python's re (str.isspace: no-break spaces, U+2028, ...)
+is spelled out (WHITESPACE). \b and \d of the hyperlink expression stay ASCII in RE2: a hyperlink right after a letter
+like "ü" (no word boundary for re) or with other than ASCII digits after "www" is matched differently than by re.
+
+The tokenized texts are kept in a cache (TEXT_CACHE), keyed by the content of the texts, so the frequency counts
+(TweetAnalyzer.bagofwords, plot_bar, wordcloud) clean and tokenize the same tweets only once (see TweetAnalyzer.get_corpus).
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from scipy import sparse
+
+from .schema import TEXT_DTYPE
+
+URL_PATTERN = r'''(?i:\b((?:https?://|www\d{0,3}[.]|[a-z0-9.\-]+[.][a-z]{2,4}/)(?:[^\s()<>]+|\(([^\s()<>]+|(\([^\s()<>]+\)))*\))+(?:\(([^\s()<>]+|(\([^\s()<>]+\)))*\)|[^\s`!()\[\]{};:'".,<>?«»“”‘’])))'''
+
+# the characters python's re matches with \s (for RE2, see the module description)
+WHITESPACE = "\t\n\x0b\x0c\r\x1c-\x1f \x85\xa0\u1680\u2000-\u200a\u2028\u2029\u202f\u205f\u3000"
+
+# (option, regular expression, replacement) in the order tweet_manipulation applies them
+STEPS = [("delete_htmlent", r"<[^<]+?>", ""),
+         ("delete_htmlent", r"&amp;+|&lt;+|&gt;+|&quot;+|&apos;+", ""),
+         ("delete_hyperlinks", URL_PATTERN.replace(r"\s", WHITESPACE), " "),
+         ("delete_numbers", r"[0-9]+", ""),
+         ("delete_hashtags", "#[^%s]+[%s]*" % (WHITESPACE, WHITESPACE), ""),
+         ("delete_diamonds_from_hashtags", r"#+", ""),
+         ("delete_accountlinks", "@[^%s]+[%s]*" % (WHITESPACE, WHITESPACE), ""),
+         ("delete_at_from_accountlinks", r"@+", "")]
+OPTIONS = list(dict.fromkeys(step[0] for step in STEPS)) + ["only_small_letters"]
+# the cleaning of the tweets before their words are counted (TweetAnalyzer.bagofwords)
+WORD_CLEANING = dict(delete_htmlent = True, delete_hyperlinks = True, delete_numbers = True, delete_hashtags = True,
+                     only_small_letters = True, delete_accountlinks = True)
+# the words TweetAnalyzer.bagofwords does not count
+STOPWORDS_DE = ['unsere', 'anderes', 'ist', 'andern', 'hab', 'welche', 'dasselbe', 'jener', 'ich', 'indem', 'solchem', 'manchem', 'während', 'anderm', 'einig', 'kann', 'keines', 'seinen', 'so', 'aber', 'jenen', 'von', 'zur', 'jenes', 'solches', 'diese', 'seinem', 'derselben', 'einmal', 'jedes', 'eurem', 'sollte', 'manchen', 'keiner', 'ob', 'dessen', 'einer', 'sich', 'können', 'allem', 'doch', 'einem', 'waren', 'er', 'nur', 'aus', 'deine', 'wo', 'andere', 'welches', 'nichts', 'wie', 'aller', 'hier', 'desselben', 'keinen', 'meiner', 'meine', 'dieses', 'zwar', 'noch', 'anderem', 'bin', 'unser', 'wenn', 'ander', 'allen', 'gegen', 'diesen', 'weil', 'eurer', 'weiter', 'keinem', 'an', 'haben', 'meinem', 'dieselbe', 'und', 'derer', 'wollen', 'durch', 'eines', 'denn', 'musste', 'welchen', 'hatte', 'war', 'damit', 'keine', 'mein', 'dieser', 'eures', 'wirst', 'würde', 'einiger', 'dass', 'nach', 'anders', 'jetzt', 'soll', 'deines', 'demselben', 'auf', 'euren', 'für', 'muss', 'dazu', 'machen', 'wollte', 'ihrem', 'den', 'selbst', 'dich', 'jeden', 'dir', 'also', 'bis', 'jene', 'in', 'mich', 'sind', 'würden', 'seines', 'im', 'wird', 'viel', 'unserem', 'solcher', 'zum', 'ihn', 'könnte', 'warst', 'ihm', 'auch', 'bist', 'dem', 'ohne', 'sie', 'vor', 'dort', 'da', 'das', 'die', 'etwas', 'mancher', 'jenem', 'hatten', 'hin', 'ihr', 'kein', 'sein', 'sehr', 'dann', 'mit', 'weg', 'was', 'ins', 'seiner', 'euer', 'sondern', 'jeder', 'ihren', 'daß', 'um', 'dein', 'meinen', 'einen', 'ihrer', 'solche', 'unseres', 'mir', 'anderen', 'dies', 'du', 'eine', 'meines', 'unter', 'deinem', 'einige', 'werde', 'wieder', 'anderer', 'hinter', 'als', 'welchem', 'ihnen', 'einigem', 'manches', 'seine', 'über', 'man', 'hat', 'anderr', 'ein', 'am', 'jedem', 'unseren', 'wir', 'deinen', 'bei', 'derselbe', 'gewesen', 'will', 'welcher', 'nicht', 'eure', 'des', 'werden', 'euch', 'oder', 'alles', 'zu', 'einiges', 'habe', 'uns', 'alle', 'der', 'einigen', 'ihre', 'jede', 'nun', 'denselben', 'sonst', 'diesem', 'vom', 'dieselben', 'ihres', 'manche', 'zwischen', 'solchen', 'deiner', 'es']
+STOPWORDS_ENG = ['i', 'me', 'my', 'myself', 'we', 'our', 'ours', 'ourselves', 'you', "you're", "you've", "you'll", "you'd",'your', 'yours', 'yourself', 'yourselves', 'he', 'him', 'his', 'himself', 'she', "she's", 'her', 'hers','herself', 'it', "it's", 'its', 'itself', 'they', 'them', 'their', 'theirs', 'themselves', 'what', 'which','who', 'whom', 'this', 'that', "that'll", 'these', 'those', 'am', 'is', 'are', 'was', 'were', 'be', 'been','being', 'have', 'has', 'had', 'having', 'do', 'does', 'did', 'doing', 'a', 'an', 'the', 'and', 'but', 'if','or', 'because', 'as', 'until', 'while', 'of', 'at', 'by', 'for', 'with', 'about', 'against', 'between',         'into', 'through', 'during', 'before', 'after', 'above', 'below', 'to', 'from', 'up', 'down', 'in', 'out','on', 'off', 'over', 'under', 'again', 'further', 'then', 'once', 'here', 'there', 'when', 'where', 'why',         'how', 'all', 'any', 'both', 'each', 'few', 'more', 'most', 'other', 'some', 'such', 'no', 'nor', 'not','only', 'own', 'same', 'so', 'than', 'too', 'very', 's', 't', 'can', 'will', 'just', 'don', "don't", 'should',         "should've", 'now', 'd', 'll', 'm', 'o', 're', 've', 'y', 'ain', 'aren', "aren't", 'couldn', "couldn't",'didn', "didn't", 'doesn', "doesn't", 'hadn', "hadn't", 'hasn', "hasn't", 'haven', "haven't", 'isn', "isn't",         'ma', 'mightn', "mightn't", 'mustn', "mustn't", 'needn', "needn't", 'shan', "shan't", 'shouldn', "shouldn't",'wasn', "wasn't", 'weren', "weren't", 'won', "won't", 'wouldn', "wouldn't"]
+
+
+class CleaningPipeline:
+    """
+    Description
+    -----------
+    The compiled cleaning options: passes = [(regular expression, replacement), ...], lower = whether to lowercase at the end.
+    """
+    def __init__(self, passes, lower):
+        self.passes = passes
+        self.lower = lower
+        # identifies the cleaning in cache keys
+        self.key = (tuple(passes), lower)
+
+    def __repr__(self):
+        return "CleaningPipeline(%d passes%s)" % (len(self.passes), ", lowercase" if self.lower else "")
+
+    def clean_array(self, values):
+        """
+        Description
+        -----------
+        Cleans an Arrow array (or chunked array) of strings, returns the cleaned one.
+        """
+        for pattern, replacement in self.passes:
+            values = pc.replace_substring_regex(values, pattern = pattern, replacement = replacement)
+        # lowercasing does not change what the expressions match, so it runs last
+        return pc.utf8_lower(values) if self.lower else values
+
+    def clean_series(self, series):
+        """
+        Description
+        -----------
+        Cleans a column of texts, returns a new <class 'pandas.core.series.Series'> (same index, compact text type).
+        """
+        if not self.passes and not self.lower:
+            return series.astype(TEXT_DTYPE)
+        values = pa.chunked_array(series.astype(TEXT_DTYPE).array.__arrow_array__())
+        return pd.Series(TEXT_DTYPE.__from_arrow__(self.clean_array(values)), index = series.index, name = series.name)
+
+    def clean_text(self, text):
+        """
+        Description
+        -----------
+        Cleans a single text (<class 'str'>).
+        """
+        return self.clean_array(pa.array([text], type = pa.large_string()))[0].as_py()
+
+
+@lru_cache(maxsize = 128)
+def _compile(selected, lower):
+    return CleaningPipeline([(pattern, replacement) for option, pattern, replacement in STEPS if option in selected], lower)
+
+
+def cleaning_pipeline(**options):
+    """
+    Description
+    -----------
+    Compiles the options of TweetAnalyzer.tweet_manipulation (delete_htmlent, delete_hyperlinks, delete_numbers, delete_hashtags,
+    only_small_letters, delete_diamonds_from_hashtags, delete_accountlinks, delete_at_from_accountlinks) to a CleaningPipeline.
+    Pipelines are cached per combination of options.
+
+    Returns
+    -------
+    <class 'yatclient.cleaning.CleaningPipeline'>
+
+    Example(s)
+    ----------
+        >>>> cleaning_pipeline(delete_hyperlinks = True, only_small_letters = True).clean_text("Look: https://t.co/abc")
+    """
+    unknown = set(options) - set(OPTIONS)
+    if unknown:
+        raise TypeError("Unknown cleaning options: " + ", ".join(sorted(unknown)))
+    return _compile(frozenset(option for option, selected in options.items() if selected and option != "only_small_letters"),
+                    bool(options.get("only_small_letters", False)))
+
+
+def text_array(series):
+    """
+    Description
+    -----------
+    Returns a column of texts as <class 'pyarrow.ChunkedArray'> of large strings (no copy for the compact text type).
+    """
+    return pa.chunked_array(series.astype(TEXT_DTYPE).array.__arrow_array__())
+
+
+def fingerprint(values):
+    """
+    Description
+    -----------
+    Returns a hash (<class 'str'>) of the content of an Arrow string array: equal texts in the same order give the same fingerprint,
+    no matter how the array is chunked.
+    """
+    digest = hashlib.blake2b(digest_size = 16)
+    digest.update(b"%d %d" % (len(values), values.null_count))
+    for chunk in values.chunks if isinstance(values, pa.ChunkedArray) else [values]:
+        if not len(chunk):
+            continue
+        _, offsets, data = chunk.buffers()
+        offsets = np.frombuffer(offsets, dtype = np.int64 if pa.types.is_large_string(chunk.type) else np.int32)[chunk.offset:chunk.offset + len(chunk) + 1]
+        # the lengths of the texts and their bytes, the same for any chunking
+        digest.update(np.diff(offsets).astype(np.int64).tobytes())
+        if data is not None:
+            digest.update(memoryview(data)[offsets[0]:offsets[-1]])
+    return digest.hexdigest()
+
+
+def tokenize(values, stopwords = ()):
+    """
+    Description
+    -----------
+    Splits texts into words like sklearn's CountVectorizer (words of two or more letters, digits or underscores),
+    without the stopwords.
+
+    Parameters
+    ----------
+    values:                 type = <class 'pyarrow.ChunkedArray'> or <class 'pyarrow.Array'> of strings
+
+    stopwords:              type = iterable of str
+                            default = ()
+
+    Returns
+    -------
+    <class 'pyarrow.ListArray'>
+
+        --> The words of every text, in their order (dictionary encoded: a word takes 4 bytes however often it occurs)
+    """
+    if isinstance(values, pa.ChunkedArray):
+        values = values.combine_chunks()
+    pieces = pc.split_pattern_regex(values, pattern = r"[^\p{L}\p{N}_]+")
+    words = pc.list_flatten(pieces)
+    parents = pc.list_parent_indices(pieces)
+    keep = pc.greater_equal(pc.utf8_length(words), 2)
+    if stopwords:
+        keep = pc.and_(keep, pc.invert(pc.is_in(words, value_set = pa.array(sorted(stopwords), type = words.type))))
+    words = words.filter(keep)
+    offsets = np.zeros(len(values) + 1, dtype = np.int32)
+    np.cumsum(np.bincount(parents.filter(keep).to_numpy(), minlength = len(values)), out = offsets[1:])
+    return pa.ListArray.from_arrays(pa.array(offsets), pc.dictionary_encode(words))
+
+
+def term_matrix(tokens, lower = False):
+    """
+    Description
+    -----------
+    The sparse document-term matrix of tokenize (or of an entity column): one row per text, one column per word (in alphabetical
+    order, like sklearn's CountVectorizer), the values are the number of occurrences.
+
+    Parameters
+    ----------
+    tokens:                 type = <class 'pyarrow.ListArray'> or <class 'pyarrow.ChunkedArray'> of lists of strings
+
+    lower:                  type = boolean
+                            description = If True: the words are lowercased first (words differing in case are counted together)
+                            default = False
+
+    Returns
+    -------
+    <class 'tuple'>
+
+        --> (<class 'scipy.sparse.csr_matrix'>, the words of the columns as <class 'numpy.ndarray'>)
+    """
+    words = pc.list_flatten(tokens)
+    if lower or isinstance(words, pa.ChunkedArray) or not pa.types.is_dictionary(words.type):
+        # one dictionary for all the words (the chunks of an entity column have dictionaries of their own)
+        words = pa.chunked_array([words]) if isinstance(words, pa.Array) else words
+        if pa.types.is_dictionary(words.type):
+            words = words.cast(pa.string())
+        words = pc.dictionary_encode((pc.utf8_lower(words) if lower else words).combine_chunks())
+    vocabulary = words.dictionary.to_numpy(zero_copy_only = False)
+    order = np.argsort(vocabulary, kind = "stable")
+    columns = np.empty(len(order), dtype = np.int64)
+    columns[order] = np.arange(len(order))
+    offsets = np.zeros(len(tokens) + 1, dtype = np.int64)
+    np.cumsum(pc.list_value_length(tokens).to_numpy(zero_copy_only = False), out = offsets[1:])
+    matrix = sparse.csr_matrix((np.ones(len(words), dtype = np.int64), columns[words.indices.to_numpy()], offsets),
+                               shape = (len(tokens), len(vocabulary)))
+    # words occurring more than once in a text are added up
+    matrix.sum_duplicates()
+    return matrix, vocabulary[order]
+
+
+def _size(value):
+    # bytes held by a cached value
+    if isinstance(value, (pd.Series, pd.DataFrame)):
+        return int(np.sum(value.memory_usage(deep = True)))
+    # arrow arrays, numpy arrays, yatclient.corpus.Corpus
+    return getattr(value, "nbytes", 0)
+
+
+class TextCache:
+    """
+    Description
+    -----------
+    In-memory cache of tokenized texts (yatclient.corpus.Corpus) - the least recently used entries are evicted once it outgrows max_bytes.
+    Keys are tuples of (kind, fingerprint of the texts, cleaning options, ...), so analyzers with the same tweets share the entries.
+    """
+    def __init__(self, max_bytes = 256 * 1024 ** 2):
+        """
+        Parameters
+        ----------
+        max_bytes:              type = int
+                                description = Size limit of the cache. The least recently used entries are evicted beyond it.
+                                default = 256 MB
+        """
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # key: (value, size in bytes), in the order of the last use
+        self._entries = OrderedDict()
+        self._size = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key):
+        """
+        Description
+        -----------
+        Returns the cached value of key, or None if it is not cached.
+        """
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key][0]
+
+    def set(self, key, value):
+        """
+        Description
+        -----------
+        Stores value under key and evicts the least recently used entries if the cache grew beyond max_bytes
+        (values larger than max_bytes are not stored).
+        """
+        size = _size(value)
+        with self._lock:
+            if key in self._entries:
+                self._size -= self._entries.pop(key)[1]
+            if size > self.max_bytes:
+                return value
+            self._entries[key] = (value, size)
+            self._size += size
+            while self._size > self.max_bytes:
+                _, (_, old_size) = self._entries.popitem(last = False)
+                self._size -= old_size
+        return value
+
+    def clear(self):
+        """
+        Description
+        -----------
+        Removes all entries of the cache.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    @property
+    def size(self):
+        """
+        Description
+        -----------
+        The bytes held by the cache.
+        """
+        return self._size
+
+
+TEXT_CACHE = TextCache()
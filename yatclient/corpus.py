@@ -0,0 +1,221 @@
+"""
+The tokenized tweets of a TweetAnalyzer as integer token ids (see TweetAnalyzer.get_corpus).
+
+The words of all corpora are numbered in one shared vocabulary (VOCABULARY), which only grows: a word keeps its id, so the counts
+and document-term matrices of different analyzers (e.g. the results of the tweet_filter_* functions) refer to the same words.
+A corpus stores the ids of all texts in one array and the offsets of every text in it (like the rows of a CSR matrix);
+the corpus of a subset of the texts is a selection of these rows and shares the arrays with the corpus it was taken from.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from scipy import sparse
+
+from .schema import TEXT_DTYPE
+
+
+class Vocabulary:
+    """
+    Description
+    -----------
+    Growable mapping word --> token id (0, 1, 2, ... in the order the words were first seen).
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.words = pd.Index([], dtype = object)
+
+    def __len__(self):
+        return len(self.words)
+
+    def __contains__(self, word):
+        return word in self.words
+
+    def encode(self, words):
+        """
+        Description
+        -----------
+        Returns the ids of words (<class 'numpy.ndarray'>), unknown words are added to the vocabulary.
+
+        Parameters
+        ----------
+        words:                  type = <class 'pyarrow.Array'> of strings or list of str
+                                description = Distinct words (e.g. the dictionary of dictionary encoded tokens)
+        """
+        words = pd.Index(words.to_numpy(zero_copy_only = False) if isinstance(words, pa.Array) else list(words), dtype = object)
+        with self._lock:
+            ids = self.words.get_indexer(words)
+            new = ids < 0
+            if new.any():
+                ids[new] = np.arange(len(self.words), len(self.words) + new.sum())
+                self.words = self.words.append(words[new])
+        return ids
+
+    def lookup(self, words):
+        """
+        Description
+        -----------
+        Returns the ids of the known ones of words (<class 'numpy.ndarray'>), without adding the others.
+        """
+        ids = self.words.get_indexer(pd.Index(list(words), dtype = object))
+        return ids[ids >= 0]
+
+
+VOCABULARY = Vocabulary()
+
+
+class Corpus:
+    """
+    Description
+    -----------
+    Texts as token ids of a Vocabulary: the ids of text i are ids[offsets[i]:offsets[i + 1]].
+    If rows is given, the corpus consists of these texts of ids and offsets only (see take).
+    """
+    def __init__(self, ids, offsets, vocabulary = VOCABULARY, rows = None):
+        """
+        Parameters
+        ----------
+        ids:                    type = <class 'numpy.ndarray'>
+                                description = The token ids of all texts, one after the other
+
+        offsets:                type = <class 'numpy.ndarray'>
+                                description = Where the texts start in ids (plus the end of the last one)
+
+        vocabulary:             type = <class 'yatclient.corpus.Vocabulary'>
+                                default = VOCABULARY
+
+        rows:                   type = <class 'numpy.ndarray'> or None
+                                description = The positions of the texts the corpus consists of. If None: all of them.
+                                default = None
+        """
+        self.ids = ids
+        self.offsets = offsets
+        self.vocabulary = vocabulary
+        self.rows = rows
+
+    @classmethod
+    def from_tokens(cls, tokens, vocabulary = VOCABULARY):
+        """
+        Description
+        -----------
+        Encodes the words of yatclient.cleaning.tokenize (<class 'pyarrow.ListArray'>), unknown words are added to the vocabulary.
+        """
+        words = pc.list_flatten(tokens)
+        if not pa.types.is_dictionary(words.type):
+            words = pc.dictionary_encode(words)
+        # every distinct word is looked up once
+        ids = vocabulary.encode(words.dictionary).astype(np.int32)[words.indices.to_numpy()]
+        offsets = np.zeros(len(tokens) + 1, dtype = np.int64)
+        np.cumsum(pc.list_value_length(tokens).to_numpy(zero_copy_only = False), out = offsets[1:])
+        return cls(ids, offsets, vocabulary)
+
+    def __len__(self):
+        return len(self.offsets) - 1 if self.rows is None else len(self.rows)
+
+    def __repr__(self):
+        return "Corpus(%d texts, %d tokens)" % (len(self), len(self.tokens()[0]))
+
+    @property
+    def nbytes(self):
+        """
+        Description
+        -----------
+        The bytes held by the arrays of the corpus (the vocabulary is shared and not included).
+        """
+        return self.ids.nbytes + self.offsets.nbytes + (0 if self.rows is None else self.rows.nbytes)
+
+    def take(self, rows):
+        """
+        Description
+        -----------
+        Returns the corpus of some of the texts, without copying their ids.
+
+        Parameters
+        ----------
+        rows:                   type = <class 'numpy.ndarray'> (positions or boolean mask) or <class 'slice'>
+                                description = The texts to keep, as for DataFrame.iloc
+        """
+        rows = np.arange(len(self))[rows if isinstance(rows, slice) else np.asarray(rows)]
+        return Corpus(self.ids, self.offsets, self.vocabulary, rows if self.rows is None else self.rows[rows])
+
+    def tokens(self):
+        """
+        Description
+        -----------
+        Returns (ids, offsets) of the texts of the corpus, as if it had been encoded on its own.
+        """
+        if self.rows is None:
+            return self.ids, self.offsets
+        starts = self.offsets[self.rows]
+        lengths = self.offsets[self.rows + 1] - starts
+        offsets = np.zeros(len(self.rows) + 1, dtype = np.int64)
+        np.cumsum(lengths, out = offsets[1:])
+        # the positions of the selected slices in ids
+        positions = np.repeat(starts - offsets[:-1], lengths) + np.arange(offsets[-1])
+        return self.ids[positions], offsets
+
+    def _stopped(self, stopwords):
+        # mask over the vocabulary: True for the ids of the stopwords
+        stopped = np.zeros(len(self.vocabulary), dtype = bool)
+        stopped[self.vocabulary.lookup(stopwords)] = True
+        return stopped
+
+    def counts(self, stopwords = ()):
+        """
+        Description
+        -----------
+        Counts the words of the corpus (a bincount over the token ids).
+
+        Parameters
+        ----------
+        stopwords:              type = iterable of str
+                                description = Words not to count
+                                default = ()
+
+        Returns
+        -------
+        <class 'pandas.core.series.Series'>
+
+            --> word --> count, in descending order of the counts (words with the same count in alphabetical order)
+        """
+        ids, _ = self.tokens()
+        counts = np.bincount(ids, minlength = len(self.vocabulary))
+        counts[self._stopped(stopwords)[:len(counts)]] = 0
+        used = np.flatnonzero(counts)
+        words = self.vocabulary.words[used]
+        order = np.argsort(np.asarray(words), kind = "stable")
+        order = order[np.argsort(-counts[used][order], kind = "stable")]
+        return pd.Series(counts[used][order], index = pd.Index(words[order], dtype = TEXT_DTYPE))
+
+    def matrix(self, stopwords = ()):
+        """
+        Description
+        -----------
+        The sparse document-term matrix of the corpus: one row per text, one column per word used (in alphabetical order).
+
+        Parameters
+        ----------
+        stopwords:              type = iterable of str
+                                description = Words to leave out
+                                default = ()
+
+        Returns
+        -------
+        <class 'tuple'>
+
+            --> (<class 'scipy.sparse.csr_matrix'>, the words of the columns as <class 'numpy.ndarray'>)
+        """
+        ids, offsets = self.tokens()
+        texts = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+        keep = ~self._stopped(stopwords)[ids]
+        ids, texts = ids[keep], texts[keep]
+        used = np.unique(ids)
+        words = np.asarray(self.vocabulary.words[used])
+        order = np.argsort(words, kind = "stable")
+        columns = np.empty(len(self.vocabulary), dtype = np.int64)
+        columns[used[order]] = np.arange(len(used))
+        # duplicates (words occurring more than once in a text) are added up
+        matrix = sparse.csr_matrix((np.ones(len(ids), dtype = np.int64), (texts, columns[ids])), shape = (len(offsets) - 1, len(used)))
+        return matrix, words[order]
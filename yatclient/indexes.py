@@ -0,0 +1,239 @@
+"""
+Indexes over the columns of a TweetAnalyzer dataframe.
+
+The TweetAnalyzer builds them on first use and keeps them until its dataframe is replaced (see TweetAnalyzer.get_index),
+so repeated filters on the same data do not scan the whole columns again.
+All of them answer with row positions (for DataFrame.iloc), sorted ascending, so the order of the dataframe is kept.
+"""
+from functools import reduce
+
+import numpy as np
+import pandas as pd
+
+from .schema import entity_values
+
+
+class EntityIndex:
+    """
+    Description
+    -----------
+    Inverted index of an entity column (hashtags, linked_accounts): entity --> sorted row positions of the tweets containing it.
+    Entities are compared case sensitive.
+    """
+    def __init__(self, series):
+        """
+        Parameters
+        ----------
+        series:                 type = <class 'pandas.core.series.Series'>
+                                description = An entity column in the compact schema (see yatclient.schema)
+        """
+        self.size = len(series)
+        rows, entities = entity_values(series)
+        entities = pd.Categorical(entities.to_pandas())
+        # the row positions grouped by entity (ascending within every group), an entity used twice in a tweet counts once
+        keys = np.unique(entities.codes.astype(np.int64) * (len(series) + 1) + rows)
+        codes, self.rows = np.divmod(keys, len(series) + 1)
+        self.values = entities.categories
+        self.offsets = np.searchsorted(codes, np.arange(len(self.values) + 1))
+
+    def __len__(self):
+        return len(self.values)
+
+    def __contains__(self, value):
+        return value in self.values
+
+    def lookup(self, value):
+        """
+        Description
+        -----------
+        Returns the sorted row positions of the tweets containing value (an empty array if there are none).
+        """
+        code = self.values.get_indexer([value])[0]
+        if code < 0:
+            return np.empty(0, dtype = np.int64)
+        return self.rows[self.offsets[code]:self.offsets[code + 1]]
+
+    def union(self, values):
+        """
+        Description
+        -----------
+        Returns the sorted row positions of the tweets containing one or more of values.
+        """
+        positions = [self.lookup(value) for value in values]
+        if sum(map(len, positions)) > self.size // 64:
+            # many rows: marking them is cheaper than sorting
+            mask = np.zeros(self.size, dtype = bool)
+            for rows in positions:
+                mask[rows] = True
+            return np.flatnonzero(mask)
+        return np.unique(np.concatenate(positions + [np.empty(0, dtype = np.int64)]))
+
+    def intersection(self, values):
+        """
+        Description
+        -----------
+        Returns the sorted row positions of the tweets containing all of values.
+        """
+        positions = sorted((self.lookup(value) for value in values), key = len)
+        if not positions:
+            return np.empty(0, dtype = np.int64)
+        return reduce(lambda a, b: np.intersect1d(a, b, assume_unique = True), positions)
+
+
+class AuthorIndex(EntityIndex):
+    """
+    Description
+    -----------
+    Index of the author column: account --> sorted row positions of its tweets.
+    The accounts partition the rows (the codes of the categorical column serve as hash), so all of them are found in one pass.
+    """
+    def __init__(self, series):
+        """
+        Parameters
+        ----------
+        series:                 type = <class 'pandas.core.series.Series'>
+                                description = The author column (categorical)
+        """
+        self.size = len(series)
+        authors = pd.Categorical(series)
+        self.rows = np.argsort(authors.codes, kind = "stable")
+        self.values = authors.categories
+        # rows without author (code -1) are sorted first and belong to no account
+        self.offsets = np.searchsorted(authors.codes[self.rows], np.arange(len(self.values) + 1))
+
+    def groups(self):
+        """
+        Description
+        -----------
+        Returns [(account, sorted row positions), ...] for all accounts with tweets, in the order of the categories.
+        """
+        return [(value, self.rows[self.offsets[code]:self.offsets[code + 1]]) for code, value in enumerate(self.values)
+                if self.offsets[code + 1] > self.offsets[code]]
+
+
+class DateIndex:
+    """
+    Description
+    -----------
+    Sorted index of the date column: date ranges are found by binary search.
+    If the dataframe is sorted by date already (ascending or descending, like the timelines of the twitter API),
+    ranges are answered with slices of the dataframe instead of row positions.
+    """
+    def __init__(self, series):
+        """
+        Parameters
+        ----------
+        series:                 type = <class 'pandas.core.series.Series'>
+                                description = The date column (datetime64)
+        """
+        # in nanoseconds, like pandas.Timestamp: otherwise numpy would cast the whole column on every search
+        values = series.to_numpy().astype("datetime64[ns]")
+        self.order = np.argsort(values, kind = "stable")
+        self.dates = values[self.order]
+        # 1: ascending, -1: descending, 0: neither (NaT included)
+        if (values[1:] >= values[:-1]).all():
+            self.direction = 1
+        elif (values[1:] <= values[:-1]).all():
+            self.direction = -1
+        else:
+            self.direction = 0
+
+    def __len__(self):
+        return len(self.dates)
+
+    def _positions(self, lo, hi):
+        if self.direction == 1:
+            return slice(lo, hi)
+        if self.direction == -1:
+            # the dates >= the end of the range come first
+            return slice(len(self.dates) - hi, len(self.dates) - lo)
+        return np.sort(self.order[lo:hi])
+
+    def range(self, start, end):
+        """
+        Description
+        -----------
+        Returns the rows with start <= date < end, as <class 'slice'> or sorted row positions (<class 'numpy.ndarray'>).
+
+        Parameters
+        ----------
+        start, end:             type = str, <class 'datetime.datetime'>, anything else pandas.Timestamp accepts or None
+                                description = None leaves the range open on that side (rows without date are never included)
+        """
+        # NaT is sorted last, so searching it finds the end of the rows with date
+        bounds = [np.datetime64("NaT") if bound is None else pd.Timestamp(bound).to_datetime64() for bound in (start, end)]
+        lo, hi = np.searchsorted(self.dates, np.array(bounds, dtype = "datetime64[ns]"))
+        if start is None:
+            lo = 0
+        return self._positions(lo, max(lo, hi))
+
+    def windows(self, freq = "D", start = None, end = None):
+        """
+        Description
+        -----------
+        Splits [start, end) into consecutive windows (periods of freq, e.g. "D", "W" or "M") and finds the rows of all of them in one pass.
+
+        Parameters
+        ----------
+        freq:                   type = str
+                                description = A pandas period frequency
+                                default = "D"
+
+        start, end:             type = str, <class 'datetime.datetime'> or None
+                                description = The range to split. If None: the first / last date of the column.
+                                default = None
+
+        Returns
+        -------
+        <class 'list'>
+
+            --> [(start of the window as <class 'pandas.Timestamp'>, rows as in range), ...], empty windows included
+        """
+        known = self.dates[~np.isnat(self.dates)]
+        if (start is None or end is None) and not len(known):
+            return []
+        start = pd.Timestamp(known[0] if start is None else start)
+        # without end, the window of the last date is the last one
+        end = (pd.Period(pd.Timestamp(known[-1]), freq) + 1).start_time if end is None else pd.Timestamp(end)
+        if end <= start:
+            return []
+        periods = pd.period_range(pd.Period(start, freq), pd.Period(end - pd.Timedelta(1, "ns"), freq), freq = freq)
+        edges = [start] + list(periods.start_time[1:]) + [end]
+        bounds = np.searchsorted(self.dates, np.array([edge.to_datetime64() for edge in edges], dtype = "datetime64[ns]"))
+        return [(edges[i], self._positions(bounds[i], bounds[i + 1])) for i in range(len(edges) - 1)]
+
+
+class IdIndex:
+    """
+    Description
+    -----------
+    Hash index of the id column: tweet id --> row position (of the first row, if an id occurs more than once).
+    """
+    def __init__(self, series):
+        """
+        Parameters
+        ----------
+        series:                 type = <class 'pandas.core.series.Series'>
+                                description = The id column (int64)
+        """
+        first = ~series.duplicated().to_numpy()
+        self.ids = pd.Index(series.to_numpy()[first])
+        self.rows = np.flatnonzero(first)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, value):
+        return value in self.ids
+
+    def lookup(self, values):
+        """
+        Description
+        -----------
+        Returns the row position of every one of values, -1 for unknown ids (<class 'numpy.ndarray'>).
+        """
+        positions = self.ids.get_indexer(values)
+        return np.where(positions >= 0, self.rows[positions], -1)
+
+
+INDEXES = {"hashtags": EntityIndex, "linked_accounts": EntityIndex, "author": AuthorIndex, "date": DateIndex, "id": IdIndex}
@@ -0,0 +1,412 @@
+"""
+A local stand-in for the twitter API, to exercise and benchmark the TwitterClient without credentials or network access.
+
+MockTwitterServer serves the user_timeline, users/show and users/lookup endpoints from fixtures (synthetic or recorded),
+with a configurable latency, page size and rate limit (including the x-rate-limit-* headers and HTTP 429 answers).
+MockTwitterAPI is the matching client, it is passed to the TwitterClient instead of tweepy.API.
+
+Run a server from the command line:
+
+    $ python -m yatclient.mock_api --accounts spdde fdp cdu --tweets 2000 --latency 0.1 --port 8080
+"""
+import argparse
+import json
+import math
+import random
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import requests
+import tweepy
+
+from .snowflake import datetime_to_snowflake
+
+CREATED_AT_FORMAT = "%a %b %d %H:%M:%S +0000 %Y"
+WORDS = ["europa", "wahl", "klima", "zukunft", "heute", "live", "danke", "alle", "mehr", "gemeinsam", "rente", "schule",
+         "digital", "sozial", "sicherheit", "arbeit", "wirtschaft", "umwelt", "freiheit", "demokratie"]
+
+
+def synthetic_tweet(account, created_at, tweet_id = None, retweet = False, rng = random):
+    """
+    Description
+    -----------
+    Returns the json payload of a made up tweet (tweet_mode = "extended") of the account, created at created_at.
+
+    Parameters
+    ----------
+    account:                type = str
+                            description = Screen name of the author
+
+    created_at:             type = <class 'datetime.datetime'>
+                            description = Creation time (naive, UTC)
+
+    tweet_id:               type = int or None
+                            description = The id of the tweet. If None, the snowflake id of created_at is used.
+                            default = None
+
+    retweet:                type = boolean
+                            description = If True: The tweet is a retweet of another account
+                            default = False
+
+    rng:                    type = <class 'random.Random'>
+                            description = Source of randomness, pass a seeded one for reproducible tweets
+                            default = random
+    """
+    tweet_id = datetime_to_snowflake(created_at) + rng.randrange(1 << 22) if tweet_id is None else tweet_id
+    hashtags = rng.sample(WORDS, rng.randrange(3))
+    mentions = ["user%d" % rng.randrange(500) for _ in range(rng.randrange(3))]
+    urls = ["https://t.co/%08x" % rng.randrange(1 << 32) for _ in range(rng.randrange(2))]
+    text = " ".join(rng.choice(WORDS) for _ in range(rng.randrange(5, 25)))
+    text = " ".join(["@" + i for i in mentions] + [text] + ["#" + i for i in hashtags] + urls)
+    payload = {
+        "id": tweet_id,
+        "id_str": str(tweet_id),
+        "created_at": created_at.strftime(CREATED_AT_FORMAT),
+        "full_text": text,
+        "favorite_count": int(rng.paretovariate(1.2)) - 1,
+        "retweet_count": int(rng.paretovariate(1.4)) - 1,
+        "user": {"id": zlib.crc32(account.encode("utf-8")), "screen_name": account},
+        "entities": {"hashtags": [{"text": i} for i in hashtags],
+                     "user_mentions": [{"screen_name": i} for i in mentions],
+                     "urls": [{"url": i} for i in urls]},
+    }
+    if retweet:
+        original = "user%d" % rng.randrange(500)
+        payload["full_text"] = "RT @%s: %s" % (original, text)
+        payload["favorite_count"] = 0
+        payload["retweeted_status"] = {"id": tweet_id - rng.randrange(1, 1 << 30), "favorite_count": int(rng.paretovariate(1.2)) - 1,
+                                       "user": {"screen_name": original}}
+    return payload
+
+
+def synthetic_fixtures(accounts, tweets_per_account = 1000, start_date = "2019-05-01", end_date = "2019-06-01", retweet_share = 0.2, seed = 0):
+    """
+    Description
+    -----------
+    Creates fixtures for the MockTwitterServer: a user and a timeline of tweets_per_account made up tweets (spread evenly
+    over [start_date, end_date)) for every account. The same arguments always create the same fixtures.
+
+    Returns
+    -------
+    <class 'dict'>
+
+        --> {"users": {screen_name: user json}, "timelines": {screen_name: list of tweet json, newest first}}
+    """
+    rng = random.Random(seed)
+    start = datetime.strptime(start_date, "%Y-%m-%d")
+    step = (datetime.strptime(end_date, "%Y-%m-%d") - start) / max(tweets_per_account, 1)
+    fixtures = {"users": {}, "timelines": {}}
+    for account in accounts:
+        fixtures["users"][account] = {"id": zlib.crc32(account.encode("utf-8")), "screen_name": account, "name": account,
+                                      "followers_count": rng.randrange(1000, 500000),
+                                      "created_at": (start - timedelta(days = rng.randrange(365, 3650))).strftime(CREATED_AT_FORMAT)}
+        timeline = [synthetic_tweet(account, start + i * step, retweet = rng.random() < retweet_share, rng = rng) for i in range(tweets_per_account)]
+        timeline.sort(key = lambda tweet: tweet["id"], reverse = True)
+        fixtures["timelines"][account] = timeline
+    return fixtures
+
+
+def record_fixtures(twitter_client, start_date, end_date, **kargs):
+    """
+    Description
+    -----------
+    Records fixtures from the real API: the users and timelines (retweets included) of the accounts of twitter_client.
+
+    Example(s)
+    ----------
+        >>>> twitter_client = TwitterClient(consumer_key, consumer_secret,access_token, access_token_secret, Parties)
+        >>>> save_fixtures(record_fixtures(twitter_client, "2019-05-01", "2019-05-27"), "europawahl.json")
+    """
+    fixtures = {"users": {}, "timelines": {}}
+    for user in twitter_client.get_user_data():
+        fixtures["users"][user.screen_name] = user._json
+        fixtures["timelines"][user.screen_name] = []
+    for tweet in twitter_client.iter_user_timeline_tweets(start_date, end_date, retweets = True, **kargs):
+        fixtures["timelines"].setdefault(tweet.user.screen_name, []).append(tweet._json)
+    return fixtures
+
+
+def save_fixtures(fixtures, path):
+    """
+    Description
+    -----------
+    Writes fixtures to a json file.
+    """
+    with open(path, "w", encoding = "utf-8") as f:
+        json.dump(fixtures, f)
+
+
+def load_fixtures(path):
+    """
+    Description
+    -----------
+    Reads fixtures from a json file written by save_fixtures.
+    """
+    with open(path, encoding = "utf-8") as f:
+        return json.load(f)
+
+
+class MockTwitterServer:
+    """
+    Description
+    -----------
+    A local HTTP server answering like the twitter API (v1.1) from fixtures, running in a background thread.
+
+    Served endpoints: /1.1/statuses/user_timeline.json (screen_name/id, count, max_id, since_id, include_rts, trim_user),
+    /1.1/users/show.json (screen_name/id) and /1.1/users/lookup.json (screen_name, comma separated).
+    The number of requests per endpoint is counted in requests, their query parameters are kept in queries (endpoint --> list of dicts).
+    """
+    def __init__(self, fixtures, latency = 0.0, page_size = 200, rate_limit = 900, window = 900, host = "127.0.0.1", port = 0):
+        """
+        Description
+        -----------
+        Creates the server. It answers requests once start() was called (or within a with block).
+
+        Parameters
+        ----------
+        fixtures:               type = dict
+                                description = See synthetic_fixtures, record_fixtures and load_fixtures
+
+        latency:                type = float
+                                description = Seconds every answer is delayed
+                                default = 0.0
+
+        page_size:              type = int
+                                description = Maximum number of tweets per user_timeline page (the count parameter is capped by it)
+                                default = 200
+
+        rate_limit:             type = int or None
+                                description = Requests per window and endpoint, beyond it requests are answered with HTTP 429.
+                                              If None: no rate limit.
+                                default = 900
+
+        window:                 type = float
+                                description = Length of a rate limit window in seconds
+                                default = 900
+
+        host, port:             type = str, int
+                                description = Address to listen on, port 0 picks a free port (see url)
+                                default = "127.0.0.1", 0
+
+        Example(s)
+        ----------
+            >>>> fixtures = synthetic_fixtures(["spdde", "fdp"], tweets_per_account = 2000)
+            >>>> with MockTwitterServer(fixtures, latency = 0.05) as server:
+            >>>>     twitter_client = TwitterClient(None, None, None, None, ["spdde", "fdp"], api = MockTwitterAPI(server.url))
+            >>>>     tweets = twitter_client.get_user_timeline_tweets(start_date = "2019-05-01", end_date = "2019-06-01")
+        """
+        self.users = {name.lower(): user for name, user in fixtures["users"].items()}
+        self.timelines = {name.lower(): timeline for name, timeline in fixtures["timelines"].items()}
+        self.latency = latency
+        self.page_size = page_size
+        self.rate_limit = rate_limit
+        self.window = window
+        self.requests = {}
+        self.queries = {}
+        self._windows = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        """
+        Description
+        -----------
+        The base url of the API, e.g. http://127.0.0.1:8080/1.1
+        """
+        host, port = self._server.server_address[:2]
+        return "http://%s:%d/1.1" % (host, port)
+
+    def start(self):
+        self._thread = threading.Thread(target = self._server.serve_forever, daemon = True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _book(self, endpoint, params):
+        # returns the rate limit headers and whether the request is within the limit
+        with self._lock:
+            self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+            self.queries.setdefault(endpoint, []).append({key: ",".join(values) for key, values in params.items()})
+            if self.rate_limit is None:
+                return {}, True
+            now = time.time()
+            reset, used = self._windows.get(endpoint, (now + self.window, 0))
+            if now >= reset:
+                reset, used = now + self.window, 0
+            allowed = used < self.rate_limit
+            used += allowed
+            self._windows[endpoint] = (reset, used)
+            return {"x-rate-limit-limit": str(self.rate_limit), "x-rate-limit-remaining": str(self.rate_limit - used),
+                    "x-rate-limit-reset": str(math.ceil(reset))}, allowed
+
+    def _user(self, params):
+        name = (params.get("screen_name") or params.get("id") or [""])[0].lower()
+        return self.users.get(name)
+
+    def user_timeline(self, params):
+        name = (params.get("screen_name") or params.get("id") or [""])[0].lower()
+        if name not in self.timelines:
+            return 404, {"errors": [{"code": 34, "message": "Sorry, that page does not exist."}]}
+        count = min(int(params.get("count", ["20"])[0]), self.page_size)
+        max_id = int(params["max_id"][0]) if "max_id" in params else None
+        since_id = int(params["since_id"][0]) if "since_id" in params else None
+        include_rts = params.get("include_rts", ["true"])[0].lower() not in ("false", "0")
+        trim_user = params.get("trim_user", ["false"])[0].lower() in ("true", "1")
+        page = []
+        # like twitter, count is applied before the retweets are excluded
+        for tweet in self.timelines[name]:
+            if len(page) == count or (since_id is not None and tweet["id"] <= since_id):
+                break
+            if max_id is None or tweet["id"] <= max_id:
+                page.append(tweet)
+        if not include_rts:
+            page = [tweet for tweet in page if "retweeted_status" not in tweet]
+        if trim_user:
+            page = [dict(tweet, user = {"id": tweet["user"]["id"], "id_str": str(tweet["user"]["id"])}) for tweet in page]
+        return 200, page
+
+    def get_user(self, params):
+        user = self._user(params)
+        if user is None:
+            return 404, {"errors": [{"code": 50, "message": "User not found."}]}
+        return 200, user
+
+    def lookup_users(self, params):
+        names = ",".join(params.get("screen_name", [])).lower().split(",")
+        users = [self.users[name] for name in names if name in self.users]
+        if not users:
+            return 404, {"errors": [{"code": 17, "message": "No user matches for specified terms."}]}
+        return 200, users
+
+    def _handler(self):
+        server = self
+        routes = {"/1.1/statuses/user_timeline.json": "user_timeline", "/1.1/users/show.json": "get_user", "/1.1/users/lookup.json": "lookup_users"}
+
+        class Handler(BaseHTTPRequestHandler):
+            def _answer(self):
+                url = urlparse(self.path)
+                params = parse_qs(url.query)
+                if self.command == "POST":
+                    body = self.rfile.read(int(self.headers.get("Content-Length") or 0)).decode("utf-8")
+                    params.update(parse_qs(body))
+                endpoint = routes.get(url.path)
+                if endpoint is None:
+                    status, headers, payload = 404, {}, {"errors": [{"code": 34, "message": "Sorry, that page does not exist."}]}
+                else:
+                    headers, allowed = server._book(endpoint, params)
+                    if server.latency:
+                        time.sleep(server.latency)
+                    if allowed:
+                        status, payload = getattr(server, endpoint)(params)
+                    else:
+                        status, payload = 429, {"errors": [{"code": 88, "message": "Rate limit exceeded"}]}
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json;charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            do_GET = _answer
+            do_POST = _answer
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+class MockTwitterAPI:
+    """
+    Description
+    -----------
+    Talks to a MockTwitterServer (or anything else answering like the twitter API over plain http) -
+    a stand-in for tweepy.API with the methods the TwitterClient uses: user_timeline, get_user and lookup_users.
+    Like tweepy.API it returns tweepy models (or the payload of the given parser), keeps the last response in last_response
+    and raises tweepy.RateLimitError / tweepy.TweepError for error answers.
+    """
+    def __init__(self, url):
+        """
+        Parameters
+        ----------
+        url:                    type = str
+                                description = Base url of the API, see MockTwitterServer.url
+        """
+        self.url = url.rstrip("/")
+        self.parser = tweepy.parsers.ModelParser()
+        self.last_response = None
+        self._local = threading.local()
+
+    def _get(self, path, params, parser, model, method = "GET"):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        params = {key: value for key, value in params.items() if value is not None}
+        response = session.request(method, self.url + path, params = params)
+        self.last_response = response
+        if response.status_code != 200:
+            errors = response.json().get("errors", [{}])
+            if errors[0].get("code") == 88:
+                raise tweepy.RateLimitError(errors, response)
+            raise tweepy.TweepError(errors, response, api_code = errors[0].get("code"))
+        if parser is not None:
+            return parser.parse(None, response.text)
+        payload = response.json()
+        if isinstance(payload, list):
+            return model.parse_list(self, payload)
+        return model.parse(self, payload)
+
+    def user_timeline(self, id = None, parser = None, **params):
+        return self._get("/statuses/user_timeline.json", dict(params, id = id), parser, tweepy.models.Status)
+
+    def get_user(self, id = None, parser = None, **params):
+        return self._get("/users/show.json", dict(params, id = id), parser, tweepy.models.User)
+
+    def lookup_users(self, user_ids = None, screen_names = None, parser = None, **params):
+        params = dict(params, user_id = ",".join(map(str, user_ids)) if user_ids else None,
+                      screen_name = ",".join(screen_names) if screen_names else None)
+        return self._get("/users/lookup.json", params, parser, tweepy.models.User, method = "POST")
+
+
+def main():
+    parser = argparse.ArgumentParser(description = "Serve synthetic (or recorded) twitter fixtures on a local port.")
+    parser.add_argument("--accounts", nargs = "+", default = ["spdde", "fdp", "die_Gruenen", "afd", "dieLinke", "fwlandtag", "diepartei", "cdu", "csu"])
+    parser.add_argument("--tweets", type = int, default = 1000, help = "tweets per account")
+    parser.add_argument("--fixtures", help = "json file written by save_fixtures (instead of synthetic fixtures)")
+    parser.add_argument("--latency", type = float, default = 0.0)
+    parser.add_argument("--page-size", type = int, default = 200)
+    parser.add_argument("--rate-limit", type = int, default = 900)
+    parser.add_argument("--window", type = float, default = 900)
+    parser.add_argument("--port", type = int, default = 8080)
+    args = parser.parse_args()
+
+    fixtures = load_fixtures(args.fixtures) if args.fixtures else synthetic_fixtures(args.accounts, args.tweets)
+    server = MockTwitterServer(fixtures, latency = args.latency, page_size = args.page_size, rate_limit = args.rate_limit,
+                               window = args.window, port = args.port)
+    print("Serving the twitter API at %s (Ctrl-C to stop)" % server.url)
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        server._server.server_close()
+
+
+if __name__ == "__main__":
+    main()
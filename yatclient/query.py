@@ -0,0 +1,581 @@
+"""
+Lazy query plans for the TweetAnalyzer (see TweetAnalyzer.lazy).
+
+A QueryPlan collects filters instead of running them one by one. On collect() the conditions are ordered
+(index backed ones first, then the most selective ones) and evaluated on the remaining candidate rows only,
+so the dataframe is copied once, no matter how many filters are chained.
+
+Plans can also be written as expressions (see compile_query and TweetAnalyzer.query), e.g.
+
+    likes >= 100 and author in ['spdde', 'fdp'] and has_hashtag('klima') and date >= '2019-05-01'
+"""
+import ast
+import operator
+from abc import ABC, abstractmethod
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from .schema import TWEET_TYPES, entity_lengths
+
+# rows looked at to estimate the selectivity of conditions without index
+SAMPLE_SIZE = 2000
+
+
+def _all_rows(analyzer):
+    return np.arange(len(analyzer.df))
+
+
+def _restrict(positions, rows, n):
+    # the positions (sorted) which are among the candidate rows (sorted or None for all rows)
+    if rows is None:
+        return positions
+    keep = np.zeros(n, dtype = bool)
+    keep[positions] = True
+    return rows[keep[rows]]
+
+
+class Condition(ABC):
+    """
+    Description
+    -----------
+    One condition of a QueryPlan on a column. Conditions with index (IndexedCondition) know their rows from a TweetAnalyzer index,
+    the others evaluate a mask on the candidate rows.
+    """
+    indexed = False
+    column = None
+
+    @abstractmethod
+    def describe(self):
+        """
+        Description
+        -----------
+        Returns the condition as text (see QueryPlan.explain).
+        """
+
+    @abstractmethod
+    def mask(self, analyzer, rows):
+        """
+        Description
+        -----------
+        Returns the boolean mask of the candidate rows (sorted positions) satisfying the condition.
+        """
+
+    def selectivity(self, analyzer):
+        """
+        Description
+        -----------
+        Returns the estimated share of the rows satisfying the condition, from a sample of the rows.
+        (For conditions with index the QueryPlan counts the rows instead.)
+        """
+        n = len(analyzer.df)
+        if not n:
+            return 0.0
+        sample = np.unique(np.linspace(0, n - 1, min(n, SAMPLE_SIZE)).astype(np.int64))
+        return float(np.mean(self.mask(analyzer, sample)))
+
+    def filter(self, analyzer, rows):
+        """
+        Description
+        -----------
+        Returns the candidate rows (sorted positions, None for all rows) satisfying the condition.
+        """
+        if rows is None:
+            rows = _all_rows(analyzer)
+        return rows[self.mask(analyzer, rows)]
+
+
+class IndexedCondition(Condition):
+    """
+    Description
+    -----------
+    A condition with index: its rows are looked up in a TweetAnalyzer index (see TweetAnalyzer.get_index) instead of evaluating the column.
+    """
+    indexed = True
+
+    @abstractmethod
+    def positions(self, analyzer):
+        """
+        Description
+        -----------
+        Returns the sorted positions of all rows satisfying the condition.
+        """
+
+    def mask(self, analyzer, rows):
+        return np.isin(rows, self.positions(analyzer))
+
+
+class EntityCondition(IndexedCondition):
+    def __init__(self, column, values, all_in_one = False):
+        self.column = column
+        self.values = list(values)
+        self.all_in_one = all_in_one
+
+    def describe(self):
+        return "%s contains %s of %s" % (self.column, "all" if self.all_in_one else "any", self.values)
+
+    def positions(self, analyzer):
+        index = analyzer.get_index(self.column)
+        return index.intersection(self.values) if self.all_in_one else index.union(self.values)
+
+
+class AuthorCondition(IndexedCondition):
+    column = "author"
+
+    def __init__(self, accounts):
+        self.accounts = list(accounts)
+
+    def describe(self):
+        return "author in %s" % self.accounts
+
+    def positions(self, analyzer):
+        return analyzer.get_index("author").union(self.accounts)
+
+
+class DateCondition(IndexedCondition):
+    column = "date"
+
+    def __init__(self, start_date, end_date):
+        self.start_date = start_date
+        self.end_date = end_date
+
+    def describe(self):
+        if self.end_date is None:
+            return "date >= %s" % self.start_date
+        if self.start_date is None:
+            return "date < %s" % self.end_date
+        return "%s <= date < %s" % (self.start_date, self.end_date)
+
+    def positions(self, analyzer):
+        rows = analyzer.get_index("date").range(self.start_date, self.end_date)
+        return np.arange(rows.start, rows.stop) if isinstance(rows, slice) else rows
+
+
+class RangeCondition(Condition):
+    def __init__(self, column, minimum = 0, maximum = None):
+        self.column = column
+        self.minimum = minimum
+        self.maximum = maximum
+
+    def describe(self):
+        if self.maximum is None:
+            return "%s >= %s" % (self.column, self.minimum)
+        return "%s <= %s <= %s" % (self.minimum, self.column, self.maximum)
+
+    def mask(self, analyzer, rows):
+        values = analyzer.df[self.column].to_numpy()[rows]
+        if self.maximum is None:
+            return values >= self.minimum
+        return (values >= self.minimum) & (values <= self.maximum)
+
+
+class HyperlinkCondition(Condition):
+    column = "urls"
+
+    def __init__(self, no_hyperlinks = True):
+        self.no_hyperlinks = no_hyperlinks
+
+    def describe(self):
+        return "no urls" if self.no_hyperlinks else "urls"
+
+    def mask(self, analyzer, rows):
+        lengths = entity_lengths(analyzer.df.urls.iloc[rows])
+        return lengths == 0 if self.no_hyperlinks else lengths > 0
+
+    def filter(self, analyzer, rows):
+        if rows is None:
+            lengths = entity_lengths(analyzer.df.urls)
+            return np.flatnonzero(lengths == 0 if self.no_hyperlinks else lengths > 0)
+        return Condition.filter(self, analyzer, rows)
+
+
+class TweetTypeCondition(Condition):
+    column = "tweet_type"
+
+    def __init__(self, tweet_type):
+        self.tweet_type = tweet_type
+
+    def describe(self):
+        return "tweet_type == %s" % self.tweet_type
+
+    def mask(self, analyzer, rows):
+        return analyzer.df.tweet_type.cat.codes.to_numpy()[rows] == TWEET_TYPES.index(self.tweet_type)
+
+
+class CompareCondition(Condition):
+    def __init__(self, column, symbol, value):
+        self.column = column
+        self.symbol = symbol
+        self.value = value
+
+    def describe(self):
+        return "%s %s %r" % (self.column, self.symbol, self.value)
+
+    def mask(self, analyzer, rows):
+        return OPERATORS[self.symbol](analyzer.df[self.column].to_numpy()[rows], self.value)
+
+
+class MemberCondition(Condition):
+    def __init__(self, column, values):
+        self.column = column
+        self.values = list(values)
+
+    def describe(self):
+        return "%s in %s" % (self.column, self.values)
+
+    def mask(self, analyzer, rows):
+        return np.isin(analyzer.df[self.column].to_numpy()[rows], self.values)
+
+
+class ExpressionCondition(Condition):
+    """
+    Description
+    -----------
+    A part of a query expression, which is no single condition: ("and" | "or", [parts]) or ("not", part),
+    the parts being conditions or expressions again. It is evaluated as mask on the candidate rows.
+    """
+    def __init__(self, expression):
+        self.expression = expression
+
+    def describe(self):
+        return _describe(self.expression)
+
+    def mask(self, analyzer, rows):
+        return _evaluate(self.expression, analyzer, rows)
+
+
+def _describe(expression):
+    if isinstance(expression, Condition):
+        return expression.describe()
+    if expression[0] == "not":
+        return "not (%s)" % _describe(expression[1])
+    return (" %s " % expression[0]).join("(%s)" % _describe(part) for part in expression[1])
+
+
+def _columns(expression):
+    # the columns the expression depends on
+    if isinstance(expression, ExpressionCondition):
+        return _columns(expression.expression)
+    if isinstance(expression, Condition):
+        return [expression.column]
+    if expression[0] == "not":
+        return _columns(expression[1])
+    return [column for part in expression[1] for column in _columns(part)]
+
+
+def _evaluate(expression, analyzer, rows):
+    # the mask of the expression on the rows
+    if isinstance(expression, Condition):
+        return expression.mask(analyzer, rows)
+    if expression[0] == "not":
+        return ~_evaluate(expression[1], analyzer, rows)
+    masks = (_evaluate(part, analyzer, rows) for part in expression[1])
+    return np.logical_and.reduce(list(masks)) if expression[0] == "and" else np.logical_or.reduce(list(masks))
+
+
+OPERATORS = {"==": operator.eq, "!=": operator.ne, "<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge}
+SYMBOLS = {ast.Eq: "==", ast.NotEq: "!=", ast.Lt: "<", ast.LtE: "<=", ast.Gt: ">", ast.GtE: ">="}
+# the comparison with swapped sides, e.g. 100 <= likes --> likes >= 100
+MIRRORED = {"==": "==", "!=": "!=", "<": ">", "<=": ">=", ">": "<", ">=": "<="}
+NUMBER_COLUMNS = ["likes", "retweets", "id"]
+FUNCTIONS = {"has_hashtag": "hashtags", "has_mention": "linked_accounts"}
+
+
+def _error(node, message):
+    return TypeError("query Error: %s (column %d)" % (message, node.col_offset + 1))
+
+
+def _literal(node):
+    try:
+        return ast.literal_eval(node)
+    except ValueError:
+        raise _error(node, "expected a value, got %r" % ast.unparse(node)) from None
+
+
+def _members(node, column):
+    values = _literal(node)
+    if not isinstance(values, (list, tuple, set)):
+        raise _error(node, "%s in ... expects a list" % column)
+    return list(values)
+
+
+def _date_condition(symbol, value):
+    # date conditions are ranges [start, end) of the date index
+    date = pd.Timestamp(value)
+    after = date + pd.Timedelta(1, "ns")
+    bounds = {"==": (date, after), "<": (None, date), "<=": (None, after), ">": (after, None), ">=": (date, None)}
+    if symbol == "!=":
+        return ("not", DateCondition(date, after))
+    return DateCondition(*bounds[symbol])
+
+
+def _comparison(column, symbol, node):
+    # a condition (or ("not", condition)) for column <symbol> node, symbol being a comparison or "in" / "not in"
+    negated = symbol in ("!=", "not in")
+    if symbol in ("in", "not in"):
+        values = _members(node, column)
+    else:
+        values = [_literal(node)]
+
+    if column in NUMBER_COLUMNS:
+        if not all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in values):
+            raise _error(node, "%s is compared with numbers only" % column)
+        if symbol in ("in", "not in"):
+            condition = MemberCondition(column, values)
+        else:
+            return CompareCondition(column, symbol, values[0])
+    elif column == "date":
+        if symbol in ("in", "not in"):
+            raise _error(node, "date in ... is not supported, use date >= ... and date < ...")
+        try:
+            return _date_condition(symbol, values[0])
+        except (ValueError, TypeError):
+            raise _error(node, "%r is no date" % (values[0],)) from None
+    elif column in ("author", "tweet_type"):
+        if symbol not in ("==", "!=", "in", "not in"):
+            raise _error(node, "%s is compared with ==, !=, in and not in only" % column)
+        if column == "author":
+            condition = AuthorCondition(values)
+        else:
+            # "tweets" / "retweets" as in tweet_filter_tweet_type are accepted, too
+            types = [value[:-1] if value in ("tweets", "retweets") else value for value in values]
+            if not set(types) <= set(TWEET_TYPES):
+                raise _error(node, "tweet_type is one of %s" % TWEET_TYPES)
+            condition = ("or", [TweetTypeCondition(tweet_type) for tweet_type in types]) if len(types) != 1 else TweetTypeCondition(types[0])
+    else:
+        raise _error(node, "unknown column %r" % column)
+    return ("not", condition) if negated else condition
+
+
+def _compile(node):
+    if isinstance(node, ast.BoolOp):
+        return ("and" if isinstance(node.op, ast.And) else "or", [_compile(value) for value in node.values])
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+        return ("not", _compile(node.operand))
+    if isinstance(node, ast.Compare):
+        # chained comparisons (100 <= likes < 200) are a conjunction
+        parts = []
+        left = node.left
+        for op, right in zip(node.ops, node.comparators):
+            if isinstance(op, (ast.In, ast.NotIn)):
+                if not isinstance(left, ast.Name):
+                    raise _error(left, "expected a column left of in")
+                parts.append(_comparison(left.id, "in" if isinstance(op, ast.In) else "not in", right))
+            elif type(op) in SYMBOLS and isinstance(left, ast.Name):
+                parts.append(_comparison(left.id, SYMBOLS[type(op)], right))
+            elif type(op) in SYMBOLS and isinstance(right, ast.Name):
+                parts.append(_comparison(right.id, MIRRORED[SYMBOLS[type(op)]], left))
+            else:
+                raise _error(node, "expected a comparison of a column with a value")
+            left = right
+        return parts[0] if len(parts) == 1 else ("and", parts)
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and not node.keywords:
+        if node.func.id in FUNCTIONS:
+            values = [_literal(arg) for arg in node.args]
+            if not values or not all(isinstance(value, str) for value in values):
+                raise _error(node, "%s expects one or more strings" % node.func.id)
+            return EntityCondition(FUNCTIONS[node.func.id], values)
+        if node.func.id == "has_url" and not node.args:
+            return HyperlinkCondition(no_hyperlinks = False)
+    raise _error(node, "unsupported expression %r" % ast.unparse(node))
+
+
+def _conjunction(expression):
+    # the top level conditions of the expression, every one which is no condition wrapped into an ExpressionCondition
+    if isinstance(expression, Condition):
+        return [expression]
+    if expression[0] == "and":
+        return [condition for part in expression[1] for condition in _conjunction(part)]
+    return [ExpressionCondition(expression)]
+
+
+@lru_cache(maxsize = 256)
+def compile_query(expression):
+    """
+    Description
+    -----------
+    Parses a query expression and compiles it to the conditions of a QueryPlan (which are to be met all).
+    The conditions do not depend on the data, so the compiled expressions are cached and reused for every TweetAnalyzer.
+
+    The expressions are python expressions of:
+        comparisons             likes, retweets, id:    ==, !=, <, <=, >, >= numbers, in / not in lists of numbers
+                                date:                   ==, !=, <, <=, >, >= dates (str as accepted by pandas.Timestamp)
+                                author, tweet_type:     ==, != str, in / not in lists of str
+                                chained comparisons like 100 <= likes < 1000
+        functions               has_hashtag('a', 'b', ...), has_mention('a', ...): contains any of the hashtags / linked accounts
+                                has_url(): contains a hyperlink
+        combined by             and, or, not, (...)
+
+    Parameters
+    ----------
+    expression:             type = str
+
+    Returns
+    -------
+    <class 'tuple'>
+
+        --> The conditions (<class 'yatclient.query.Condition'>)
+
+    Example(s)
+    ----------
+        >>>> compile_query("likes >= 100 and author in ['spdde', 'fdp'] and has_hashtag('klima') and date >= '2019-05-01'")
+    """
+    try:
+        tree = ast.parse(expression.strip(), mode = "eval")
+    except SyntaxError as error:
+        raise TypeError("query Error: invalid syntax (column %s)" % error.offset) from None
+    return tuple(_conjunction(_compile(tree.body)))
+
+
+class QueryPlan:
+    """
+    Description
+    -----------
+    A lazy chain of filters on a TweetAnalyzer - it has the tweet_filter_* functions of the TweetAnalyzer
+    (without reset_drop_index and inplace), every one returns a new QueryPlan with the condition added.
+    Nothing is evaluated until collect() (or explain()) is called.
+
+    Example(s)
+    ----------
+        >>>> plan = tweet_analyzer.lazy().tweet_filter_likes(100).tweet_filter_hashtags(["klima"]).tweet_filter_tweet_type("tweets")
+        >>>> print(plan.explain())
+        >>>> klima_analyzer = plan.collect()
+    """
+    def __init__(self, analyzer, conditions = ()):
+        self.analyzer = analyzer
+        self.conditions = list(conditions)
+
+    def _add(self, condition, column):
+        if column not in self.analyzer.df.columns:
+            raise TypeError("Column " + column + " does not exists!")
+        return QueryPlan(self.analyzer, self.conditions + [condition])
+
+    def tweet_filter_hashtags(self, hashtags, all_in_one = False):
+        return self._add(EntityCondition("hashtags", hashtags, all_in_one), "hashtags")
+
+    def tweet_filter_linked_accounts(self, accountnames, all_in_one = False):
+        return self._add(EntityCondition("linked_accounts", accountnames, all_in_one), "linked_accounts")
+
+    def tweet_filter_likes(self, min_number_of_likes = 0, max_number_of_likes = None):
+        return self._add(RangeCondition("likes", min_number_of_likes, max_number_of_likes), "likes")
+
+    def tweet_filter_retweets(self, min_number_of_retweets = 0, max_number_of_retweets = None):
+        return self._add(RangeCondition("retweets", min_number_of_retweets, max_number_of_retweets), "retweets")
+
+    def tweet_filter_hyperlink_usage(self, no_hyperlinks = True):
+        return self._add(HyperlinkCondition(no_hyperlinks), "urls")
+
+    def tweet_filter_dates(self, start_date, end_date):
+        return self._add(DateCondition(start_date, end_date), "date")
+
+    def tweet_filter_account(self, accountname):
+        return self._add(AuthorCondition(accountname), "author")
+
+    def tweet_filter_tweet_type(self, obtain = "tweets"):
+        if obtain not in ("tweets", "retweets"):
+            raise TypeError('filter tweet_filter_tweet_type Error: Parameter "obtain" not correctly specified')
+        return self._add(TweetTypeCondition(obtain[:-1]), "tweet_type")
+
+    def query(self, expression):
+        """
+        Description
+        -----------
+        Returns a new QueryPlan with the conditions of a query expression added (see compile_query).
+        """
+        conditions = list(compile_query(expression))
+        for column in _columns(("and", conditions)):
+            if column not in self.analyzer.df.columns:
+                raise TypeError("Column " + column + " does not exists!")
+        return QueryPlan(self.analyzer, self.conditions + conditions)
+
+    def plan(self):
+        """
+        Description
+        -----------
+        Returns the conditions in the order of evaluation with their selectivity:
+        conditions with index first, then ascending by selectivity (the ones leaving the fewest rows first).
+        The rows of conditions with index are looked up right away (so their selectivity is exact), the others are estimated from a sample.
+
+        Returns
+        -------
+        <class 'list'>
+
+            --> [(condition, selectivity, row positions or None), ...]
+        """
+        n = len(self.analyzer.df)
+        steps = []
+        for condition in self.conditions:
+            if condition.indexed:
+                positions = condition.positions(self.analyzer)
+                steps.append((condition, len(positions) / n if n else 0.0, positions))
+            else:
+                steps.append((condition, condition.selectivity(self.analyzer), None))
+        return sorted(steps, key = lambda step: (not step[0].indexed, step[1]))
+
+    def positions(self):
+        """
+        Description
+        -----------
+        Evaluates the plan and returns the sorted row positions of the result (<class 'numpy.ndarray'>).
+        """
+        rows = None
+        for condition, _, positions in self.plan():
+            rows = _restrict(positions, rows, len(self.analyzer.df)) if condition.indexed else condition.filter(self.analyzer, rows)
+            if not len(rows):
+                break
+        return _all_rows(self.analyzer) if rows is None else rows
+
+    def collect(self, reset_drop_index = True, inplace = False):
+        """
+        Description
+        -----------
+        Evaluates the plan and creates the filtered dataframe (a single copy).
+
+        Parameters
+        ----------
+        reset_drop_index:           type = boolean
+                                    description = If True: the index of the filtered dataframe will be resetted and the old index dropped
+                                                  If False: the index will not be manipulated
+                                    default = True
+
+        inplace:                    type = boolean
+                                    description = If true, the TweetAnalyzer of the plan will be manipulated.
+                                                  Otherwise a new object will be created.
+                                    default = False
+
+        Returns
+        -------
+        If inplace = True:
+        None
+
+        Otherwise:
+        <class 'tweet_analyzer.TweetAnalyzer'>
+        """
+        positions = self.positions()
+        filtered_df = self.analyzer.df.iloc[positions]
+        if reset_drop_index:
+            filtered_df = filtered_df.reset_index(drop = True)
+        return self.analyzer._derive(filtered_df, positions, inplace)
+
+    def explain(self):
+        """
+        Description
+        -----------
+        Returns the plan as text: the conditions in the order of evaluation, whether an index is used,
+        their estimated selectivity and the estimated number of rows of the result (assuming independent conditions).
+        """
+        n = len(self.analyzer.df)
+        lines = ["QueryPlan over %d tweets" % n]
+        estimate = 1.0
+        for number, (condition, selectivity, _) in enumerate(self.plan(), 1):
+            estimate *= selectivity
+            lines.append("  %d. %-60s %-6s selectivity %6.2f%%" % (number, condition.describe(), "index" if condition.indexed else "scan",
+                                                                      100 * selectivity))
+        lines.append("estimated result: ~%d tweets" % round(estimate * n))
+        return "\n".join(lines)
+
+    def __repr__(self):
+        # explain() evaluates the conditions, the representation only lists them
+        return "QueryPlan(%d conditions%s)" % (len(self.conditions), "".join((": " if i == 0 else ", ") + type(condition).__name__
+                                                                              for i, condition in enumerate(self.conditions)))
@@ -0,0 +1,225 @@
+"""
+The canonical (compact) schema of the TweetAnalyzer dataframe.
+
+    tweets                  Arrow backed strings
+    author                  categorical, the categories (str) sorted
+    date                    datetime64[ns] (naive, UTC)
+    likes, retweets, id     int64
+    hashtags                list of dictionary encoded strings (Arrow), one entry per entity, e.g. [] or ["usa", "chicago"]
+    linked_accounts         as hashtags
+    urls                    as hashtags
+    tweet_type              categorical with the categories "tweet" and "retweet"
+
+Every constructor and reader of the TweetAnalyzer passes its dataframe through compact_schema. In files (csv, json, excel)
+the entity columns are stored as comma separated strings (see flat_schema), like the dataframes of former versions.
+"""
+from itertools import chain
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+COLUMNS = ["tweets", "author", "date", "likes", "retweets", "hashtags", "linked_accounts", "urls", "id", "tweet_type"]
+ENTITY_COLUMNS = ["hashtags", "linked_accounts", "urls"]
+INT_COLUMNS = ["likes", "retweets", "id"]
+TWEET_TYPES = ["tweet", "retweet"]
+
+TEXT_DTYPE = pd.StringDtype("pyarrow")
+ENTITY_DTYPE = pd.ArrowDtype(pa.list_(pa.dictionary(pa.int32(), pa.string())))
+TWEET_TYPE_DTYPE = pd.CategoricalDtype(TWEET_TYPES)
+DATE_DTYPE = np.dtype("datetime64[ns]")
+
+# format of created_at in the json payloads of the twitter API
+CREATED_AT_FORMAT = "%a %b %d %H:%M:%S +0000 %Y"
+MONTHS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+
+
+def parse_created_at(created):
+    """
+    Description
+    -----------
+    Vectorized parsing of created_at values of the twitter API (e.g. "Wed May 01 12:00:00 +0000 2019") to datetime64[ns] (UTC, naive).
+    As the values have a fixed width, the fields are cut out of all of them at once, other values fall back to pandas.to_datetime.
+
+    Parameters
+    ----------
+    created:                type = list of str
+
+    Returns
+    -------
+    <class 'numpy.ndarray'> or <class 'pandas.core.series.Series'>
+    """
+    try:
+        chars = np.array(created, dtype = "S30").view(np.uint8).reshape(-1, 30)
+    except (UnicodeEncodeError, TypeError, ValueError):
+        chars = None
+    if chars is None or not len(chars) or not ((chars[:, [3, 7, 10, 19, 25]] == ord(" ")).all() and (chars[:, 20] == ord("+")).all()
+                                              and (chars[:, [13, 16]] == ord(":")).all() and (chars[:, 29] >= ord("0")).all()):
+        return pd.to_datetime(pd.Series(created, dtype = object), format = CREATED_AT_FORMAT).astype(DATE_DTYPE)
+
+    digits = chars.astype(np.int64) - ord("0")
+    field = lambda start, stop: digits[:, start:stop] @ 10 ** np.arange(stop - start - 1, -1, -1)
+    keys = (chars[:, 4].astype(np.int64) << 16) | (chars[:, 5].astype(np.int64) << 8) | chars[:, 6]
+    month_keys = np.array([(ord(m[0]) << 16) | (ord(m[1]) << 8) | ord(m[2]) for m in MONTHS])
+    order = np.argsort(month_keys)
+    month = order[np.searchsorted(month_keys[order], keys).clip(0, 11)]
+    if (month_keys[month] != keys).any():
+        return pd.to_datetime(pd.Series(created, dtype = object), format = CREATED_AT_FORMAT).astype(DATE_DTYPE)
+    months = (field(26, 30) - 1970) * 12 + month
+    seconds = (field(8, 10) - 1) * 86400 + field(11, 13) * 3600 + field(14, 16) * 60 + field(17, 19)
+    return (months.astype("datetime64[M]").astype("datetime64[s]") + seconds).astype(DATE_DTYPE)
+
+
+def _list_array(lengths, values):
+    # builds the entity column from the number of entities per row and the flat (string) values
+    offsets = np.zeros(len(lengths) + 1, dtype = np.int32)
+    np.cumsum(lengths, out = offsets[1:])
+    return pd.arrays.ArrowExtensionArray(pa.ListArray.from_arrays(pa.array(offsets), pc.dictionary_encode(values)))
+
+
+def _entity_items(value):
+    if isinstance(value, str):
+        return [item.strip() for item in value.split(",") if item.strip()]
+    if value is None or (np.ndim(value) == 0 and pd.isna(value)):
+        return []
+    return [str(item) for item in value]
+
+
+def entity_array(values):
+    """
+    Description
+    -----------
+    Converts the values of an entity column (hashtags, linked_accounts, urls) to the compact list type.
+
+    Parameters
+    ----------
+    values:                 type = <class 'pandas.core.series.Series'> or list
+                            description = Per tweet: a list of entities, a comma separated string of entities (as in csv files) or NaN/None
+
+    Returns
+    -------
+    <class 'pandas.core.arrays.arrow.array.ArrowExtensionArray'>
+    """
+    if isinstance(values, pd.Series):
+        if values.dtype == ENTITY_DTYPE:
+            return values.array
+        if pd.api.types.infer_dtype(values, skipna = True) in ("string", "empty"):
+            # comma separated strings: split all of them at once
+            strings = pa.array(values.to_numpy(dtype = object, na_value = ""), type = pa.string())
+            pieces = pc.split_pattern(strings, ",")
+            items = pc.utf8_trim_whitespace(pc.list_flatten(pieces))
+            keep = pc.not_equal(items, "")
+            parents = pc.list_parent_indices(pieces).filter(keep).to_numpy()
+            return _list_array(np.bincount(parents, minlength = len(values)), items.filter(keep))
+    rows = [_entity_items(value) for value in values]
+    return _list_array([len(row) for row in rows], pa.array(list(chain.from_iterable(rows)), type = pa.string()))
+
+
+def entity_values(series):
+    """
+    Description
+    -----------
+    Flattens an entity column.
+
+    Returns
+    -------
+    <class 'tuple'>
+
+        --> (position of the row of every entity as <class 'numpy.ndarray'>, the entities as <class 'pyarrow.ChunkedArray'>)
+    """
+    lists = pa.chunked_array(entity_array(series).__arrow_array__())
+    return pc.list_parent_indices(lists).to_numpy(), pc.list_flatten(lists)
+
+
+def entity_lengths(series):
+    """
+    Description
+    -----------
+    Returns the number of entities per row of an entity column as <class 'numpy.ndarray'>.
+    """
+    return pc.list_value_length(pa.chunked_array(entity_array(series).__arrow_array__())).to_numpy()
+
+
+def _is_compact(column, dtype):
+    if column == "tweets":
+        return dtype == TEXT_DTYPE
+    if column == "author":
+        return isinstance(dtype, pd.CategoricalDtype) and dtype.categories.dtype == "str" and dtype.categories.is_monotonic_increasing
+    if column == "tweet_type":
+        return dtype == TWEET_TYPE_DTYPE
+    if column == "date":
+        return dtype == DATE_DTYPE
+    if column in INT_COLUMNS:
+        return dtype == np.int64
+    if column in ENTITY_COLUMNS:
+        return dtype == ENTITY_DTYPE
+    return True
+
+
+def _convert(column, series):
+    # returns the series in the compact type of the column
+    if column == "tweets":
+        return series.astype(TEXT_DTYPE).fillna("")
+    if column == "author":
+        if not isinstance(series.dtype, pd.CategoricalDtype):
+            series = series.astype("category")
+        # the categories of arrow dictionaries (csv files, datasets, archives) are arrow strings in the order first seen
+        categories = pd.Index(np.asarray(series.cat.categories, dtype = object), dtype = str)
+        return series.cat.rename_categories(categories).cat.reorder_categories(categories.sort_values())
+    if column == "tweet_type":
+        return series.astype(str).astype(TWEET_TYPE_DTYPE)
+    if column == "date":
+        # one unit for every reader (pandas parses to us, the twitter dates are in s), so their dataframes are equal
+        if isinstance(series.dtype, pd.DatetimeTZDtype):
+            return series.dt.tz_convert(None).astype(DATE_DTYPE)
+        if pd.api.types.is_numeric_dtype(series):
+            return pd.to_datetime(series, unit = "ms").astype(DATE_DTYPE)
+        return pd.to_datetime(series).astype(DATE_DTYPE)
+    if column in INT_COLUMNS:
+        return pd.to_numeric(series).fillna(0).astype(np.int64)
+    return pd.Series(entity_array(series), index = series.index, name = series.name)
+
+
+def compact_schema(df):
+    """
+    Description
+    -----------
+    Converts the columns of a TweetAnalyzer dataframe to the canonical schema (see the module description).
+    Columns already in it are left untouched (no copy), other columns than the ones of tweets_to_dataframe are kept as they are.
+
+    Parameters
+    ----------
+    df:                     type = <class 'pandas.core.frame.DataFrame'> or None
+
+    Returns
+    -------
+    <class 'pandas.core.frame.DataFrame'> (the df itself, if it is compact already) or None
+
+    Example(s)
+    ----------
+        >>>> df = compact_schema(pd.read_csv("tweets2019-07-05_h12.43.csv"))
+    """
+    if df is None:
+        return None
+    dtypes = df.dtypes
+    stale = [column for column in df.columns.intersection(COLUMNS) if not _is_compact(column, dtypes[column])]
+    if not stale:
+        return df
+    df = df.copy(deep = False)
+    for column in stale:
+        df[column] = _convert(column, df[column])
+    return df
+
+
+def flat_schema(df):
+    """
+    Description
+    -----------
+    The counterpart to compact_schema for files: returns a copy of the dataframe with the entity columns as comma separated strings.
+    """
+    df = df.copy(deep = False)
+    for column in df.columns.intersection(ENTITY_COLUMNS):
+        lists = pa.chunked_array(entity_array(df[column]).__arrow_array__())
+        df[column] = pd.Series(pc.binary_join(lists.cast(pa.list_(pa.string())), ", ").to_pandas(), index = df.index, dtype = TEXT_DTYPE)
+    return df
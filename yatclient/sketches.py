@@ -0,0 +1,374 @@
+"""
+Streaming top-k counts (heavy hitters) of hashtags, linked accounts and words.
+
+The sketches consume the tweets batch by batch (e.g. the chunks of TweetAnalyzer.iter_csv or the tweets of a live stream)
+and need a fixed amount of memory, whatever the number of tweets:
+
+    SpaceSaving         The k most frequent items with their counts. The count of an item is too high by at most its error,
+                        and every error is at most n / k (n = the number of items counted): every item occurring more than
+                        n / k times is in the summary.
+    CountMinSketch      The count of any item, too high by at most epsilon * n with probability 1 - delta (never too low).
+    HeavyHitters        Both of them for the hashtags, linked accounts and words of the tweets, overall and per author.
+"""
+import heapq
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from .cleaning import STOPWORDS_DE, STOPWORDS_ENG, WORD_CLEANING, cleaning_pipeline, text_array, tokenize
+from .schema import compact_schema, entity_values
+
+# kind of item --> its column in the frequency frames (like TweetAnalyzer.bagofwords)
+KINDS = {"hashtags": "hashtags", "linked_accounts": "accounts", "words": "words"}
+
+
+class SpaceSaving:
+    """
+    Description
+    -----------
+    Space-Saving summary (Metwally et al.): at most k counters. An item without counter takes the one of the least counted item
+    and starts at its count, so counts are upper bounds: count - error <= true count <= count, error <= n / k.
+    Given a better upper bound of its count so far (e.g. of a CountMinSketch), the reported count and error start at that one
+    instead (the counters themselves are kept as they are, so the bounds of the items without counter hold). Items whose bound
+    does not exceed the smallest count do not take a counter at all.
+    """
+    def __init__(self, k = 100):
+        """
+        Parameters
+        ----------
+        k:                      type = int
+                                description = Number of counters
+                                default = 100
+        """
+        self.k = k
+        self.n = 0
+        self.counts = {}
+        self.errors = {}
+        # counter - reported count of every item (see update: bounds)
+        self.excess = {}
+        # (count, item), entries of items counted since are outdated and skipped
+        self._heap = []
+
+    def __len__(self):
+        return len(self.counts)
+
+    def __contains__(self, item):
+        return item in self.counts
+
+    def __repr__(self):
+        return "SpaceSaving(k=%d, %d items of %d)" % (self.k, len(self.counts), self.n)
+
+    @property
+    def minimum(self):
+        """
+        Description
+        -----------
+        The upper bound of the count of items without counter: the smallest count if all counters are taken, otherwise 0.
+        """
+        if len(self.counts) < self.k:
+            return 0
+        while self._heap[0][0] != self.counts.get(self._heap[0][1]):
+            heapq.heappop(self._heap)
+        return self._heap[0][0]
+
+    def _add(self, item, weight, bound):
+        if item in self.counts:
+            self.counts[item] += weight
+        elif len(self.counts) < self.k:
+            self.counts[item] = weight
+            self.errors[item] = 0
+            self.excess[item] = 0
+        else:
+            minimum = self.minimum
+            if bound + weight <= minimum:
+                # the item is not counted more often than the items without counter anyway, it keeps none
+                return
+            _, victim = heapq.heappop(self._heap)
+            del self.counts[victim], self.errors[victim], self.excess[victim]
+            self.counts[item] = minimum + weight
+            self.errors[item] = min(minimum, bound)
+            self.excess[item] = minimum - self.errors[item]
+        heapq.heappush(self._heap, (self.counts[item], item))
+
+    def update(self, items, bounds = None):
+        """
+        Description
+        -----------
+        Counts items.
+
+        Parameters
+        ----------
+        items:                  type = <class 'pandas.core.series.Series'> or iterable
+                                description = item --> number of occurrences (e.g. of value_counts, in any order), or the items themselves
+
+        bounds:                 type = <class 'numpy.ndarray'> or None
+                                description = Upper bounds of the counts of the items before this update (in the order of items),
+                                              e.g. CountMinSketch.estimate. If None: only the summary bounds them.
+                                default = None
+        """
+        if not isinstance(items, pd.Series):
+            items = pd.Series(list(items), dtype = object).value_counts()
+        bounds = np.full(len(items), np.inf) if bounds is None else np.asarray(bounds)
+        # the most frequent items first: otherwise the counters taken by them early in the batch could be handed on
+        # to the rare items seen before them, instead of the other way round
+        order = np.argsort(-items.to_numpy(), kind = "stable")
+        for item, weight, bound in zip(items.index[order], items.to_numpy()[order].tolist(), bounds[order].tolist()):
+            self._add(item, weight, bound)
+        self.n += int(items.sum())
+        if len(self._heap) > 4 * self.k + 64:
+            # drop the outdated entries
+            self._heap = [(count, item) for item, count in self.counts.items()]
+            heapq.heapify(self._heap)
+
+    def estimate(self, item):
+        """
+        Description
+        -----------
+        Returns the upper bound of the count of item.
+        """
+        if item in self.counts:
+            return self.counts[item] - self.excess[item]
+        return self.minimum
+
+    def top(self, count = 20):
+        """
+        Description
+        -----------
+        Returns the count most frequent items.
+
+        Returns
+        -------
+        <class 'pandas.core.frame.DataFrame'>
+
+            --> columns item, count (upper bound) and error (count - error is a lower bound),
+                in descending order of the counts (items with the same count in alphabetical order)
+        """
+        top = pd.DataFrame({"item": list(self.counts), "count": [self.counts[item] - self.excess[item] for item in self.counts],
+                            "error": [self.errors[item] for item in self.counts]}, columns = ["item", "count", "error"])
+        top = top.astype({"count": np.int64, "error": np.int64}).sort_values("item", kind = "stable")
+        return top.sort_values("count", ascending = False, kind = "stable").head(count).reset_index(drop = True)
+
+
+class CountMinSketch:
+    """
+    Description
+    -----------
+    Count-Min sketch (Cormode and Muthukrishnan): depth rows of width counters, every row with a hash function of its own.
+    An item is counted in one counter per row, its count is the smallest of them: never too low and, with probability
+    1 - delta, too high by at most epsilon * n (n = the number of items counted).
+    """
+    def __init__(self, epsilon = 0.001, delta = 0.01, seed = 0):
+        """
+        Parameters
+        ----------
+        epsilon:                type = float
+                                description = Error relative to the number of items counted (width = e / epsilon)
+                                default = 0.001
+
+        delta:                  type = float
+                                description = Probability of a larger error (depth = ln(1 / delta))
+                                default = 0.01
+
+        seed:                   type = int
+                                description = Seed of the hash functions
+                                default = 0
+        """
+        self.epsilon = epsilon
+        self.delta = delta
+        self.width = int(np.ceil(np.e / epsilon))
+        self.depth = int(np.ceil(np.log(1 / delta)))
+        self.table = np.zeros((self.depth, self.width), dtype = np.int64)
+        self.n = 0
+        # the keys of pandas' hash function (16 characters each)
+        self._keys = ["%016x" % key for key in np.random.default_rng(seed).integers(0, 2 ** 63, self.depth)]
+
+    def __repr__(self):
+        return "CountMinSketch(width=%d, depth=%d, %d items)" % (self.width, self.depth, self.n)
+
+    def _columns(self, items):
+        items = np.asarray(items, dtype = object)
+        return [(pd.util.hash_array(items, hash_key = key) % np.uint64(self.width)).astype(np.int64) for key in self._keys]
+
+    def update(self, items, weights = None):
+        """
+        Description
+        -----------
+        Counts items (list or <class 'numpy.ndarray'> of str), every one weights times (default: once).
+        """
+        weights = np.ones(len(items), dtype = np.int64) if weights is None else np.asarray(weights, dtype = np.int64)
+        for row, columns in enumerate(self._columns(items)):
+            np.add.at(self.table[row], columns, weights)
+        self.n += int(weights.sum())
+
+    def estimate(self, items):
+        """
+        Description
+        -----------
+        Returns the upper bounds of the counts of items (<class 'numpy.ndarray'>).
+        """
+        return np.min([self.table[row, columns] for row, columns in enumerate(self._columns(items))], axis = 0)
+
+
+class HeavyHitters:
+    """
+    Description
+    -----------
+    The most frequent hashtags, linked accounts and words of a stream of tweets, overall and per author, in bounded memory:
+    a SpaceSaving summary of k counters per kind, one of k_author counters per kind and author and CountMinSketches per kind
+    (of the items and of the pairs of author and item). The sketches bound the counts of items outside the summaries, so the
+    counts and errors of items taking a counter start at their count so far instead of the one of the least counted item.
+    Hashtags and linked accounts are counted lowercase, words are cleaned and tokenized like TweetAnalyzer.bagofwords
+    (without its stopwords).
+    """
+    def __init__(self, k = 1000, k_author = 100, epsilon = 0.001, delta = 0.01, stopOWN = []):
+        """
+        Parameters
+        ----------
+        k:                      type = int
+                                description = Counters per kind: items occurring more than n / k times are found (n = items counted)
+                                default = 1000
+
+        k_author:               type = int
+                                description = Counters per kind and author
+                                default = 100
+
+        epsilon, delta:         type = float
+                                description = Error bounds of the CountMinSketch
+                                default = 0.001, 0.01
+
+        stopOWN:                type = <class 'list'>
+                                description = Words not to count, besides the stopwords of TweetAnalyzer.bagofwords
+                                default = []
+        """
+        self.k = k
+        self.k_author = k_author
+        self.stopwords = frozenset(STOPWORDS_DE + STOPWORDS_ENG + stopOWN)
+        self.tweets = 0
+        self.overall = {kind: SpaceSaving(k) for kind in KINDS}
+        self.authors = {kind: {} for kind in KINDS}
+        self.sketches = {kind: CountMinSketch(epsilon, delta) for kind in KINDS}
+        self.author_sketches = {kind: CountMinSketch(epsilon, delta, seed = 1) for kind in KINDS}
+
+    def __repr__(self):
+        return "HeavyHitters(%d tweets, k=%d)" % (self.tweets, self.k)
+
+    def _items(self, df):
+        # kind --> (row of every item, the items as <class 'pyarrow.Array'>)
+        items = {}
+        for kind in ("hashtags", "linked_accounts"):
+            if kind in df.columns:
+                rows, entities = entity_values(df[kind])
+                items[kind] = (rows, pc.utf8_lower(entities.cast(pa.string())).combine_chunks())
+        if "tweets" in df.columns:
+            tokens = tokenize(cleaning_pipeline(**WORD_CLEANING).clean_array(text_array(df.tweets)), self.stopwords)
+            items["words"] = (pc.list_parent_indices(tokens).to_numpy(), pc.list_flatten(tokens).cast(pa.string()))
+        return items
+
+    def update(self, tweets):
+        """
+        Description
+        -----------
+        Counts the hashtags, linked accounts and words of a batch of tweets.
+
+        Parameters
+        ----------
+        tweets:                 type = <class 'tweet_analyzer.TweetAnalyzer'> or <class 'pandas.core.frame.DataFrame'>
+                                description = The tweets (a dataframe with the columns of TweetAnalyzer.tweets_to_dataframe)
+
+        Example(s)
+        ----------
+        1.
+            >>>> heavy_hitters = HeavyHitters(k = 200)
+            >>>> for chunk in TweetAnalyzer().iter_csv("archive.csv"):
+            >>>>     heavy_hitters.update(chunk)
+            >>>> heavy_hitters.top("hashtags", 20)
+
+        2.
+            >>>> for batch in twitter_client.iter_user_timeline_batches(start_date = "2019-06-10", end_date = "2019-06-21"):
+            >>>>     heavy_hitters.update(TweetAnalyzer(batch, keep_tweets = False))
+        """
+        df = compact_schema(tweets.df if hasattr(tweets, "df") else tweets)
+        authors = df.author.to_numpy(dtype = object) if "author" in df.columns else None
+        for kind, (rows, values) in self._items(df).items():
+            if not len(values):
+                continue
+            counts = pc.value_counts(values)
+            counts = pd.Series(counts.field("counts").to_numpy(), index = counts.field("values").to_numpy(zero_copy_only = False))
+            bounds = self.sketches[kind].estimate(counts.index.to_numpy())
+            self.sketches[kind].update(counts.index.to_numpy(), counts.to_numpy())
+            self.overall[kind].update(counts, bounds)
+            if authors is None:
+                continue
+            pairs = pd.DataFrame({"author": authors[rows], "item": values.to_numpy(zero_copy_only = False)}).value_counts()
+            keys = (pairs.index.get_level_values(0).astype(str) + "\x1f" + pairs.index.get_level_values(1)).to_numpy()
+            bounds = self.author_sketches[kind].estimate(keys)
+            self.author_sketches[kind].update(keys, pairs.to_numpy())
+            for author, positions in pairs.groupby(level = 0, sort = False).indices.items():
+                if author not in self.authors[kind]:
+                    self.authors[kind][author] = SpaceSaving(self.k_author)
+                self.authors[kind][author].update(pairs.iloc[positions].droplevel(0), bounds[positions])
+        self.tweets += len(df)
+
+    def _summary(self, kind, author):
+        if kind not in KINDS:
+            raise TypeError("HeavyHitters: kind has to be one of " + ", ".join(KINDS) + "!")
+        if author is None:
+            return self.overall[kind]
+        # an author without items has an empty summary
+        return self.authors[kind].get(author, SpaceSaving(self.k_author))
+
+    def top(self, kind = "hashtags", count = 20, author = None):
+        """
+        Description
+        -----------
+        Returns the most frequent items of a kind.
+
+        Parameters
+        ----------
+        kind:                   type = str
+                                description = "hashtags", "linked_accounts" or "words"
+                                default = "hashtags"
+
+        count:                  type = int
+                                description = Number of items
+                                default = 20
+
+        author:                 type = str or None
+                                description = If given: the most frequent items of the tweets of this author
+                                default = None
+
+        Returns
+        -------
+        <class 'pandas.core.frame.DataFrame'>
+
+            --> columns item, count and error (see SpaceSaving.top): the true count is between count - error and count
+
+        Example(s)
+        ----------
+        1.
+            >>>> heavy_hitters.top("linked_accounts", 20, author = "spdde")
+        """
+        return self._summary(kind, author).top(count)
+
+    def estimate(self, kind, item):
+        """
+        Description
+        -----------
+        Returns the upper bound of the overall count of an item (<class 'int'>), e.g. of a hashtag outside the top k.
+        """
+        return int(min(self._summary(kind, None).estimate(item), self.sketches[kind].estimate([item])[0]))
+
+    def frequency_frame(self, kind = "hashtags", count = None, author = None):
+        """
+        Description
+        -----------
+        Returns the counted items like the compressed view of TweetAnalyzer.bagofwords (columns words / hashtags / accounts,
+        count, index and index_perc, relative to the items of the summary), e.g. for TweetAnalyzer.plot_bar.
+        """
+        top = self._summary(kind, author).top(len(self._summary(kind, author)) if count is None else count)
+        frame = pd.DataFrame({KINDS[kind]: top["item"], "count": top["count"]})
+        frame['index'] = frame.index + 1
+        frame['index_perc'] = 100*frame['index']/max(len(frame), 1)
+        return frame
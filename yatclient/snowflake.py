@@ -0,0 +1,85 @@
+"""
+Conversion between tweet ids and timestamps.
+
+Since November 2010 twitter hands out "snowflake" ids: the bits above the lowest 22 hold the milliseconds since the
+twitter epoch (2010-11-04 01:42:54.657 UTC), so an id tells when the tweet was created and a date can be turned into an id bound.
+All datetimes are naive and in UTC, like the created_at of tweepy.
+"""
+import calendar
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+TWITTER_EPOCH_MS = 1288834974657
+TWITTER_EPOCH = datetime(2010, 11, 4, 1, 42, 54, 657000)
+# the oldest ids below this one are sequential (pre-snowflake) ids and do not encode a timestamp
+FIRST_SNOWFLAKE_ID = 29700859247
+
+
+def datetime_to_snowflake(date):
+    """
+    Description
+    -----------
+    Returns the lowest tweet id which can be handed out at the given (UTC) time.
+
+    Parameters
+    ----------
+    date:                   type = <class 'datetime.datetime'>
+                            description = Naive datetime in UTC, not before TWITTER_EPOCH
+
+    Returns
+    -------
+    <class 'int'>
+
+    Example(s)
+    ----------
+        >>>> datetime_to_snowflake(datetime(2019, 5, 1))
+        1123376484971446272
+    """
+    if date < TWITTER_EPOCH:
+        raise TypeError("Dates before the twitter epoch (2010-11-04) have no snowflake id!")
+    ms = calendar.timegm(date.timetuple()) * 1000 + date.microsecond // 1000
+    return (ms - TWITTER_EPOCH_MS) << 22
+
+
+def snowflake_to_datetime(tweet_id):
+    """
+    Description
+    -----------
+    Returns the (UTC) time a tweet id was handed out at, with millisecond precision, or None for pre-snowflake ids.
+    """
+    if tweet_id < FIRST_SNOWFLAKE_ID:
+        return None
+    return datetime(1970, 1, 1) + timedelta(milliseconds = (tweet_id >> 22) + TWITTER_EPOCH_MS)
+
+
+def snowflake_to_datetime64(ids):
+    """
+    Description
+    -----------
+    Vectorized version of snowflake_to_datetime, e.g. for the id column of a TweetAnalyzer dataframe.
+    Pre-snowflake ids become NaT.
+
+    Parameters
+    ----------
+    ids:                    type = array like of int (e.g. <class 'pandas.core.series.Series'>)
+
+    Returns
+    -------
+    <class 'pandas.core.series.Series'> (if a Series is passed, with its index) or <class 'pandas.core.indexes.datetimes.DatetimeIndex'>
+
+        --> datetime64 values with millisecond precision
+
+    Example(s)
+    ----------
+        >>>> df = tweet_analyzer.get_dataframe()
+        >>>> df["created_ms"] = snowflake_to_datetime64(df.id)
+    """
+    values = np.asarray(ids, dtype = np.int64)
+    ms = np.right_shift(values, 22) + TWITTER_EPOCH_MS
+    # float milliseconds are exact up to 2**53 and let NaN stand for the pre-snowflake ids
+    dates = pd.to_datetime(np.where(values < FIRST_SNOWFLAKE_ID, np.nan, ms.astype(np.float64)), unit = "ms")
+    if isinstance(ids, pd.Series):
+        return pd.Series(dates, index = ids.index, name = ids.name)
+    return dates
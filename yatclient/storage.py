@@ -0,0 +1,333 @@
+"""
+Columnar storage of TweetAnalyzer dataframes (see TweetAnalyzer.write_dataset and TweetAnalyzer.read_dataset).
+
+A dataset is a directory of Parquet (or Feather) files, partitioned by author and month:
+
+    tweets/author=cdu/month=2019-05/part-....parquet
+
+The files keep the compact schema (see yatclient.schema), so nothing has to be parsed on reading. Reads with conditions on
+author and date only open the files of the matching partitions, the conditions on the other columns are checked against the
+statistics of the files before the rows are read.
+
+An archive is a single uncompressed Feather (Arrow IPC) file, which is opened memory mapped (see TweetAnalyzer.write_archive
+and TweetAnalyzer.open_archive): the columns of the dataframe point into the file instead of being read and parsed, so
+opening takes the same time for any size and processes opening the same archive share its pages in the OS cache.
+
+csv files (as written by TweetAnalyzer.write_to_csv) are read typed and in chunks by pyarrow (see read_csv and iter_csv).
+"""
+import os
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as csv
+import pyarrow.dataset as ds
+import pyarrow.feather as feather
+
+from .schema import COLUMNS, ENTITY_COLUMNS, ENTITY_DTYPE, TEXT_DTYPE, compact_schema
+
+PARTITIONING = ds.partitioning(pa.schema([("author", pa.string()), ("month", pa.string())]), flavor = "hive")
+FORMATS = {"parquet": "parquet", "feather": "ipc"}
+
+# the types of the columns in csv files, the entity columns are split by compact_schema
+# and the dates (with or without zone offset, which may change within a file) are parsed by _csv_table
+CSV_TYPES = {"tweets": pa.string(), "author": pa.dictionary(pa.int32(), pa.string()), "date": pa.string(),
+             "likes": pa.int64(), "retweets": pa.int64(), "hashtags": pa.string(), "linked_accounts": pa.string(),
+             "urls": pa.string(), "id": pa.int64(), "tweet_type": pa.dictionary(pa.int32(), pa.string())}
+# the index column written by DataFrame.to_csv (named "Unnamed: 0" by pandas.read_csv)
+CSV_INDEX_COLUMNS = ["", "Unnamed: 0"]
+
+
+def to_table(df):
+    """
+    Description
+    -----------
+    Converts a TweetAnalyzer dataframe (compact schema) to a <class 'pyarrow.Table'>, without the pandas metadata and the index.
+    """
+    return pa.Table.from_pandas(compact_schema(df), preserve_index = False).replace_schema_metadata(None)
+
+
+def _types(arrow_type):
+    # the pandas types of the compact schema for the arrow columns, others are converted by pyarrow
+    if pa.types.is_list(arrow_type) or pa.types.is_large_list(arrow_type):
+        return ENTITY_DTYPE
+    if pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type):
+        return TEXT_DTYPE
+    return None
+
+
+def to_dataframe(table):
+    """
+    Description
+    -----------
+    Converts a <class 'pyarrow.Table'> (e.g. of to_table) to a TweetAnalyzer dataframe in the compact schema.
+    """
+    for column in table.column_names:
+        # lists of plain strings (datasets) get their dictionary back, comma separated strings (csv) are split by compact_schema
+        if column in ENTITY_COLUMNS and pa.types.is_list(table.schema.field(column).type) and table.schema.field(column).type != ENTITY_DTYPE.pyarrow_dtype:
+            table = table.set_column(table.column_names.index(column), column, table[column].cast(ENTITY_DTYPE.pyarrow_dtype))
+    # split_blocks: no consolidation of the columns into 2D blocks, so numeric columns without nulls are not copied
+    return compact_schema(table.to_pandas(types_mapper = _types, split_blocks = True))
+
+
+def _month(value):
+    return str(np.datetime64(pd.Timestamp(value), "M"))
+
+
+def write_dataset(df, path, file_format = "parquet", overwrite = False):
+    """
+    Description
+    -----------
+    Writes a TweetAnalyzer dataframe to a dataset directory, partitioned by author and month.
+
+    Parameters
+    ----------
+    df:                     type = <class 'pandas.core.frame.DataFrame'>
+
+    path:                   type = str
+                            description = The directory of the dataset (created if needed)
+
+    file_format:            type = str
+                            description = "parquet" or "feather"
+                            default = "parquet"
+
+    overwrite:              type = boolean
+                            description = If True: the partitions written replace the ones in the dataset.
+                                          If False: the files are added to the partitions (tweets written twice are read twice).
+                            default = False
+    """
+    if file_format not in FORMATS:
+        raise TypeError('write_dataset Error: Parameter "file_format" has to be one of ' + str(list(FORMATS)))
+    for column in ["author", "date"]:
+        if column not in df.columns:
+            raise TypeError("Column " + column + " does not exists!")
+    table = to_table(df)
+    # the dictionaries of the entity columns span all rows, every partition would store them in full
+    for column in ENTITY_COLUMNS:
+        if column in table.column_names:
+            table = table.set_column(table.column_names.index(column), column, table[column].cast(pa.list_(pa.string())))
+    table = table.append_column("month", pa.array(df.date.to_numpy().astype("datetime64[M]").astype(str)))
+    ds.write_dataset(table, path, format = FORMATS[file_format], partitioning = PARTITIONING,
+                     basename_template = "part-" + uuid.uuid4().hex + "-{i}." + file_format,
+                     existing_data_behavior = "delete_matching" if overwrite else "overwrite_or_ignore")
+
+
+def read_dataset(path, columns = None, authors = None, start_date = None, end_date = None,
+                 min_likes = None, max_likes = None, file_format = "parquet"):
+    """
+    Description
+    -----------
+    Reads the tweets of a dataset directory meeting the conditions (all of them), sorted by date.
+
+    Parameters
+    ----------
+    path:                   type = str
+                            description = The directory of the dataset
+
+    columns:                type = list of str or None
+                            description = The columns to read. If None: all of them.
+                            default = None
+
+    authors:                type = list of str or None
+                            description = Only the tweets of these accounts. If None: all accounts.
+                            default = None
+
+    start_date, end_date:   type = str, <class 'datetime.datetime'> or None
+                            description = Only the tweets with start_date <= date < end_date. None leaves the range open on that side.
+                            default = None
+
+    min_likes, max_likes:   type = int or None
+                            description = Only the tweets with min_likes <= likes <= max_likes. None leaves the range open on that side.
+                            default = None
+
+    file_format:            type = str
+                            description = "parquet" or "feather"
+                            default = "parquet"
+
+    Returns
+    -------
+    <class 'pandas.core.frame.DataFrame'>
+    """
+    if file_format not in FORMATS:
+        raise TypeError('read_dataset Error: Parameter "file_format" has to be one of ' + str(list(FORMATS)))
+    if not os.path.isdir(path):
+        raise FileNotFoundError(path)
+    dataset = ds.dataset(path, format = FORMATS[file_format], partitioning = PARTITIONING)
+    available = [column for column in dataset.schema.names if column != "month"]
+    if columns is None:
+        columns = [column for column in COLUMNS if column in available] + [column for column in available if column not in COLUMNS]
+    for column in columns:
+        if column not in available:
+            raise TypeError("Column " + str(column) + " does not exists!")
+
+    # the conditions on author and month select the files, the others are pushed down to the statistics of the files
+    conditions = []
+    if authors is not None:
+        conditions.append(ds.field("author").isin(list(authors)))
+    if start_date is not None:
+        conditions.append(ds.field("month") >= _month(start_date))
+        conditions.append(ds.field("date") >= pa.scalar(pd.Timestamp(start_date).as_unit("ns").value, pa.timestamp("ns")))
+    if end_date is not None:
+        conditions.append(ds.field("month") <= _month(end_date))
+        conditions.append(ds.field("date") < pa.scalar(pd.Timestamp(end_date).as_unit("ns").value, pa.timestamp("ns")))
+    if min_likes is not None:
+        conditions.append(ds.field("likes") >= min_likes)
+    if max_likes is not None:
+        conditions.append(ds.field("likes") <= max_likes)
+    condition = None
+    for part in conditions:
+        condition = part if condition is None else condition & part
+
+    table = dataset.to_table(columns = list(columns), filter = condition)
+    if "date" in columns:
+        table = table.sort_by([("date", "ascending")] + ([("id", "ascending")] if "id" in columns else []))
+    return to_dataframe(table)
+
+
+def write_archive(df, path):
+    """
+    Description
+    -----------
+    Writes a TweetAnalyzer dataframe to an archive: an uncompressed Feather (Arrow IPC) file, ready to be memory mapped.
+    """
+    table = to_table(df).unify_dictionaries()
+    # a single record batch: columns of several batches would have to be concatenated (copied) on opening
+    feather.write_feather(table, path, compression = "uncompressed", chunksize = max(len(table), 1))
+
+
+def open_archive(path, columns = None):
+    """
+    Description
+    -----------
+    Opens an archive written by write_archive memory mapped. Nothing is read on opening:
+    the numeric and date columns are numpy arrays on the pages of the file, the text and entity columns stay Arrow arrays
+    on them (decoded when accessed), only the codes of the categorical columns (author, tweet_type) are copied.
+
+    Parameters
+    ----------
+    path:                   type = str
+
+    columns:                type = list of str or None
+                            description = The columns to open. If None: all of them.
+                            default = None
+
+    Returns
+    -------
+    <class 'pandas.core.frame.DataFrame'>
+    """
+    table = feather.read_table(path, columns = columns, memory_map = True)
+    return to_dataframe(table)
+
+
+def _csv_batches(path, block_size):
+    # the record batches of a csv file (the tweets contain line breaks)
+    reader = csv.open_csv(path, read_options = csv.ReadOptions(block_size = block_size),
+                          parse_options = csv.ParseOptions(newlines_in_values = True),
+                          convert_options = csv.ConvertOptions(column_types = CSV_TYPES))
+    yield from reader
+
+
+def _csv_dates(dates):
+    # parses the date strings of a csv file to naive UTC timestamps; dates with zone offset (e.g. "+00:00") are converted to UTC
+    for date_type in [pa.timestamp("ns"), pa.timestamp("ns", tz = "UTC")]:
+        try:
+            return dates.cast(date_type).cast(pa.timestamp("ns"))
+        except pa.ArrowInvalid:
+            pass
+    # dates with and without offset mixed
+    return pa.chunked_array([pa.array(pd.to_datetime(dates.to_pandas(), utc = True, format = "ISO8601").dt.tz_convert(None), pa.timestamp("ns"))])
+
+
+def _csv_table(table):
+    table = table.drop_columns([column for column in CSV_INDEX_COLUMNS if column in table.column_names])
+    if "date" in table.column_names and pa.types.is_string(table.schema.field("date").type):
+        table = table.set_column(table.column_names.index("date"), "date", _csv_dates(table["date"]))
+    return table
+
+
+def _chunks(batches, chunksize):
+    # regroups the record batches into tables of chunksize rows (no copy)
+    buffered, rows = [], 0
+    for batch in batches:
+        buffered.append(batch)
+        rows += batch.num_rows
+        while rows >= chunksize:
+            table = pa.Table.from_batches(buffered)
+            yield table.slice(0, chunksize)
+            buffered, rows = table.slice(chunksize).to_batches(), rows - chunksize
+    if rows:
+        yield pa.Table.from_batches(buffered)
+
+
+def iter_csv(path, chunksize = 100000, report = None, block_size = 16 * 1024 ** 2):
+    """
+    Description
+    -----------
+    Reads a csv file of a TweetAnalyzer dataframe (see TweetAnalyzer.write_to_csv) typed and in chunks:
+    Only the chunk handed out (and a block of the file) is in memory.
+
+    Parameters
+    ----------
+    path:                   type = str
+
+    chunksize:              type = int
+                            description = The number of rows per chunk (the last one can have less)
+                            default = 100000
+
+    report:                 type = function or None
+                            description = Called after every chunk with the number of rows read so far and the seconds passed,
+                                          e.g. lambda rows, seconds: print("%d rows, %.0f rows/sec" % (rows, rows / seconds))
+                            default = None
+
+    block_size:             type = int
+                            description = The bytes of the file parsed at once (by several threads)
+                            default = 16 MB
+
+    Returns
+    -------
+    <class 'generator'>
+
+        --> The chunks as <class 'pandas.core.frame.DataFrame'> in the compact schema
+    """
+    start = time.perf_counter()
+    rows = 0
+    for table in _chunks(_csv_batches(path, block_size), chunksize):
+        df = to_dataframe(_csv_table(table))
+        rows += len(df)
+        if report is not None:
+            report(rows, time.perf_counter() - start)
+        yield df
+
+
+def read_csv(path, report = None, block_size = 16 * 1024 ** 2):
+    """
+    Description
+    -----------
+    Reads a csv file of a TweetAnalyzer dataframe (see TweetAnalyzer.write_to_csv) typed, in the compact schema.
+
+    Parameters
+    ----------
+    path:                   type = str
+
+    report:                 type = function or None
+                            description = Called once with the number of rows read and the seconds it took (see iter_csv)
+                            default = None
+
+    block_size:             type = int
+                            description = The bytes of the file parsed at once (by several threads)
+                            default = 16 MB
+
+    Returns
+    -------
+    <class 'pandas.core.frame.DataFrame'>
+    """
+    start = time.perf_counter()
+    batches = list(_csv_batches(path, block_size))
+    if not batches:
+        return compact_schema(pd.read_csv(path))
+    df = to_dataframe(_csv_table(pa.Table.from_batches(batches)))
+    if report is not None:
+        report(len(df), time.perf_counter() - start)
+    return df
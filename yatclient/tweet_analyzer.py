@@ -1,14 +1,21 @@
 
 #import twitter_credentials - comment style because in __init__
-import re
+import os
+import weakref
 
 import matplotlib.dates as mdates
 import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
+import pyarrow as pa
 from pandas.plotting import register_matplotlib_converters  # used in plot_trend
-from sklearn.feature_extraction.text import CountVectorizer
 
+from .indexes import INDEXES
+from .query import QueryPlan
+from . import storage
+from .cleaning import STOPWORDS_DE, STOPWORDS_ENG, TEXT_CACHE, WORD_CLEANING, cleaning_pipeline, fingerprint, term_matrix, text_array, tokenize
+from .corpus import Corpus
+from .schema import COLUMNS, TEXT_DTYPE, TWEET_TYPES, compact_schema, entity_array, entity_lengths, flat_schema, parse_created_at
 
 class TweetAnalyzer:
     """
@@ -17,11 +24,12 @@ class TweetAnalyzer:
     Functionality for analyzing and categorizing content from tweets.
     It is based on the TwitterClient Class, which returns the "raw" data.
     """
-    def __init__(self, tweets = None, df = None):
+    def __init__(self, tweets = None, df = None, keep_tweets = True):
         """
         Description
         -----------
         This class can be initialized via the data fetched by TwitterClient().get_user_timeline_tweets(): The raw tweet data.
+        Generators like TwitterClient().iter_user_timeline_tweets() work as well: the dataframe is built while the tweets are fetched.
         If no dataframe is provided, it will automaticly create a dataframe, including metadata (see function: tweets_to_dataframe)
 
         IMPORTANT:
@@ -41,6 +49,13 @@ class TweetAnalyzer:
                             description = Dataframe, which includes several meta data on every tweet
                             default = None
 
+        keep_tweets:        type = boolean
+                            description = If True: The raw tweets are kept in the object (attribute tweets).
+                                          A generator is collected into a list first, as it is exhausted once the dataframe is built.
+                                          If False: Only the dataframe is kept, the raw tweets can be freed right after it is built.
+                                                    Use it with a generator of tweets to keep the memory flat.
+                            default = True
+
         Returns
         -------
         <class 'tweet_analyzer.TweetAnalyzer'>
@@ -60,13 +75,16 @@ class TweetAnalyzer:
             >>>> tweets = twitter_client.get_user_timeline_tweets(start_date = 2019-06-10", end_date = "2019-06-21")
             >>>> tweet_analyzer = TwitterClient(tweets)
         """
-        if tweets == None:
+        self._indexes = {}
+        if tweets is None:
             self.tweets = tweets
-            self.df = df
+            self.df = compact_schema(df)
 
         else:
-            self.tweets = tweets
-            self.df = df if df is not None else self.tweets_to_dataframe(self.tweets)
+            if keep_tweets and iter(tweets) is tweets:
+                tweets = list(tweets)
+            self.tweets = tweets if keep_tweets else None
+            self.df = compact_schema(df) if df is not None else self.tweets_to_dataframe(tweets)
 
 ######DATAFRAME##################################################################################################################################
     def tweets_to_dataframe(self,tweets):
@@ -89,7 +107,7 @@ class TweetAnalyzer:
 
         Parameters
         ----------
-        tweets:             type = <class 'list'>
+        tweets:             type = <class 'list'> or any iterable of tweets
                             description = A list created by the TwitterClient Class which is using tweepy package to obtain the raw tweets via the twitter API
 
         Returns
@@ -107,25 +125,73 @@ class TweetAnalyzer:
             >>>> tweets = twitter_client.get_user_timeline_tweets(start_date = 2019-06-10", end_date = "2019-06-21")
             >>>> df = TweetAnalyzer().tweets_to_dataframe(tweets)
         """
-        L = []
-        for tweet in tweets:
-            L.append([tweet.full_text, tweet.user.screen_name, tweet.created_at,
-                                    tweet.retweeted_status.favorite_count if hasattr(tweet, 'retweeted_status') else tweet.favorite_count,
-                                    tweet.retweet_count,
-                                    ", ".join([hashtag_item['text'] for hashtag_item in tweet.entities['hashtags'] if tweet.entities["hashtags"]]),
-                                    ", ".join([mention["screen_name"] for mention in tweet.entities['user_mentions'] if tweet.entities["user_mentions"]]),
-                                    ", ".join([link['url'] for link in tweet.entities['urls'] if tweet.entities["urls"]]),
-                                    tweet.id,
-                                    "retweet" if hasattr(tweet, 'retweeted_status') else "tweet"
-                                    ])
-        return (pd.DataFrame(L, columns = ["tweets", "author", "date", "likes", "retweets", "hashtags", "linked_accounts", "urls", "id", "tweet_type"]))
+        return self.json_to_dataframe(tweet._json if hasattr(tweet, "_json") else tweet for tweet in tweets)
+
+    def json_to_dataframe(self, payloads):
+        """
+        Description
+        -----------
+        Creates the same dataframe as tweets_to_dataframe, straight from the json payloads of the tweets (as returned by the twitter API,
+        kept in the _json attribute of tweepy's Status, or stored by json.dump). tweets_to_dataframe runs through this function as well.
+
+        The values are collected column by column and converted to the compact schema (see yatclient.schema) at once:
+        int64 for likes, retweets and id, datetime64 for date, categoricals for author and tweet_type,
+        Arrow strings for the tweets and lists of dictionary encoded strings for hashtags, linked_accounts and urls.
+
+        Parameters
+        ----------
+        payloads:           type = iterable of <class 'dict'>
+                            description = The json payloads of the tweets (tweet_mode = "extended" or "compat")
+
+        Returns
+        -------
+        <class 'pandas.core.frame.DataFrame'>
+
+            --> A dataframe is returned, which includes several meta data on every tweet
+
+        Example(s)
+        ----------
+        1.
+            >>>> with open("tweets.json") as f:
+            >>>>     df = TweetAnalyzer().json_to_dataframe(json.load(f))
+        """
+        text, author, created, likes, retweets, hashtags, linked_accounts, urls, ids, retweeted = ([] for _ in range(10))
+        for tweet in payloads:
+            entities = tweet["entities"]
+            retweeted_status = tweet.get("retweeted_status")
+            text.append(tweet.get("full_text") or tweet.get("text"))
+            author.append(tweet["user"].get("screen_name"))
+            created.append(tweet["created_at"])
+            likes.append(tweet["favorite_count"] if retweeted_status is None else retweeted_status["favorite_count"])
+            retweets.append(tweet["retweet_count"])
+            hashtags.append([i["text"] for i in entities["hashtags"]])
+            linked_accounts.append([i["screen_name"] for i in entities["user_mentions"]])
+            urls.append([i["url"] for i in entities["urls"]])
+            ids.append(tweet["id"])
+            retweeted.append(retweeted_status is not None)
+
+        return pd.DataFrame({
+            "tweets": pd.array(text, dtype = TEXT_DTYPE),
+            "author": pd.Categorical(author),
+            "date": parse_created_at(created),
+            "likes": np.array(likes, dtype = np.int64),
+            "retweets": np.array(retweets, dtype = np.int64),
+            "hashtags": entity_array(hashtags),
+            "linked_accounts": entity_array(linked_accounts),
+            "urls": entity_array(urls),
+            "id": np.array(ids, dtype = np.int64),
+            "tweet_type": pd.Categorical.from_codes(np.array(retweeted, dtype = np.int8), categories = TWEET_TYPES),
+        }, columns = COLUMNS)
 
 ######MERGE DATAFRAME##################################################################################################################################
     def merge_dataframe(self, df_tomerge, inplace = False):
         """
         Description
         -----------
-        This function merges the dataframe in the object with other dataframes.
+        This function merges the dataframe in the object with other dataframes, the tweets are identified by their id:
+        Only tweets with ids not known yet are appended (once), in the order of the dataframes.
+        For tweets contained more than once, the highest numbers of likes and retweets are kept - the ones of the latest snapshot,
+        as they only grow.
 
         Parameters
         ----------
@@ -159,9 +225,32 @@ class TweetAnalyzer:
             Without inplace
             >>>> tweet_analyzer2 = tweet_analyzer.merge_dataframe(df_tomerge = [df_donaldtrump_2018, df_donaldtrump_2017], inplace = True)
         """
+        frames = [compact_schema(frame) for frame in df_tomerge]
+        for frame in [self.df] + frames:
+            if "id" not in frame.columns:
+                raise TypeError("Column id does not exists!")
+        new = pd.concat(frames, ignore_index = True) if frames else self.df.iloc[:0]
+        ids = new.id.to_numpy()
+        # row of every new tweet in the dataframe of the object (-1: unknown id), from the cached hash index of the ids
+        rows = self.get_index("id").lookup(ids)
+        known = rows >= 0
+
+        engagement = [column for column in ["likes", "retweets"] if column in self.df.columns and column in new.columns]
+
         df = self.df.copy()
-        for i in df_tomerge:
-            df = pd.concat([self.df, i]).drop_duplicates().reset_index(drop=True)
+        if known.any():
+            for column in engagement:
+                counts = df[column].to_numpy().copy()
+                np.maximum.at(counts, rows[known], new[column].to_numpy()[known])
+                df[column] = counts
+        new = new[~known]
+        duplicated = new.id.duplicated(keep = False)
+        if duplicated.any():
+            # the same unknown tweet in several frames: its first row is appended, with the highest counts
+            new = new.copy()
+            new.loc[duplicated, engagement] = new[duplicated].groupby("id")[engagement].transform("max")
+            new = new[~new.id.duplicated()]
+        df = compact_schema(pd.concat([df, new], ignore_index = True))
         if inplace:
             self.df = df
         else:
@@ -193,79 +282,374 @@ class TweetAnalyzer:
         """
         return self.df
 
+    def get_index(self, column):
+        """
+        Description
+        -----------
+        This function returns the index over a column of the dataframe (see yatclient.indexes), used by the filters:
+        * hashtags, linked_accounts: EntityIndex (entity --> row positions)
+        * author: AuthorIndex (account --> row positions)
+        * date: DateIndex (sorted dates, for date ranges)
+        * id: IdIndex (tweet id --> row position, used by merge_dataframe)
+
+        The index is built on first use and kept until the dataframe of the object is replaced (e.g. by an inplace filter).
+        If you change the dataframe itself (e.g. tweet_analyzer.df.loc[...] = ...), the index is outdated!
+
+        Parameters
+        ----------
+        column:             type = str
+                            description = Name of the column
+
+        Returns
+        -------
+        <class 'yatclient.indexes.EntityIndex'>, <class 'yatclient.indexes.AuthorIndex'>, <class 'yatclient.indexes.DateIndex'>
+        or <class 'yatclient.indexes.IdIndex'>
+
+        Example(s)
+        ----------
+        1.
+            >>>> tweet_analyzer = TweetAnalyzer(tweets)
+            >>>> tweet_analyzer.get_index("hashtags").lookup("usa")
+        """
+        if column not in INDEXES:
+            raise TypeError("There is no index for column " + str(column) + "!")
+        if column not in self.df.columns:
+            raise TypeError("Column " + str(column) + " does not exists!")
+        df_ref, index = self._indexes.get(column, (None, None))
+        if df_ref is None or df_ref() is not self.df:
+            index = INDEXES[column](self.df[column])
+            self._indexes[column] = (weakref.ref(self.df), index)
+        return index
+
+    def get_corpus(self):
+        """
+        Description
+        -----------
+        This function returns the tweets tokenized for bagofwords (cleaned like tweet_manipulation with only_small_letters,
+        delete_htmlent, delete_hyperlinks, delete_numbers, delete_hashtags and delete_accountlinks) as token ids (see yatclient.corpus).
+
+        The tweets are tokenized once: the corpus is kept like the indexes (see get_index) and shared by analyzers with the same tweets.
+        The results of the filters (tweet_filter_*, per_window, per_account, query) take their rows of it instead of tokenizing again.
+        All corpora number the words in the same vocabulary (yatclient.corpus.VOCABULARY).
+
+        Returns
+        -------
+        <class 'yatclient.corpus.Corpus'>
+
+        Example(s)
+        ----------
+        1.
+            >>>> tweet_analyzer = TweetAnalyzer(tweets)
+            >>>> tweet_analyzer.get_corpus().counts().head(10)
+        """
+        if "tweets" not in self.df.columns:
+            raise TypeError("Column tweets does not exists!")
+        df_ref, corpus = self._indexes.get("corpus", (None, None))
+        if df_ref is None or df_ref() is not self.df:
+            pipeline = cleaning_pipeline(**WORD_CLEANING)
+            values = text_array(self.df.tweets)
+            key = ("corpus", fingerprint(values), pipeline.key)
+            corpus = TEXT_CACHE.get(key)
+            if corpus is None:
+                corpus = TEXT_CACHE.set(key, Corpus.from_tokens(tokenize(pipeline.clean_array(values))))
+            self._indexes["corpus"] = (weakref.ref(self.df), corpus)
+        return corpus
+
+    def _derive(self, filtered_df, rows, inplace = False):
+        # the result of a filter: filtered_df consists of the rows (positions, boolean mask or slice) of self.df;
+        # the corpus (if there is one already) is passed on by selecting the rows
+        df_ref, corpus = self._indexes.get("corpus", (None, None))
+        if df_ref is None or df_ref() is not self.df:
+            corpus = None
+        if inplace:
+            self.df = filtered_df
+            analyzer = self
+        else:
+            analyzer = TweetAnalyzer(self.tweets, filtered_df)
+        if corpus is not None:
+            analyzer._indexes["corpus"] = (weakref.ref(analyzer.df), corpus.take(rows))
+        if not inplace:
+            return analyzer
+
 ######DATA IMPORT##################################################################################################################################
     def write_to_csv(self, *args, **kwargs):
         """
         Description
         -----------
         Write dataframe to a comma-separated values (csv) file.
+        The hashtags, linked_accounts and urls are written as comma separated strings.
 
         --> Uses the corresponding pandas function. Documentation can be found at:
             https://pandas.pydata.org/pandas-docs/stable/reference/api/pandas.DataFrame.to_csv.html
         """
-        self.df.to_csv(*args, **kwargs)
+        flat_schema(self.df).to_csv(*args, **kwargs)
 
     def write_to_json(self, *args, **kwargs):
         """
         Description
         -----------
         Convert the dataframe to a JSON string.
+        The hashtags, linked_accounts and urls are written as comma separated strings.
 
         --> Uses the corresponding pandas function. Documentation can be found at:
             https://pandas.pydata.org/pandas-docs/stable/reference/api/pandas.DataFrame.to_json.html
         """
-        self.df.to_json(*args, **kwargs)
+        flat_schema(self.df).to_json(*args, **kwargs)
 
     def write_to_excel(self, *args, **kwargs):
         """
         Description
         -----------
         Write dataframe to an Excel sheet.
+        The hashtags, linked_accounts and urls are written as comma separated strings.
 
         --> Uses the corresponding pandas function. Documentation can be found at:
             https://pandas.pydata.org/pandas-docs/stable/reference/api/pandas.DataFrame.to_excel.html
         """
-        self.df.to_excel(*args, **kwargs)
+        flat_schema(self.df).to_excel(*args, **kwargs)
 
 
-    def read_from_csv(self, *args, **kwargs):
+    def read_from_csv(self, *args, report = None, **kwargs):
         """
         Description
         -----------
         Read a comma-separated values (csv) file into a dataframe.
+        The dataframe is converted to the compact schema (see yatclient.schema).
 
-        --> Uses the corresponding pandas function. Documentation can be found at:
+        If only the path of the file is passed, the file is read typed by pyarrow (see yatclient.storage.read_csv): the dates,
+        numbers and categories are parsed while reading, by several threads. The index column written by write_to_csv is dropped.
+
+        --> Otherwise it uses the corresponding pandas function. Documentation can be found at:
             https://pandas.pydata.org/pandas-docs/stable/reference/api/pandas.read_csv.html
+
+        Parameters
+        ----------
+        report:             type = function
+                            description = Called with the number of rows read and the seconds it took
+                                          (only if only the path of the file is passed), e.g.
+                                          lambda rows, seconds: print("%d rows, %.0f rows/sec" % (rows, rows / seconds))
+                            default = None
+
+        Example(s)
+        ----------
+        1.
+            >>>> tweet_analyzer = TweetAnalyzer()
+            >>>> tweet_analyzer.read_from_csv("tweets2019-07-05_h12.43.csv")
+        2.
+            >>>> tweet_analyzer.read_from_csv("tweets.csv", sep = ";")
         """
-        self.df = pd.read_csv(*args, **kwargs)
-        self.df.fillna("", inplace = True)
-        self.df.date = pd.to_datetime(self.df.date)
+        if len(args) == 1 and not kwargs and isinstance(args[0], (str, os.PathLike)):
+            self.df = storage.read_csv(args[0], report = report)
+        else:
+            self.df = compact_schema(pd.read_csv(*args, **kwargs))
+
+    def iter_csv(self, path, chunksize = 100000, report = None):
+        """
+        Description
+        -----------
+        Reads a csv file (as written by write_to_csv) typed and in chunks: Every chunk is a TweetAnalyzer on its own, so it can be
+        filtered and aggregated without having the whole file in memory (see yatclient.storage.iter_csv).
+
+        Parameters
+        ----------
+        path:               type = str
+                            description = The path of the csv file
+
+        chunksize:          type = int
+                            description = The number of tweets per chunk
+                            default = 100000
+
+        report:             type = function
+                            description = Called after every chunk with the number of rows read so far and the seconds passed,
+                                          e.g. lambda rows, seconds: print("%d rows, %.0f rows/sec" % (rows, rows / seconds))
+                            default = None
+
+        Returns
+        -------
+        <class 'generator'>
+
+            --> Yields a <class 'tweet_analyzer.TweetAnalyzer'> per chunk
+
+        Example(s)
+        ----------
+        The likes per account of the tweets with the hashtag klima:
+
+        1.
+            >>>> likes = {}
+            >>>> for chunk in TweetAnalyzer().iter_csv("tweets.csv", chunksize = 500000):
+            >>>>     for account, analyzer in chunk.tweet_filter_hashtags(["klima"]).per_account().items():
+            >>>>         likes[account] = likes.get(account, 0) + analyzer.df.likes.sum()
+        """
+        for df in storage.iter_csv(path, chunksize = chunksize, report = report):
+            yield TweetAnalyzer(self.tweets, df)
 
     def read_from_json(self, *args, **kwargs):
         """
         Description
         -----------
         Convert a JSON string to a dataframe.
+        The dataframe is converted to the compact schema (see yatclient.schema).
 
         --> Uses the corresponding pandas function. Documentation can be found at:
             https://pandas.pydata.org/pandas-docs/stable/reference/api/pandas.read_json.html
         """
-        self.df = pd.read_json(*args, **kwargs)
-        self.df.fillna("", inplace = True)
-        self.df.date = pd.to_datetime(self.df.date)
+        self.df = compact_schema(pd.read_json(*args, **kwargs))
 
     def read_from_excel(self, *args, **kwargs):
         """
         Description
         -----------
         Read an Excel file into a dataframe.
+        The dataframe is converted to the compact schema (see yatclient.schema).
 
         --> Uses the corresponding pandas function. Documentation can be found at:
             https://pandas.pydata.org/pandas-docs/stable/reference/api/pandas.read_excel.html
         """
-        self.df = pd.read_excel(*args, **kwargs)
-        self.df.fillna("", inplace = True)
-        self.df.date = pd.to_datetime(self.df.date)
+        self.df = compact_schema(pd.read_excel(*args, **kwargs))
+
+    def write_dataset(self, path, file_format = "parquet", overwrite = False):
+        """
+        Description
+        -----------
+        Writes the dataframe to a columnar dataset: a directory of Parquet (or Feather) files, partitioned by author and month
+        (e.g. path/author=cdu/month=2019-05/part-....parquet). In contrast to csv files, the types of the columns are kept and
+        read_dataset can load parts of it without parsing the rest (see yatclient.storage).
+
+        Parameters
+        ----------
+        path:               type = str
+                            description = The directory of the dataset (created if needed)
+
+        file_format:        type = str
+                            description = "parquet" or "feather"
+                            default = "parquet"
+
+        overwrite:          type = boolean
+                            description = If True: the partitions (author and month) written replace the ones in the dataset.
+                                          If False: the files are added to the existing partitions.
+                            default = False
+
+        Returns
+        -------
+        None
+
+        Example(s)
+        ----------
+        1.
+            >>>> tweet_analyzer = TweetAnalyzer(tweets)
+            >>>> tweet_analyzer.write_dataset("tweets")
+        """
+        storage.write_dataset(self.df, path, file_format = file_format, overwrite = overwrite)
+
+    def read_dataset(self, path, columns = None, authors = None, start_date = None, end_date = None,
+                     min_likes = None, max_likes = None, file_format = "parquet"):
+        """
+        Description
+        -----------
+        Reads the tweets meeting the conditions from a dataset written by write_dataset into the dataframe, sorted by date.
+        Only the files of the partitions of the authors and months asked for are opened, only the columns asked for are read.
+
+        Parameters
+        ----------
+        path:               type = str
+                            description = The directory of the dataset
+
+        columns:            type = list of str
+                            description = The columns to read. If None: all of them.
+                            default = None
+
+        authors:            type = list of str
+                            description = Only the tweets of these accounts are read. If None: the tweets of all accounts.
+                            default = None
+
+        start_date:         type = str or <class 'datetime.datetime'>
+                            description = Only the tweets with start_date <= date are read. If None: no lower bound.
+                            default = None
+
+        end_date:           type = str or <class 'datetime.datetime'>
+                            description = Only the tweets with date < end_date are read. If None: no upper bound.
+                            default = None
+
+        min_likes:          type = int
+                            description = Only the tweets with at least min_likes likes are read. If None: no lower bound.
+                            default = None
+
+        max_likes:          type = int
+                            description = Only the tweets with at most max_likes likes are read. If None: no upper bound.
+                            default = None
+
+        file_format:        type = str
+                            description = "parquet" or "feather"
+                            default = "parquet"
+
+        Returns
+        -------
+        None
+
+        Example(s)
+        ----------
+        The CDU tweets from May 2019:
+
+        1.
+            >>>> tweet_analyzer = TweetAnalyzer()
+            >>>> tweet_analyzer.read_dataset("tweets", authors = ["cdu"], start_date = "2019-05-01", end_date = "2019-06-01")
+        """
+        self.df = storage.read_dataset(path, columns = columns, authors = authors, start_date = start_date, end_date = end_date,
+                                       min_likes = min_likes, max_likes = max_likes, file_format = file_format)
+
+    def write_archive(self, path):
+        """
+        Description
+        -----------
+        Writes the dataframe to an archive: a single uncompressed Feather (Arrow IPC) file, which open_archive opens memory mapped.
+
+        Parameters
+        ----------
+        path:               type = str
+                            description = The file of the archive (e.g. "tweets2019.feather")
+
+        Returns
+        -------
+        None
+
+        Example(s)
+        ----------
+        1.
+            >>>> tweet_analyzer = TweetAnalyzer(tweets)
+            >>>> tweet_analyzer.write_archive("tweets2019.feather")
+        """
+        storage.write_archive(self.df, path)
+
+    def open_archive(self, path, columns = None):
+        """
+        Description
+        -----------
+        Opens an archive written by write_archive as the dataframe, memory mapped: nothing is read or parsed on opening,
+        so it takes the same time for any size of the archive.
+        The numeric and date columns are numpy arrays on the pages of the file, the text and entity columns stay Arrow arrays on them
+        and are decoded when accessed. Several processes opening the same archive share the pages via the OS cache.
+        The archive must not be overwritten while it is open.
+
+        Parameters
+        ----------
+        path:               type = str
+                            description = The file of the archive
+
+        columns:            type = list of str
+                            description = The columns to open. If None: all of them.
+                            default = None
+
+        Returns
+        -------
+        None
+
+        Example(s)
+        ----------
+        1.
+            >>>> tweet_analyzer = TweetAnalyzer()
+            >>>> tweet_analyzer.open_archive("tweets2019.feather")
+        """
+        self.df = storage.open_archive(path, columns = columns)
 
 ######FILTER##################################################################################################################################
     def tweet_filter_hashtags(self, hashtags, all_in_one = False, reset_drop_index = True, inplace = False):
@@ -331,36 +715,69 @@ class TweetAnalyzer:
         """
         if "hashtags" not in self.df.columns:
             raise TypeError("Column hashtags does not exists!")
-        if all_in_one:
-            filtered_df = self.df.copy()
-            for i in hashtags:
-                filtered_df = filtered_df[filtered_df.hashtags.apply(lambda x: re.search("(?:^|\W)"+i+"(?:$|\W)",x) != None)]
-            if reset_drop_index:
-                filtered_df.reset_index(inplace=True, drop=True)
-            if inplace:
-                self.df = filtered_df
-            else:
-                return TweetAnalyzer(self.tweets, filtered_df)
-        else:
-            if (len(hashtags) == 1):
-                filtered_df = self.df[self.df.hashtags.apply(lambda x: re.search("(?:^|\W)"+hashtags[0]+"(?:$|\W)",x) != None)]
-                if reset_drop_index:
-                    filtered_df.reset_index(inplace=True, drop=True)
-                if inplace:
-                    self.df = filtered_df
-                else:
-                    return TweetAnalyzer(self.tweets, filtered_df)
-            else:
-                filtered_df = self.df[self.df.hashtags.apply(lambda x: re.search("(?:^|\W)"+hashtags[0]+"(?:$|\W)",x) != None)]
-                for i in range(1, len(hashtags)):
-                    df_append = self.df[self.df.hashtags.apply(lambda x: re.search("(?:^|\W)"+hashtags[i]+"(?:$|\W)",x) != None)]
-                    filtered_df = filtered_df.append(df_append)
-                if reset_drop_index:
-                    filtered_df.reset_index(inplace=True, drop=True)
-                if inplace:
-                    self.df = filtered_df
-                else:
-                    return TweetAnalyzer(self.tweets, filtered_df)
+        index = self.get_index("hashtags")
+        rows = index.intersection(hashtags) if all_in_one else index.union(hashtags)
+        filtered_df = self.df.iloc[rows]
+        if reset_drop_index:
+            filtered_df.reset_index(inplace=True, drop=True)
+        return self._derive(filtered_df, rows, inplace)
+
+    def tweet_filter_linked_accounts(self, accountnames, all_in_one = False, reset_drop_index = True, inplace = False):
+        """
+        Description
+        -----------
+        This function filters the meta data dataframe according to linked accounts (mentions like @realDonaldTrump).
+
+        Parameters
+        ----------
+        accountnames:       type = list
+                            description = A list of account names (without @) the user wants to filter for
+
+        all_in_one:         type = boolean
+                            description = If True, only tweets which link all! accounts in the list are obtained
+                                      If False, tweets which link one or more accounts in the list are obtained
+                            default = False
+
+        reset_drop_index:   type = boolean
+                            description = If True: the index of the filtered dataframe will be resetted and the old index dropped.
+                                          If False: the index will not be manipulated.
+                            default = True
+
+        inplace:            type = boolean
+                            description = If true, the existing object will be manipulated.
+                                          Otherwise a new object will be created.
+                            default = False
+
+        Returns
+        -------
+        If inplace = True:
+        None
+            --> Existing object will be manipulated
+
+        Otherwise:
+        <class 'tweet_analyzer.TweetAnalyzer'>
+
+            --> A new object is returned
+
+        Example(s)
+        ----------
+        The following example obtains the tweets of the parties and filters the ones linking the accounts of the CDU or the CSU:
+
+        1.
+            >>>> Parties = ["spdde", "fdp","die_Gruenen","afd","dieLinke","fwlandtag","diepartei","cdu","csu"]
+            >>>> twitter_client = TwitterClient(CONSUMER_KEY, CONSUMER_SECRET, ACCESS_TOKEN, ACCESS_TOKEN_SECRET, Parties)
+            >>>> tweets = twitter_client.get_user_timeline_tweets(start_date = "2019-07-03", end_date = "2019-07-07")
+            >>>> tweet_analyzer = TweetAnalyzer(tweets)
+            >>>> tweet_analyzer2 = tweet_analyzer.tweet_filter_linked_accounts(["CDU", "CSU"], all_in_one = False)
+        """
+        if "linked_accounts" not in self.df.columns:
+            raise TypeError("Column linked_accounts does not exists!")
+        index = self.get_index("linked_accounts")
+        rows = index.intersection(accountnames) if all_in_one else index.union(accountnames)
+        filtered_df = self.df.iloc[rows]
+        if reset_drop_index:
+            filtered_df.reset_index(inplace=True, drop=True)
+        return self._derive(filtered_df, rows, inplace)
 
     def tweet_filter_likes(self, min_number_of_likes = 0, max_number_of_likes = None, reset_drop_index = True, inplace = False):
         """
@@ -427,15 +844,13 @@ class TweetAnalyzer:
         if "likes" not in self.df.columns:
             raise TypeError("Column likes does not exists!")
         if max_number_of_likes == None:
-            filtered_df = self.df[self.df.likes >= min_number_of_likes]
+            rows = self.df.likes >= min_number_of_likes
         else:
-            filtered_df = self.df[(self.df.likes >= min_number_of_likes) & (self.df.likes <= max_number_of_likes)]
+            rows = (self.df.likes >= min_number_of_likes) & (self.df.likes <= max_number_of_likes)
+        filtered_df = self.df[rows]
         if reset_drop_index:
             filtered_df.reset_index(inplace=True, drop=True)
-        if inplace:
-            self.df = filtered_df
-        else:
-            return TweetAnalyzer(self.tweets, filtered_df)
+        return self._derive(filtered_df, rows, inplace)
 
     def tweet_filter_retweets(self, min_number_of_retweets = 0, max_number_of_retweets = None, reset_drop_index = True, inplace = False):
         """
@@ -504,16 +919,14 @@ class TweetAnalyzer:
             raise TypeError("Column retweets does not exists!")
 
         if max_number_of_retweets == None:
-            filtered_df = self.df[self.df.retweets >= min_number_of_retweets]
+            rows = self.df.retweets >= min_number_of_retweets
         else:
-            filtered_df = self.df[(self.df.retweets >= min_number_of_retweets) & (self.df.retweets <= max_number_of_retweets)]
+            rows = (self.df.retweets >= min_number_of_retweets) & (self.df.retweets <= max_number_of_retweets)
+        filtered_df = self.df[rows]
 
         if reset_drop_index:
             filtered_df.reset_index(inplace=True, drop=True)
-        if inplace:
-            self.df = filtered_df
-        else:
-            return TweetAnalyzer(self.tweets, filtered_df)
+        return self._derive(filtered_df, rows, inplace)
 
     def tweet_filter_hyperlink_usage(self, no_hyperlinks = True, reset_drop_index = True, inplace = False):
         """
@@ -574,15 +987,13 @@ class TweetAnalyzer:
             raise TypeError("Column hashtags does not exists!")
 
         if no_hyperlinks:
-            filtered_df = self.df[self.df.urls.apply(lambda x: bool(x) == False)]
+            rows = entity_lengths(self.df.urls) == 0
         else:
-            filtered_df = self.df[self.df.urls.apply(lambda x: bool(x) == True)]
+            rows = entity_lengths(self.df.urls) > 0
+        filtered_df = self.df[rows]
         if reset_drop_index:
             filtered_df.reset_index(inplace=True, drop=True)
-        if inplace:
-            self.df = filtered_df
-        else:
-            return TweetAnalyzer(self.tweets, filtered_df)
+        return self._derive(filtered_df, rows, inplace)
 
     def tweet_filter_dates(self, start_date, end_date, reset_drop_index = True, inplace = False):
         """
@@ -635,13 +1046,68 @@ class TweetAnalyzer:
         if "date" not in self.df.columns:
             raise TypeError("Column date does not exists!")
 
-        filtered_df = self.df[(self.df.date >= start_date) & (self.df.date < end_date)]
+        rows = self.get_index("date").range(start_date, end_date)
+        filtered_df = self.df.iloc[rows]
         if reset_drop_index:
             filtered_df.reset_index(inplace=True, drop=True)
-        if inplace:
-            self.df = filtered_df
-        else:
-            return TweetAnalyzer(self.tweets, filtered_df)
+        return self._derive(filtered_df, rows, inplace)
+
+    def per_window(self, freq = "D", start_date = None, end_date = None, reset_drop_index = True):
+        """
+        Description
+        -----------
+        This function splits the meta data dataframe into consecutive time windows (e.g. days or weeks) at once,
+        instead of calling tweet_filter_dates once per window.
+
+        Parameters
+        ----------
+        freq:                       type = str
+                                    description = The length of the windows as pandas period frequency: "D" (days), "W" (weeks, monday to sunday),
+                                                  "M" (months), "h" (hours), ...
+                                    default = "D"
+
+        start_date:                 type = str or None
+                                    description = A date representation in the following format: "YEAR-MONTH-DAY", representing the start of the first window.
+                                                  If None: The date of the oldest tweet.
+                                    default = None
+
+        end_date:                   type = str or None
+                                    description = A date representation in the following format: "YEAR-MONTH-DAY", representing the end of the last window (excluded).
+                                                  If None: The end of the window of the newest tweet.
+                                    default = None
+
+        reset_drop_index:           type = boolean
+                                    description = If True: the index of the filtered dataframes will be resetted and the old index dropped
+                                                  If False: the index will not be manipulated
+                                    default = True
+
+        Returns
+        -------
+        <class 'dict'>
+
+            --> {start of the window (<class 'pandas.Timestamp'>): <class 'tweet_analyzer.TweetAnalyzer'>}, windows without tweets included
+
+        Example(s)
+        ----------
+        The following example obtains Donald Trumps tweets and counts them per week:
+
+        1.
+            >>>> twitter_client = TwitterClient(consumer_key, consumer_secret,access_token, access_token_secret, ["realDonaldTrump"])
+            >>>> tweets = twitter_client.get_user_timeline_tweets(start_date = "2019-05-01", end_date = "2019-07-01")
+            >>>> tweet_analyzer = TweetAnalyzer(tweets)
+            >>>> for week, weekly_analyzer in tweet_analyzer.per_window(freq = "W").items():
+            >>>>     print(week, len(weekly_analyzer.get_dataframe()))
+        """
+        if "date" not in self.df.columns:
+            raise TypeError("Column date does not exists!")
+
+        windows = {}
+        for start, rows in self.get_index("date").windows(freq, start_date, end_date):
+            filtered_df = self.df.iloc[rows]
+            if reset_drop_index:
+                filtered_df = filtered_df.reset_index(drop=True)
+            windows[start] = self._derive(filtered_df, rows)
+        return windows
 
     def tweet_filter_account(self, accountname, reset_drop_index = True, inplace = False):
         """
@@ -689,25 +1155,53 @@ class TweetAnalyzer:
         if "author" not in self.df.columns:
             raise TypeError("Column author does not exists!")
 
-        if (len(accountname) == 1):
-            filtered_df = self.df[self.df.author.apply(lambda x: accountname[0] == x)]
-            if reset_drop_index:
-                filtered_df.reset_index(inplace=True, drop=True)
-            if inplace:
-                self.df = filtered_df
-            else:
-                return TweetAnalyzer(self.tweets, filtered_df)
-        else:
-            filtered_df = self.df[self.df.author.apply(lambda x: accountname[0] == x)]
-            for i in range(1, len(accountname)):
-                df_append = self.df[self.df.author.apply(lambda x: accountname[i] == x)]
-                filtered_df = filtered_df.append(df_append)
+        rows = self.get_index("author").union(accountname)
+        filtered_df = self.df.iloc[rows]
+        if reset_drop_index:
+            filtered_df.reset_index(inplace=True, drop=True)
+        return self._derive(filtered_df, rows, inplace)
+
+    def per_account(self, reset_drop_index = True):
+        """
+        Description
+        -----------
+        This function splits the meta data dataframe by account at once, instead of calling tweet_filter_account once per account.
+
+        Parameters
+        ----------
+        reset_drop_index:           type = boolean
+                                    description = If True: the index of the filtered dataframes will be resetted and the old index dropped
+                                                  If False: the index will not be manipulated
+                                    default = True
+
+        Returns
+        -------
+        <class 'dict'>
+
+            --> {account name: <class 'tweet_analyzer.TweetAnalyzer'>} for every account with tweets in the dataframe
+
+        Example(s)
+        ----------
+        The following example plots the trend of the likes for every party on its own:
+
+        1.
+            >>>> Parties = ["spdde", "fdp","die_Gruenen","afd","dieLinke","fwlandtag","diepartei","cdu","csu"]
+            >>>> twitter_client = TwitterClient(CONSUMER_KEY, CONSUMER_SECRET, ACCESS_TOKEN, ACCESS_TOKEN_SECRET, Parties)
+            >>>> tweets = twitter_client.get_user_timeline_tweets(start_date = "2019-07-03", end_date = "2019-07-07")
+            >>>> tweet_analyzer = TweetAnalyzer(tweets)
+            >>>> for party, party_analyzer in tweet_analyzer.per_account().items():
+            >>>>     party_analyzer.plot_trend(type = "likes", title = party)
+        """
+        if "author" not in self.df.columns:
+            raise TypeError("Column author does not exists!")
+
+        accounts = {}
+        for account, rows in self.get_index("author").groups():
+            filtered_df = self.df.iloc[rows]
             if reset_drop_index:
-                filtered_df.reset_index(inplace=True, drop=True)
-            if inplace:
-                self.df = filtered_df
-            else:
-                return TweetAnalyzer(self.tweets, filtered_df)
+                filtered_df = filtered_df.reset_index(drop=True)
+            accounts[account] = self._derive(filtered_df, rows)
+        return accounts
 
     def tweet_filter_tweet_type(self, obtain = "tweets", reset_drop_index = True, inplace = False):
         """
@@ -768,18 +1262,98 @@ class TweetAnalyzer:
             raise TypeError("Column hashtags does not exists!")
 
         if obtain == "tweets":
-            filtered_df = self.df[self.df.tweet_type.apply(lambda x: "retweet" not in x)]
+            rows = self.df.tweet_type == "tweet"
         elif obtain == "retweets":
-            filtered_df = self.df[self.df.urls.apply(lambda x: "retweet" in x)]
+            rows = self.df.tweet_type == "retweet"
         else:
             raise TypeError('filter tweet_filter_tweet_type Error: Parameter "obtain" not correctly specified')
+        filtered_df = self.df[rows]
 
         if reset_drop_index:
             filtered_df.reset_index(inplace=True, drop=True)
-        if inplace:
-            self.df = filtered_df
-        else:
-            return TweetAnalyzer(self.tweets, filtered_df)
+        return self._derive(filtered_df, rows, inplace)
+
+######LAZY QUERY##################################################################################################################################
+    def lazy(self):
+        """
+        Description
+        -----------
+        This function starts a lazy chain of filters (see yatclient.query.QueryPlan): The filters are not run one after the other,
+        every one copying the dataframe. They are collected, ordered (filters with index and the most selective ones first)
+        and evaluated at once on collect().
+
+        Parameters
+        ----------
+        No parameters are passed.
+
+        Returns
+        -------
+        <class 'yatclient.query.QueryPlan'>
+
+            --> Has the tweet_filter_* functions (without reset_drop_index and inplace), collect() and explain()
+
+        Example(s)
+        ----------
+        1.
+            >>>> tweet_analyzer = TweetAnalyzer(tweets)
+            >>>> plan = tweet_analyzer.lazy().tweet_filter_likes(min_number_of_likes = 100).tweet_filter_hashtags(["klima"]).tweet_filter_dates("2019-05-01", "2019-06-01")
+            >>>> print(plan.explain())
+            >>>> tweet_analyzer2 = plan.collect()
+        """
+        return QueryPlan(self)
+
+    def query(self, expression, reset_drop_index = True, inplace = False):
+        """
+        Description
+        -----------
+        This function filters the dataframe by a query expression, which combines the conditions of the tweet_filter_* functions
+        with and, or and not. The expression is compiled once (and cached) to conditions of a QueryPlan, so the indexes are used
+        where possible, the remaining conditions are evaluated vectorized on the candidate rows and the dataframe is copied once.
+
+        The expressions are python expressions of:
+            comparisons         likes, retweets, id:    ==, !=, <, <=, >, >= numbers, in / not in lists of numbers
+                                date:                   ==, !=, <, <=, >, >= dates (e.g. '2019-05-01' or '2019-05-01 12:00')
+                                author, tweet_type:     ==, != str, in / not in lists of str
+                                chained comparisons like 100 <= likes < 1000
+            functions           has_hashtag('a', 'b', ...): contains one or more of the hashtags
+                                has_mention('a', 'b', ...): contains one or more of the linked accounts
+                                has_url(): contains a hyperlink
+            combined by         and, or, not, (...)
+
+        Parameters
+        ----------
+        expression:                 type = str
+                                    description = The query expression
+
+        reset_drop_index:           type = boolean
+                                    description = If True: the index of the filtered dataframe will be resetted and the old index dropped
+                                                  If False: the index will not be manipulated
+                                    default = True
+
+        inplace:                    type = boolean
+                                    description = If true, the actual object will be manipulated.
+                                                  Otherwise a new object will be created.
+                                    default = False
+
+        Returns
+        -------
+        If inplace = True:
+        None
+
+        Otherwise:
+        <class 'tweet_analyzer.TweetAnalyzer'>
+
+            --> Has a dataframe with the tweets meeting the expression
+
+        Example(s)
+        ----------
+        1.
+            >>>> tweet_analyzer = TweetAnalyzer(tweets)
+            >>>> tweet_analyzer2 = tweet_analyzer.query("likes >= 100 and author in ['spdde', 'fdp'] and has_hashtag('klima') and date >= '2019-05-01'")
+        2.
+            >>>> tweet_analyzer.query("(retweets > 50 or has_mention('spdde')) and not has_url() and tweet_type == 'tweet'", inplace = True)
+        """
+        return self.lazy().query(expression).collect(reset_drop_index = reset_drop_index, inplace = inplace)
 
 ######TWEET MANIPULATION##################################################################################################################################
     def tweet_manipulation(self, all_tweets = True, tweetnumber=0,delete_htmlent=True,
@@ -871,53 +1445,20 @@ class TweetAnalyzer:
             >>>> cleaned_object = tweet_analyzer.tweet_manipulation(all_tweets = False, tweetnumber = 10, only_small_letters=True,
                                                                     delete_hyperlinks=True , delete_hashtags=True, delete_accountlinks =True, delete_numbers=True, inplace = False)
         """
+        # the options are compiled once to a few combined regular expressions (see yatclient.cleaning)
+        pipeline = cleaning_pipeline(delete_htmlent = delete_htmlent, delete_hyperlinks = delete_hyperlinks, delete_numbers = delete_numbers,
+                                     delete_hashtags = delete_hashtags, only_small_letters = only_small_letters,
+                                     delete_diamonds_from_hashtags = delete_diamonds_from_hashtags, delete_accountlinks = delete_accountlinks,
+                                     delete_at_from_accountlinks = delete_at_from_accountlinks)
         filtered_df = self.df.copy()
         if all_tweets:
-            if delete_htmlent:
-                filtered_df["tweets"] = filtered_df["tweets"].str.replace('<[^<]+?>', '')
-                filtered_df["tweets"] = filtered_df["tweets"].str.replace("&amp;+|&lt;+|&gt;+|&quot;+|&apos;+", '')
-            if delete_hyperlinks:
-                filtered_df["tweets"] = filtered_df["tweets"].str.replace(r'''(?i)\b((?:https?://|www\d{0,3}[.]|[a-z0-9.\-]+[.][a-z]{2,4}/)(?:[^\s()<>]+|\(([^\s()<>]+|(\([^\s()<>]+\)))*\))+(?:\(([^\s()<>]+|(\([^\s()<>]+\)))*\)|[^\s`!()\[\]{};:'".,<>?«»“”‘’]))'''," ", regex=True)
-            if delete_numbers:
-                filtered_df["tweets"] = filtered_df["tweets"].str.replace('[0-9]+', '')
-            if delete_hashtags:
-                filtered_df["tweets"] = filtered_df["tweets"].str.replace('#\S+\s*','')
-            if only_small_letters:
-                filtered_df["tweets"] = filtered_df["tweets"].str.lower()
-            if delete_diamonds_from_hashtags:
-                filtered_df["tweets"] = filtered_df["tweets"].str.replace('#+', '')
-            if delete_accountlinks:
-                filtered_df["tweets"] = filtered_df["tweets"].str.replace('@\S+\s*','')
-            if delete_at_from_accountlinks:
-                filtered_df["tweets"] = filtered_df["tweets"].str.replace('@+', '')
-            if inplace:
-                self.df = filtered_df
-            else:
-                return TweetAnalyzer(self.tweets, filtered_df)
+            filtered_df["tweets"] = pipeline.clean_series(filtered_df["tweets"])
         else:
-            text=filtered_df.tweets.iloc[tweetnumber]
-            if delete_htmlent:
-                text=re.sub('<[^<]+?>', '', text) #Cleaning HTML-Entetiee.
-                text=re.sub("&amp;+|&lt;+|&gt;+|&quot;+|&apos;+", '', text)
-            if delete_hyperlinks:
-                text=re.sub(r'''(?i)\b((?:https?://|www\d{0,3}[.]|[a-z0-9.\-]+[.][a-z]{2,4}/)(?:[^\s()<>]+|\(([^\s()<>]+|(\([^\s()<>]+\)))*\))+(?:\(([^\s()<>]+|(\([^\s()<>]+\)))*\)|[^\s`!()\[\]{};:'".,<>?«»“”‘’]))'''," ", text)
-            if delete_numbers:
-                text=re.sub('[0-9]+', '',text)
-            if delete_hashtags:
-                text=re.sub('#\S+\s*','',text)
-            if only_small_letters:
-                text=text.lower()
-            if delete_diamonds_from_hashtags:
-                text=re.sub('#+', '', text)
-            if delete_accountlinks:
-                text=re.sub('@\S+\s*','',text)
-            if delete_at_from_accountlinks:
-                text=re.sub('@+', '', text)
-            filtered_df.at[tweetnumber, 'tweets'] = text
-            if inplace:
-                self.df = filtered_df
-            else:
-                return TweetAnalyzer(self.tweets, filtered_df)
+            filtered_df.at[tweetnumber, 'tweets'] = pipeline.clean_text(filtered_df.tweets.iloc[tweetnumber])
+        if inplace:
+            self.df = filtered_df
+        else:
+            return TweetAnalyzer(self.tweets, filtered_df)
 
 ######FREQUENCY COUNT##################################################################################################################################
     def bagofwords(self, on = "tweets", extended_view = True, stopOWN=[]):
@@ -948,6 +1489,8 @@ class TweetAnalyzer:
 
             --> A dataframe is returned, which includes a frequency count of the specified column ("on"-parameter)
                 either as an extended view or compressed view ("extended_view" - parameter)
+                The extended view is sparse (one sparse column per word, see DataFrame.sparse): df.sparse.to_coo() returns the
+                document-term matrix as scipy matrix, df.sparse.to_dense() the dense dataframe of former versions.
 
         Example(s)
         ----------
@@ -968,63 +1511,43 @@ class TweetAnalyzer:
             >>>> tweet_analyzer.bagofwords(on="hashtags", extended_view = True)
 
         """
-        stopDE =['unsere', 'anderes', 'ist', 'andern', 'hab', 'welche', 'dasselbe', 'jener', 'ich', 'indem', 'solchem', 'manchem', 'während', 'anderm', 'einig', 'kann', 'keines', 'seinen', 'so', 'aber', 'jenen', 'von', 'zur', 'jenes', 'solches', 'diese', 'seinem', 'derselben', 'einmal', 'jedes', 'eurem', 'sollte', 'manchen', 'keiner', 'ob', 'dessen', 'einer', 'sich', 'können', 'allem', 'doch', 'einem', 'waren', 'er', 'nur', 'aus', 'deine', 'wo', 'andere', 'welches', 'nichts', 'wie', 'aller', 'hier', 'desselben', 'keinen', 'meiner', 'meine', 'dieses', 'zwar', 'noch', 'anderem', 'bin', 'unser', 'wenn', 'ander', 'allen', 'gegen', 'diesen', 'weil', 'eurer', 'weiter', 'keinem', 'an', 'haben', 'meinem', 'dieselbe', 'und', 'derer', 'wollen', 'durch', 'eines', 'denn', 'musste', 'welchen', 'hatte', 'war', 'damit', 'keine', 'mein', 'dieser', 'eures', 'wirst', 'würde', 'einiger', 'dass', 'nach', 'anders', 'jetzt', 'soll', 'deines', 'demselben', 'auf', 'euren', 'für', 'muss', 'dazu', 'machen', 'wollte', 'ihrem', 'den', 'selbst', 'dich', 'jeden', 'dir', 'also', 'bis', 'jene', 'in', 'mich', 'sind', 'würden', 'seines', 'im', 'wird', 'viel', 'unserem', 'solcher', 'zum', 'ihn', 'könnte', 'warst', 'ihm', 'auch', 'bist', 'dem', 'ohne', 'sie', 'vor', 'dort', 'da', 'das', 'die', 'etwas', 'mancher', 'jenem', 'hatten', 'hin', 'ihr', 'kein', 'sein', 'sehr', 'dann', 'mit', 'weg', 'was', 'ins', 'seiner', 'euer', 'sondern', 'jeder', 'ihren', 'daß', 'um', 'dein', 'meinen', 'einen', 'ihrer', 'solche', 'unseres', 'mir', 'anderen', 'dies', 'du', 'eine', 'meines', 'unter', 'deinem', 'einige', 'werde', 'wieder', 'anderer', 'hinter', 'als', 'welchem', 'ihnen', 'einigem', 'manches', 'seine', 'über', 'man', 'hat', 'anderr', 'ein', 'am', 'jedem', 'unseren', 'wir', 'deinen', 'bei', 'derselbe', 'gewesen', 'will', 'welcher', 'nicht', 'eure', 'des', 'werden', 'euch', 'oder', 'alles', 'zu', 'einiges', 'habe', 'uns', 'alle', 'der', 'einigen', 'ihre', 'jede', 'nun', 'denselben', 'sonst', 'diesem', 'vom', 'dieselben', 'ihres', 'manche', 'zwischen', 'solchen', 'deiner', 'es']
-        stopENG =['i', 'me', 'my', 'myself', 'we', 'our', 'ours', 'ourselves', 'you', "you're", "you've", "you'll", "you'd",'your', 'yours', 'yourself', 'yourselves', 'he', 'him', 'his', 'himself', 'she', "she's", 'her', 'hers','herself', 'it', "it's", 'its', 'itself', 'they', 'them', 'their', 'theirs', 'themselves', 'what', 'which','who', 'whom', 'this', 'that', "that'll", 'these', 'those', 'am', 'is', 'are', 'was', 'were', 'be', 'been','being', 'have', 'has', 'had', 'having', 'do', 'does', 'did', 'doing', 'a', 'an', 'the', 'and', 'but', 'if','or', 'because', 'as', 'until', 'while', 'of', 'at', 'by', 'for', 'with', 'about', 'against', 'between',         'into', 'through', 'during', 'before', 'after', 'above', 'below', 'to', 'from', 'up', 'down', 'in', 'out','on', 'off', 'over', 'under', 'again', 'further', 'then', 'once', 'here', 'there', 'when', 'where', 'why',         'how', 'all', 'any', 'both', 'each', 'few', 'more', 'most', 'other', 'some', 'such', 'no', 'nor', 'not','only', 'own', 'same', 'so', 'than', 'too', 'very', 's', 't', 'can', 'will', 'just', 'don', "don't", 'should',         "should've", 'now', 'd', 'll', 'm', 'o', 're', 've', 'y', 'ain', 'aren', "aren't", 'couldn', "couldn't",'didn', "didn't", 'doesn', "doesn't", 'hadn', "hadn't", 'hasn', "hasn't", 'haven', "haven't", 'isn', "isn't",         'ma', 'mightn', "mightn't", 'mustn', "mustn't", 'needn', "needn't", 'shan', "shan't", 'shouldn', "shouldn't",'wasn', "wasn't", 'weren', "weren't", 'won', "won't", 'wouldn', "wouldn't"]
-        stopwords= stopDE+stopENG+stopOWN
+        stopwords= STOPWORDS_DE+STOPWORDS_ENG+stopOWN
         if on == "tweets":
             if "tweets" not in self.df.columns:
                 raise TypeError("Column tweets does not exists!")
-            cleaned_object = self.tweet_manipulation(only_small_letters=True, delete_hyperlinks=True , delete_hashtags=True, delete_accountlinks =True, delete_numbers=True)
-            vectorizer = CountVectorizer()
-            vectorizer.stop_words = stopwords
-            vectorizer.fit(cleaned_object.get_dataframe().tweets)
-            dtm = vectorizer.transform(cleaned_object.get_dataframe().tweets)
-            transformed_df = pd.DataFrame(dtm.toarray(), columns=vectorizer.get_feature_names())
+            # tokenized once per content of the tweets column (see get_corpus)
+            corpus = self.get_corpus()
             if extended_view:
-                return transformed_df
-            else:
-                transformed_df_c = transformed_df.sum().sort_values(ascending=False).to_frame().reset_index().rename(
-                                    columns={"index": "words", 0: "count"})
-                transformed_df_c['index'] = transformed_df_c.index + 1
-                transformed_df_c['index_perc'] = 100*transformed_df_c['index']/transformed_df_c.iloc[-1]['index']
-                return transformed_df_c
-        elif on == "hashtags":
-            if "hashtags" not in self.df.columns:
-                raise TypeError("Column hashtags does not exists!")
-            vectorizer = CountVectorizer()
-            vectorizer.fit(self.df.hashtags)
-            dtm = vectorizer.transform(self.df.hashtags)
-            transformed_df = pd.DataFrame(dtm.toarray(), columns=vectorizer.get_feature_names())
-            if extended_view:
-                return transformed_df
-            else:
-                transformed_df_c = transformed_df.sum().sort_values(ascending=False).to_frame().reset_index().rename(
-                        columns={"index": "hashtags", 0: "count"})
-                transformed_df_c['index'] = transformed_df_c.index + 1
-                transformed_df_c['index_perc'] = 100*transformed_df_c['index']/transformed_df_c.iloc[-1]['index']
-                return transformed_df_c
-        elif on == "linked_accounts":
-            if "linked_accounts" not in self.df.columns:
-                raise TypeError("Column linked_accounts does not exists!")
-            vectorizer = CountVectorizer()
-            vectorizer.fit(self.df.linked_accounts)
-            dtm = vectorizer.transform(self.df.linked_accounts)
-            transformed_df = pd.DataFrame(dtm.toarray(), columns=vectorizer.get_feature_names())
+                dtm, words = corpus.matrix(stopwords)
+                return pd.DataFrame.sparse.from_spmatrix(dtm, columns = words)
+            counts = corpus.counts(stopwords)
+            return self._frequency_frame("words", counts.index, counts.to_numpy())
+        elif on in ("hashtags", "linked_accounts"):
+            if on not in self.df.columns:
+                raise TypeError("Column " + on + " does not exists!")
+            # entities differing in case are counted together
+            dtm, entities = term_matrix(pa.chunked_array(entity_array(self.df[on]).__arrow_array__()), lower = True)
             if extended_view:
-                return transformed_df
-            else:
-                transformed_df_c = transformed_df.sum().sort_values(ascending=False).to_frame().reset_index().rename(
-                        columns={"index": "accounts", 0: "count"})
-                transformed_df_c['index'] = transformed_df_c.index + 1
-                transformed_df_c['index_perc'] = 100*transformed_df_c['index']/transformed_df_c.iloc[-1]['index']
-                return transformed_df_c
+                return pd.DataFrame.sparse.from_spmatrix(dtm, columns = entities)
+            # the column sums of the sparse matrix, sorted like the words (descending, alphabetical within the same count)
+            counts = np.asarray(dtm.sum(axis = 0)).ravel()
+            order = np.argsort(-counts, kind = "stable")
+            return self._frequency_frame("hashtags" if on == "hashtags" else "accounts", entities[order], counts[order])
         else:
             raise TypeError("Remember: You can only get a frequency count of the tweets, hashtags and linked accounts!")
 
 
+    def _frequency_frame(self, name, values, counts):
+        # the compressed view of bagofwords: values and counts in descending order, with their rank (index) and rank in percent
+        transformed_df_c = pd.DataFrame({name: values, "count": counts})
+        transformed_df_c['index'] = transformed_df_c.index + 1
+        transformed_df_c['index_perc'] = 100*transformed_df_c['index']/max(len(transformed_df_c), 1)
+        return transformed_df_c
+
 ######GRAPHICAL REPRESENTATION##################################################################################################################################
     def  plot_bar(self, type, windowsize=(10,5), stopOWN =[], plotstyle = "ggplot", count = 10, percent = 15.0,
-                    title = None, xvalues = False, facecolor = "blue", edgecolor = "blue", alpha=0.5, fontfamily = "sans", font=12):
+                    title = None, xvalues = False, facecolor = "blue", edgecolor = "blue", alpha=0.5, fontfamily = "sans", font=12,
+                    sketch = None, author = None):
         """
         Description
         -----------
@@ -1082,6 +1605,16 @@ class TweetAnalyzer:
                                     description = Setting the font size of the title, x and y label
                                     default = 12
 
+        sketch:                     type = <class 'yatclient.sketches.HeavyHitters'> or None
+                                    description = If given: the counts are taken from the sketch instead of the dataframe (types 'wct',
+                                                  'la_ct' and 'hashtags' only), e.g. of tweets streamed in or too many to keep in memory.
+                                                  The counts are upper bounds (see HeavyHitters.top for their errors).
+                                    default = None
+
+        author:                     type = str or None
+                                    description = With sketch: plots the counts of the tweets of this author
+                                    default = None
+
         Returns
         -----------
         <none>
@@ -1096,9 +1629,20 @@ class TweetAnalyzer:
             >>>> tweets = twitter_client.get_user_timeline_tweets(start_date = "2019-07-03", end_date = "2019-07-07")
             >>>> tweet_analyzer = TweetAnalyzer(tweets)
             >>>> tweet_analyzer.plot_bar(type="wct", count=20)
+
+        2.
+            >>>> heavy_hitters = HeavyHitters()
+            >>>> for chunk in TweetAnalyzer().iter_csv("archive.csv"):
+            >>>>     heavy_hitters.update(chunk)
+            >>>> TweetAnalyzer().plot_bar(type="hashtags", count=20, sketch=heavy_hitters)
         """
+        if sketch is not None and type not in ('wct', 'la_ct', 'hashtags'):
+            raise TypeError('plot_bar Error: a sketch only serves the types wct, la_ct and hashtags')
         if type == 'wct':
-            wordcountframe = self.bagofwords(extended_view = False, stopOWN = stopOWN)
+            if sketch is None:
+                wordcountframe = self.bagofwords(extended_view = False, stopOWN = stopOWN)
+            else:
+                wordcountframe = sketch.frequency_frame("words", count, author)
             wordcountframe = wordcountframe[wordcountframe["index"] <= count]
             if title == None:
                 title = 'Top ' + str(wordcountframe["index"].max()) + ' most used words'
@@ -1132,7 +1676,10 @@ class TweetAnalyzer:
             plt.ylabel('Words',fontsize=font)
             plt.show()
         elif type == 'la_ct':
-            wordcountframe = self.bagofwords(on = "linked_accounts", extended_view = False, stopOWN=stopOWN)
+            if sketch is None:
+                wordcountframe = self.bagofwords(on = "linked_accounts", extended_view = False, stopOWN=stopOWN)
+            else:
+                wordcountframe = sketch.frequency_frame("linked_accounts", count, author)
             wordcountframe = wordcountframe[wordcountframe["index"] <= count]
             if title == None:
                 title = 'Top ' + str(wordcountframe["index"].max()) + ' most linked accounts'
@@ -1166,7 +1713,10 @@ class TweetAnalyzer:
             plt.ylabel('Accounts',fontsize=font)
             plt.show()
         elif type == 'hashtags':
-            wordcountframe = self.bagofwords(on = "hashtags", extended_view = False)
+            if sketch is None:
+                wordcountframe = self.bagofwords(on = "hashtags", extended_view = False)
+            else:
+                wordcountframe = sketch.frequency_frame("hashtags", count, author)
             wordcountframe = wordcountframe[wordcountframe["index"] <= count]
             if title == None:
                 title = 'Top ' + str(wordcountframe["index"].max()) + ' most common hashtags'
@@ -1278,7 +1828,7 @@ class TweetAnalyzer:
             df = self.df.copy()
             df["count"] = 1
             plt.style.use(plotstyle)
-            df_grp = df.groupby(["author", "tweet_type"])["likes", "retweets","count"].sum().unstack().fillna(0)
+            df_grp = df.groupby(["author", "tweet_type"], observed = True)[["likes", "retweets","count"]].sum().unstack().fillna(0)
             if type == "count":
                 df_count = df_grp["count"].copy()
                 if sort_val:
@@ -1388,7 +1938,7 @@ class TweetAnalyzer:
             df["count"] = 1
             plt.style.use(plotstyle)
             fig, ax = plt.subplots(figsize = windowsize)
-            df_grp = df.groupby("author")["likes", "retweets","count"].sum()
+            df_grp = df.groupby("author", observed = True)[["likes", "retweets","count"]].sum()
             if type == "count":
                 if sort_val:
                     df_grp.sort_values(by=["count"], inplace =True)
@@ -1706,7 +2256,7 @@ class TweetAnalyzer:
                 df = df[["author","likes","retweets", "date", "count"]]
                 df.set_index(['author','date'], inplace = True)
                 level_values = df.index.get_level_values
-                df = df.groupby([level_values(0)]+[pd.Grouper(freq='D', level=-1)]).sum()
+                df = df.groupby([level_values(0)]+[pd.Grouper(freq='D', level=-1)], observed = True).sum()
                 mi = df.index.get_level_values(1).min()
                 ma = df.index.get_level_values(1).max()
                 r = pd.date_range(start=mi, end=ma)
@@ -2,7 +2,18 @@
 #from twitter_authenticator import TwitterAuthenticator - comment style because in __init__
 import tweepy
 #import twitter_credentials - comment style because in __init__
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from email.utils import parsedate
+
+from .snowflake import TWITTER_EPOCH, datetime_to_snowflake
 
 class TwitterAuthenticator:
     """
@@ -41,13 +52,463 @@ class TwitterAuthenticator:
         auth.set_access_token(ACCESS_TOKEN, ACCESS_TOKEN_SECRET)
         return auth
 
+class RateLimitScheduler:
+    """
+    Functionality to pace the requests to the twitter API within its 15-minute rate limit windows -
+
+    this class will not be used by the user himself. It is tethered to the TwitterClient class, which routes every request through it.
+
+    For every endpoint (user_timeline, get_user, lookup_users) the remaining quota and the reset time of the current window are tracked,
+    taken from the x-rate-limit-* response headers whenever they are available.
+    Requests are paced by a token bucket refilling at remaining quota / seconds until reset, i.e. the maximum rate which is sustainable
+    until the window resets. Callers (e.g. the worker threads of a concurrent fetch) queue up first come, first served per endpoint.
+    """
+    WINDOW = 15 * 60
+    DEFAULT_LIMITS = {"user_timeline": 900, "get_user": 900, "lookup_users": 900}
+    PATHS = {"user_timeline": "/statuses/user_timeline", "get_user": "/users/show", "lookup_users": "/users/lookup"}
+
+    def __init__(self, limits = None, burst = 50, max_retries = 3):
+        """
+        Description
+        -----------
+        Creates a scheduler with a full quota for every endpoint. The quota is corrected by the first response headers.
+
+        Parameters
+        ----------
+        limits:                 type = dict or None
+                                description = Requests per 15-minute window, by endpoint name. Overrides DEFAULT_LIMITS.
+                                default = None
+
+        burst:                  type = int
+                                description = Size of the token bucket: number of requests which may be sent back to back before pacing kicks in.
+                                default = 50
+
+        max_retries:            type = int
+                                description = How often a request answered with HTTP 429 (rate limit exceeded) is retried after the window reset.
+                                default = 3
+        """
+        self.limits = dict(self.DEFAULT_LIMITS)
+        if limits is not None:
+            self.limits.update(limits)
+        self.burst = burst
+        self.max_retries = max_retries
+        self._endpoints = {}
+        self._condition = threading.Condition()
+
+    def _state(self, endpoint, now):
+        state = self._endpoints.get(endpoint)
+        if state is None:
+            limit = self.limits.get(endpoint, 15)
+            state = self._endpoints[endpoint] = {"limit": limit, "remaining": limit, "reset": now + self.WINDOW,
+                                                 "tokens": float(min(self.burst, limit)), "updated": now,
+                                                 "next_ticket": 0, "serving": 0}
+        if now >= state["reset"]:
+            # the window rolled over, the exact reset time is corrected by the next response headers
+            state["remaining"] = state["limit"]
+            state["reset"] = now + self.WINDOW
+            state["tokens"] = float(min(self.burst, state["limit"]))
+            state["updated"] = now
+        return state
+
+    def _refill(self, state, now):
+        rate = state["remaining"] / max(state["reset"] - now, 1.0)
+        state["tokens"] = min(self.burst, state["remaining"], state["tokens"] + rate * (now - state["updated"]))
+        state["updated"] = now
+        return rate
+
+    def _wait_time(self, state, now):
+        rate = self._refill(state, now)
+        if state["remaining"] < 1:
+            return max(state["reset"] - now, 0.0)
+        if state["tokens"] >= 1:
+            return 0.0
+        return (1 - state["tokens"]) / rate
+
+    def acquire(self, endpoint):
+        """
+        Description
+        -----------
+        Blocks until a request to the endpoint may be sent and books it against the quota.
+
+        Returns
+        -------
+        <class 'float'>
+
+            --> The number of seconds the caller waited
+        """
+        started = time.time()
+        with self._condition:
+            state = self._state(endpoint, started)
+            ticket = state["next_ticket"]
+            state["next_ticket"] += 1
+            while True:
+                now = time.time()
+                state = self._state(endpoint, now)
+                wait = None
+                if state["serving"] == ticket:
+                    wait = self._wait_time(state, now)
+                    if wait == 0:
+                        state["tokens"] -= 1
+                        state["remaining"] -= 1
+                        state["serving"] += 1
+                        self._condition.notify_all()
+                        return now - started
+                self._condition.wait(wait)
+
+    def update(self, endpoint, headers):
+        """
+        Description
+        -----------
+        Corrects the quota of the endpoint with the x-rate-limit-limit/-remaining/-reset headers of a response.
+        """
+        if not headers or headers.get("x-rate-limit-remaining") is None:
+            return
+        with self._condition:
+            now = time.time()
+            state = self._state(endpoint, now)
+            self._refill(state, now)
+            remaining = int(headers["x-rate-limit-remaining"])
+            reset = float(headers.get("x-rate-limit-reset", state["reset"]))
+            if headers.get("x-rate-limit-limit") is not None:
+                state["limit"] = int(headers["x-rate-limit-limit"])
+            if reset > state["reset"] + 1:
+                # a new window started on the server
+                state["remaining"] = remaining
+            else:
+                # responses of parallel requests may arrive out of order: the lowest count is the latest one
+                state["remaining"] = min(state["remaining"], remaining)
+            state["reset"] = reset
+            state["tokens"] = min(state["tokens"], state["remaining"])
+            self._condition.notify_all()
+
+    def penalize(self, endpoint, headers = None):
+        """
+        Description
+        -----------
+        Marks the quota of the endpoint as exhausted after the API answered with HTTP 429, until the window resets
+        (taken from the x-rate-limit-reset or retry-after header, otherwise a full window from now).
+        """
+        with self._condition:
+            now = time.time()
+            state = self._state(endpoint, now)
+            headers = headers or {}
+            if headers.get("x-rate-limit-reset") is not None:
+                state["reset"] = float(headers["x-rate-limit-reset"])
+            elif headers.get("retry-after") is not None:
+                state["reset"] = now + float(headers["retry-after"])
+            else:
+                state["reset"] = now + self.WINDOW
+            state["remaining"] = 0
+            state["tokens"] = 0.0
+            state["updated"] = now
+            self._condition.notify_all()
+
+    def status(self):
+        """
+        Description
+        -----------
+        Returns the current quota and wait state of every endpoint used so far.
+
+        Returns
+        -------
+        <class 'dict'>
+
+            --> endpoint name: {"limit", "remaining", "reset" (datetime, UTC), "wait" (seconds until the next request may be sent), "queued" (waiting callers)}
+        """
+        with self._condition:
+            now = time.time()
+            status = {}
+            for endpoint in self._endpoints:
+                state = self._state(endpoint, now)
+                status[endpoint] = {"limit": state["limit"],
+                                    "remaining": state["remaining"],
+                                    "reset": datetime.utcfromtimestamp(state["reset"]),
+                                    "wait": self._wait_time(state, now),
+                                    "queued": state["next_ticket"] - state["serving"]}
+            return status
+
+class CheckpointStore:
+    """
+    Functionality to remember the newest tweet fetched per account, persisted in a small json file -
+
+    it is passed to TwitterClient.get_user_timeline_tweets, so subsequent runs only request the tweets newer than the checkpoint (since_id).
+    """
+    def __init__(self, path):
+        """
+        Description
+        -----------
+        Opens the checkpoint file at path. If it does not exist yet, the store starts empty and the file is created by save().
+
+        Parameters
+        ----------
+        path:                   type = str
+                                description = Path of the json file holding the checkpoints
+
+        Example(s)
+        ----------
+            >>>> checkpoints = CheckpointStore("checkpoints.json")
+            >>>> tweets = twitter_client.get_user_timeline_tweets(start_date = "2019-05-01", end_date = "2019-07-01", checkpoint = checkpoints)
+            >>>> ... store the tweets ...
+            >>>> checkpoints.save()
+        """
+        self.path = path
+        self.checkpoints = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, encoding = "utf-8") as f:
+                self.checkpoints = {account: int(tweet_id) for account, tweet_id in json.load(f).items()}
+
+    def get(self, account):
+        """
+        Description
+        -----------
+        Returns the id of the newest tweet fetched for the account (screen names are case insensitive) or None.
+        """
+        return self.checkpoints.get(account.lower())
+
+    def update(self, account, tweet_id):
+        """
+        Description
+        -----------
+        Moves the checkpoint of the account forward to tweet_id. Older ids are ignored.
+        """
+        account = account.lower()
+        with self._lock:
+            if tweet_id > self.checkpoints.get(account, -1):
+                self.checkpoints[account] = int(tweet_id)
+
+    def update_from_dataframe(self, df):
+        """
+        Description
+        -----------
+        Seeds the checkpoints from an existing dataset, e.g. the dataframe of a TweetAnalyzer loaded via read_from_csv:
+        the highest id per author becomes the checkpoint of that account.
+
+        Parameters
+        ----------
+        df:                     type = <class 'pandas.core.frame.DataFrame'>
+                                description = Dataframe with the columns author and id (see TweetAnalyzer.tweets_to_dataframe)
+        """
+        for account, tweet_id in df.groupby("author")["id"].max().items():
+            self.update(account, int(tweet_id))
+
+    def save(self):
+        """
+        Description
+        -----------
+        Writes the checkpoints to the json file. The file is replaced atomically, so a crash never leaves a half written file behind.
+
+        IMPORTANT:
+        Save the checkpoints only after the fetched tweets are stored, otherwise the next run skips tweets which were never stored.
+        """
+        directory = os.path.dirname(os.path.abspath(self.path))
+        with self._lock:
+            fd, tmp_path = tempfile.mkstemp(dir = directory, suffix = ".tmp")
+            with os.fdopen(fd, "w", encoding = "utf-8") as f:
+                json.dump(self.checkpoints, f, indent = 1, sort_keys = True)
+            os.replace(tmp_path, self.path)
+
+LeanUser = namedtuple("LeanUser", ["id", "screen_name"])
+LeanRetweetedStatus = namedtuple("LeanRetweetedStatus", ["id", "favorite_count"])
+
+class LeanStatus:
+    """
+    A trimmed down tweet, holding only the fields TweetAnalyzer.tweets_to_dataframe uses -
+
+    this class will not be used by the user himself. The TwitterClient returns it instead of tweepy.models.Status in lean mode.
+    It has the same attributes as a Status (full_text, user.screen_name, created_at, favorite_count, retweet_count, entities, id and
+    retweeted_status for retweets), so it works everywhere a Status does within this package.
+    The trimmed json payload is kept in _json.
+    """
+    __slots__ = ["full_text", "user", "created_at", "favorite_count", "retweet_count", "entities", "id", "retweeted_status", "_json"]
+
+    def __init__(self, json, screen_name = None):
+        """
+        Description
+        -----------
+        Builds the tweet from its json payload (as returned by the API). If the payload was requested with trim_user,
+        the user object only holds the user id: screen_name (the account requested) fills in the missing name.
+        """
+        entities = json.get("entities", {})
+        user = json.get("user", {})
+        self._json = {
+            "id": json["id"],
+            "full_text": json.get("full_text", json.get("text")),
+            "created_at": json["created_at"],
+            "favorite_count": json["favorite_count"],
+            "retweet_count": json["retweet_count"],
+            "user": {"id": user.get("id"), "screen_name": user.get("screen_name", screen_name)},
+            "entities": {"hashtags": [{"text": i["text"]} for i in entities.get("hashtags", [])],
+                         "user_mentions": [{"screen_name": i["screen_name"]} for i in entities.get("user_mentions", [])],
+                         "urls": [{"url": i["url"]} for i in entities.get("urls", [])]},
+        }
+        self.id = self._json["id"]
+        self.full_text = self._json["full_text"]
+        self.created_at = datetime(*(parsedate(json["created_at"])[:6]))
+        self.favorite_count = self._json["favorite_count"]
+        self.retweet_count = self._json["retweet_count"]
+        self.user = LeanUser(**self._json["user"])
+        self.entities = self._json["entities"]
+        if "retweeted_status" in json:
+            retweeted = json["retweeted_status"]
+            self._json["retweeted_status"] = {"id": retweeted["id"], "favorite_count": retweeted["favorite_count"]}
+            self.retweeted_status = LeanRetweetedStatus(**self._json["retweeted_status"])
+
+    def __repr__(self):
+        return "LeanStatus(id=%d, user=%s)" % (self.id, self.user.screen_name)
+
+class ResponseCache:
+    """
+    Functionality to keep the API responses on disk and replay them -
+
+    it is passed to the TwitterClient, which then looks up every request in the cache before sending it.
+    Entries are content addressed (a hash of endpoint and parameters) json files in one directory, they expire after a time to live per endpoint
+    and the least recently used ones are evicted once the cache outgrows max_bytes.
+    In offline mode requests are answered from the cache only (expired entries included), so analyses can be rerun without network access.
+    """
+    DEFAULT_TTL = {"user_timeline": 60 * 60, "get_user": 24 * 60 * 60, "lookup_users": 24 * 60 * 60}
+
+    def __init__(self, directory, ttl = None, max_bytes = 512 * 1024 ** 2, offline = False):
+        """
+        Description
+        -----------
+        Opens (or creates) the cache in directory.
+
+        Parameters
+        ----------
+        directory:              type = str
+                                description = Directory holding the cache entries
+
+        ttl:                    type = dict or None
+                                description = Seconds an entry stays valid, by endpoint name (None: never expires). Overrides DEFAULT_TTL.
+                                default = None
+
+        max_bytes:              type = int
+                                description = Size limit of the cache. The least recently used entries are evicted beyond it.
+                                default = 512 MB
+
+        offline:                type = boolean
+                                description = If True: Only the cache is used, requests which are not cached raise a LookupError.
+                                default = False
+
+        Example(s)
+        ----------
+            >>>> cache = ResponseCache("twitter_cache", ttl = {"user_timeline": 24 * 60 * 60})
+            >>>> twitter_client = TwitterClient(consumer_key, consumer_secret,access_token, access_token_secret, Parties, cache = cache)
+            Later, without network access:
+            >>>> twitter_client = TwitterClient(consumer_key, consumer_secret,access_token, access_token_secret, Parties, cache = ResponseCache("twitter_cache", offline = True))
+        """
+        self.directory = directory
+        self.ttl = dict(self.DEFAULT_TTL)
+        if ttl is not None:
+            self.ttl.update(ttl)
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok = True)
+        # key: [size in bytes, last use], the last use is kept in the mtime of the files as well
+        self._entries = {}
+        for entry in os.scandir(directory):
+            if entry.name.endswith(".json"):
+                stat = entry.stat()
+                self._entries[entry.name[:-5]] = [stat.st_size, stat.st_mtime]
+        self._size = sum(size for size, _ in self._entries.values())
+
+    def key(self, endpoint, args, kargs):
+        """
+        Description
+        -----------
+        Returns the cache key of a request: the sha256 hash of endpoint and parameters.
+        """
+        request = json.dumps([endpoint, list(args), sorted(kargs.items())], default = str)
+        return hashlib.sha256(request.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".json")
+
+    def get(self, endpoint, args, kargs):
+        """
+        Description
+        -----------
+        Returns the cached json payload of a request, or None if it is not cached or expired (expired entries are served in offline mode).
+        """
+        key = self.key(endpoint, args, kargs)
+        with self._lock:
+            if key not in self._entries:
+                # the entry may have been stored by another ResponseCache (or process) on the same directory since this one was opened
+                try:
+                    stat = os.stat(self._path(key))
+                except OSError:
+                    return None
+                self._entries[key] = [stat.st_size, stat.st_mtime]
+                self._size += stat.st_size
+            try:
+                with open(self._path(key), encoding = "utf-8") as f:
+                    entry = json.load(f)
+            except (OSError, ValueError):
+                self._remove(key)
+                return None
+            ttl = self.ttl.get(endpoint)
+            if not self.offline and ttl is not None and time.time() - entry["stored"] > ttl:
+                self._remove(key)
+                return None
+            now = time.time()
+            self._entries[key][1] = now
+            os.utime(self._path(key), (now, now))
+            return entry["payload"]
+
+    def set(self, endpoint, args, kargs, payload):
+        """
+        Description
+        -----------
+        Stores the json payload of a request and evicts the least recently used entries if the cache grew beyond max_bytes.
+        """
+        key = self.key(endpoint, args, kargs)
+        data = json.dumps({"endpoint": endpoint, "params": [list(args), sorted(kargs.items())], "stored": time.time(), "payload": payload},
+                          default = str).encode("utf-8")
+        with self._lock:
+            fd, tmp_path = tempfile.mkstemp(dir = self.directory, suffix = ".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, self._path(key))
+            if key in self._entries:
+                self._size -= self._entries[key][0]
+            self._entries[key] = [len(data), time.time()]
+            self._size += len(data)
+            if self._size > self.max_bytes:
+                for old_key in sorted(self._entries, key = lambda k: self._entries[k][1]):
+                    if self._size <= self.max_bytes:
+                        break
+                    if old_key != key:
+                        self._remove(old_key)
+
+    def clear(self):
+        """
+        Description
+        -----------
+        Removes all entries of the cache.
+        """
+        with self._lock:
+            for key in list(self._entries):
+                self._remove(key)
+
+    def _remove(self, key):
+        size, _ = self._entries.pop(key)
+        self._size -= size
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
 class TwitterClient:
     """
     Functionality for gathering twitter data -
 
     for now only able to obtain the tweets in a given account timeline as well as user data.
     """
-    def __init__(self, CONSUMER_KEY, CONSUMER_SECRET, ACCESS_TOKEN, ACCESS_TOKEN_SECRET, twitter_user=None):
+    LOOKUP_CHUNK_SIZE = 100
+
+    def __init__(self, CONSUMER_KEY, CONSUMER_SECRET, ACCESS_TOKEN, ACCESS_TOKEN_SECRET, twitter_user=None, scheduler=None, cache=None, api=None):
         """
         Description
         -----------
@@ -74,6 +535,21 @@ class TwitterClient:
         ACCESS_TOKEN_SECRET:    type = str
                                 description = Access Token (https://developer.twitter.com/en.html)
 
+        scheduler:              type = RateLimitScheduler or None
+                                description = Paces the requests within the twitter rate limits. Clients using the same credentials should share one,
+                                              as the limits apply per account. If None, a scheduler with the default limits is created.
+                                default = None
+
+        cache:                  type = ResponseCache or None
+                                description = If given: Every request is looked up in this on-disk cache first and the responses are stored in it.
+                                              In offline mode the API is never contacted.
+                                default = None
+
+        api:                    type = object or None
+                                description = Talk to this object instead of the twitter API, e.g. a MockTwitterAPI (see yatclient.mock_api).
+                                              The credentials are not used then and may be None.
+                                default = None
+
         Returns
         -------
         <class 'twitter_client.TwitterClient'>
@@ -91,11 +567,93 @@ class TwitterClient:
             >>>> access_token_secret = "Example_xyz4"
             >>>> twitter_client = TwitterClient(consumer_key, consumer_secret,access_token, access_token_secret, ["realDonaldTrump"])
         """
-        self.auth = TwitterAuthenticator().authenticate_twitter_app(CONSUMER_KEY, CONSUMER_SECRET, ACCESS_TOKEN, ACCESS_TOKEN_SECRET)
-        self.twitter_client = tweepy.API(self.auth)
+        if api is None:
+            self.auth = TwitterAuthenticator().authenticate_twitter_app(CONSUMER_KEY, CONSUMER_SECRET, ACCESS_TOKEN, ACCESS_TOKEN_SECRET)
+            self.twitter_client = tweepy.API(self.auth)
+        else:
+            self.auth = None
+            self.twitter_client = api
         self.twitter_user = twitter_user
+        self.scheduler = scheduler if scheduler is not None else RateLimitScheduler()
+        self.cache = cache
+
+    def get_rate_limit_status(self):
+        """
+        Description
+        -----------
+        This function returns the current rate limit state of the endpoints used so far, so jobs can plan around it.
+
+        Returns
+        -------
+        <class 'dict'>
+
+            --> endpoint name: {"limit", "remaining", "reset" (datetime, UTC), "wait" (seconds until the next request may be sent), "queued" (waiting requests)}
+
+        Example(s)
+        ----------
+            >>>> twitter_client = TwitterClient(consumer_key, consumer_secret,access_token, access_token_secret, ["realDonaldTrump"])
+            >>>> tweets = twitter_client.get_user_timeline_tweets(start_date = 2019-06-10", end_date = "2019-06-21")
+            >>>> twitter_client.get_rate_limit_status()["user_timeline"]["remaining"]
+        """
+        return self.scheduler.status()
 
-    def get_user_timeline_tweets(self, start_date, end_date, retweets = False, **kargs):
+    def _call(self, endpoint, *args, **kargs):
+        """
+        Description
+        -----------
+        Sends a request to an endpoint of the API (a method name of tweepy.API) or answers it from the cache.
+        With a cache the response is requested as json (that is what gets stored) and turned into tweepy models afterwards,
+        unless the caller asked for json itself (parser = JSONParser).
+        """
+        if self.cache is None:
+            return self._request(endpoint, *args, **kargs)
+        parser = kargs.pop("parser", None)
+        payload = self.cache.get(endpoint, args, kargs)
+        if payload is None:
+            if self.cache.offline:
+                raise LookupError("Offline mode: the request %s%r is not cached!" % (endpoint, (args, kargs)))
+            payload = self._request(endpoint, *args, parser = tweepy.parsers.JSONParser(), **kargs)
+            self.cache.set(endpoint, args, kargs, payload)
+        if parser is not None:
+            return payload
+        model = tweepy.models.Status if endpoint == "user_timeline" else tweepy.models.User
+        # tweepy models look up their factory at api.parser, stand-ins for tweepy.API may not have one
+        api = self.twitter_client if hasattr(self.twitter_client, "parser") else None
+        if isinstance(payload, list):
+            return model.parse_list(api, payload)
+        return model.parse(api, payload)
+
+    def _request(self, endpoint, *args, **kargs):
+        """
+        Description
+        -----------
+        Sends a request to an endpoint of the API, paced by the scheduler.
+        The quota is updated from the response headers; requests answered with HTTP 429 are retried once the window reset.
+        """
+        retries = 0
+        while True:
+            self.scheduler.acquire(endpoint)
+            try:
+                result = getattr(self.twitter_client, endpoint)(*args, **kargs)
+            except tweepy.TweepError as e:
+                response = getattr(e, "response", None)
+                if response is None or response.status_code not in (420, 429) or retries >= self.scheduler.max_retries:
+                    raise
+                self.scheduler.penalize(endpoint, response.headers)
+                retries += 1
+                continue
+            self.scheduler.update(endpoint, self._last_headers(endpoint))
+            return result
+
+    def _last_headers(self, endpoint):
+        # tweepy keeps only the last response of the API object, which may belong to another thread's request:
+        # it is only used if it was a response of the same endpoint (whose quota is shared anyway)
+        response = getattr(self.twitter_client, "last_response", None)
+        if response is None or RateLimitScheduler.PATHS.get(endpoint, "?") not in getattr(response, "url", ""):
+            return None
+        return response.headers
+
+    def get_user_timeline_tweets(self, start_date, end_date, retweets = False, workers = 1, checkpoint = None, lean = False, server_filter = True, **kargs):
         """
         Description
         -----------
@@ -111,7 +669,41 @@ class TwitterClient:
                                     description = A date representation in the following format: "YEAR-MONTH-DAY", representing the end date
                                                   to when one wants to obtain the tweets
 
-        **kargs:                    Other parameters the tweepy cursor accepts
+        retweets:                   type = boolean
+                                    description = If True: Retweets are obtained as well.
+                                                  If False: Only the accounts own tweets are obtained.
+                                    default = False
+
+        workers:                    type = int
+                                    description = Number of account timelines which are fetched in parallel (thread pool).
+                                                  If 1: The accounts are fetched one after another.
+                                                  Either way the returned list is ordered by account, in the order of twitter_user.
+                                    default = 1
+
+        checkpoint:                 type = CheckpointStore or None
+                                    description = If given: Only tweets newer than the checkpoint of each account are requested (since_id),
+                                                  afterwards the checkpoints are moved forward to the newest tweet fetched (call checkpoint.save() to persist them).
+                                                  If None: The timelines are fetched back to start_date.
+                                    default = None
+
+        lean:                       type = boolean
+                                    description = If True: Lean fetch mode, transferring and keeping as little as possible:
+                                                  the user object is left out of every tweet (trim_user)
+                                                  and the tweets are returned as LeanStatus, holding only the fields TweetAnalyzer uses.
+                                                  The author of a tweet is then the account name as given in twitter_user.
+                                                  If False: Full tweepy.models.Status objects are returned.
+                                    default = False
+
+        server_filter:              type = boolean
+                                    description = Only used in lean mode without retweets.
+                                                  If True: The retweets are filtered out by twitter (include_rts = False), their payload is not transferred.
+                                                           This may cost extra requests: twitter counts the excluded retweets into count,
+                                                           so the pages no longer line up with the timeline.
+                                                  If False: The retweets are transferred and filtered out by the client,
+                                                            lean mode then never sends more requests than the normal one.
+                                    default = True
+
+        **kargs:                    Other parameters the user_timeline method accepts
                                     description = See documentation at: http://docs.tweepy.org/en/v3.5.0/
 
         Returns
@@ -124,48 +716,223 @@ class TwitterClient:
         ----------
         The following example obtains Donald Trumps tweets from his timeline:
 
+        1.
             >>>> twitter_client = TwitterClient(consumer_key, consumer_secret,access_token, access_token_secret, ["realDonaldTrump"])
             >>>> tweets = twitter_client.get_user_timeline_tweets(start_date = 2019-06-10", end_date = "2019-06-21")
-        """
-        tweets = []
 
+        The following example obtains the tweets of nine party accounts, fetching all timelines at once:
+
+        2.
+            >>>> Parties = ["spdde", "fdp","die_Gruenen","afd","dieLinke","fwlandtag","diepartei","cdu","csu"]
+            >>>> twitter_client = TwitterClient(consumer_key, consumer_secret,access_token, access_token_secret, Parties)
+            >>>> tweets = twitter_client.get_user_timeline_tweets(start_date = "2019-05-01", end_date = "2019-05-26", workers = 9)
+
+        The following example refreshes an existing dataset hourly, only fetching the tweets which are not stored yet:
+
+        3.
+            >>>> tweet_analyzer = TweetAnalyzer()
+            >>>> tweet_analyzer.read_from_csv("tweets.csv")
+            >>>> checkpoints = CheckpointStore("checkpoints.json")
+            >>>> checkpoints.update_from_dataframe(tweet_analyzer.get_dataframe())
+            >>>> tweets = twitter_client.get_user_timeline_tweets(start_date = "2019-05-01", end_date = "2019-07-01", checkpoint = checkpoints)
+            >>>> tweet_analyzer.merge_dataframe([TweetAnalyzer(tweets).get_dataframe()], inplace = True)
+            >>>> tweet_analyzer.write_to_csv("tweets.csv")
+            >>>> checkpoints.save()
+        """
         start = datetime.strptime(start_date, '%Y-%m-%d')
         end = datetime.strptime(end_date, '%Y-%m-%d')
 
-        if retweets:
-            for i in self.twitter_user:
-                for tweet in tweepy.Cursor(self.twitter_client.user_timeline, tweet_mode = "extended", id = i, **kargs).items():
-                    if tweet.created_at < start:
-                        break
-                    if tweet.created_at < end:
-                        tweets.append(tweet)
+        def fetch(account):
+            return list(self._iter_account_timeline_tweets(account, start, end, retweets, checkpoint, lean, server_filter, **kargs))
+
+        if workers > 1 and len(self.twitter_user) > 1:
+            with ThreadPoolExecutor(max_workers = workers) as executor:
+                # map() hands the results back in the order of twitter_user, no matter which account finished first
+                timelines = list(executor.map(fetch, self.twitter_user))
         else:
-            for i in self.twitter_user:
-                for tweet in tweepy.Cursor(self.twitter_client.user_timeline, tweet_mode = "extended", id = i, **kargs).items():
-                    if tweet.created_at < start:
-                        break
-                    if ("RT @" not in tweet.full_text) & (tweet.created_at < end):
-                        tweets.append(tweet)
+            timelines = [fetch(i) for i in self.twitter_user]
 
+        tweets = []
+        for timeline in timelines:
+            tweets.extend(timeline)
         return tweets
 
+    def iter_user_timeline_tweets(self, start_date, end_date, retweets = False, checkpoint = None, lean = False, server_filter = True, **kargs):
+        """
+        Description
+        -----------
+        This function yields the tweet data one tweet at a time, while paging through the account timelines.
+        Unlike get_user_timeline_tweets no list of all tweets is built, so memory stays flat no matter how many tweets are fetched.
+        The accounts are fetched one after another, in the order of twitter_user.
+
+        Parameters
+        ----------
+        start_date, end_date, retweets, checkpoint, lean, server_filter, **kargs:
+                                    See get_user_timeline_tweets.
+                                    The checkpoint of an account is moved forward once all of its tweets were yielded.
+
+        Returns
+        -------
+        <class 'generator'>
+
+            --> Yields the raw tweets obtained via the twitter API
+
+        Example(s)
+        ----------
+        The following example builds a dataframe straight from the fetched tweets, without keeping the raw tweets:
+
+        1.
+            >>>> twitter_client = TwitterClient(consumer_key, consumer_secret,access_token, access_token_secret, ["realDonaldTrump"])
+            >>>> tweets = twitter_client.iter_user_timeline_tweets(start_date = "2019-01-01", end_date = "2019-06-21")
+            >>>> tweet_analyzer = TweetAnalyzer(tweets, keep_tweets = False)
+        """
+        start = datetime.strptime(start_date, '%Y-%m-%d')
+        end = datetime.strptime(end_date, '%Y-%m-%d')
+        for i in self.twitter_user:
+            for tweet in self._iter_account_timeline_tweets(i, start, end, retweets, checkpoint, lean, server_filter, **kargs):
+                yield tweet
+
+    def iter_user_timeline_batches(self, start_date, end_date, batch_size = 200, retweets = False, checkpoint = None, lean = False, server_filter = True,
+                                   **kargs):
+        """
+        Description
+        -----------
+        This function yields the tweet data in lists of batch_size tweets (the last one may be shorter), see iter_user_timeline_tweets.
+
+        Parameters
+        ----------
+        batch_size:                 type = int
+                                    description = Number of tweets per batch
+                                    default = 200
+
+        start_date, end_date, retweets, checkpoint, lean, server_filter, **kargs:
+                                    See get_user_timeline_tweets.
+
+        Returns
+        -------
+        <class 'generator'>
+
+            --> Yields lists of raw tweets obtained via the twitter API
+
+        Example(s)
+        ----------
+        The following example appends the tweets of several months to a csv file, one batch at a time:
 
-    def get_user_data(self, **kargs):
+        1.
+            >>>> twitter_client = TwitterClient(consumer_key, consumer_secret,access_token, access_token_secret, ["realDonaldTrump"])
+            >>>> for n, batch in enumerate(twitter_client.iter_user_timeline_batches(start_date = "2019-01-01", end_date = "2019-06-21", batch_size = 1000)):
+            >>>>     TweetAnalyzer(batch, keep_tweets = False).write_to_csv("tweets.csv", mode = "a", header = (n == 0), index = False)
+        """
+        batch = []
+        for tweet in self.iter_user_timeline_tweets(start_date, end_date, retweets = retweets, checkpoint = checkpoint, lean = lean,
+                                                    server_filter = server_filter, **kargs):
+            batch.append(tweet)
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _iter_account_timeline_tweets(self, account, start, end, retweets, checkpoint, lean, server_filter = True, **kargs):
+        """
+        Description
+        -----------
+        Pages backwards through the timeline of a single account (newest tweet first) and yields the tweets created in [start, end).
+        Paging stops as soon as a tweet older than start shows up.
+        Afterwards the checkpoint (if any) is moved to the newest tweet in [start, end), retweets skipped by the client included.
+
+        The date range is also passed to the API as tweet id bounds (snowflake ids encode their creation time):
+        since_id skips everything older than start and max_id everything newer than end, so only the pages overlapping the range are fetched.
+
+        This function will not be used by the user himself. It is called by the get/iter_user_timeline functions, possibly from a worker thread.
+        """
+        since_ids = [kargs.get("since_id") or 0]
+        if checkpoint is not None and checkpoint.get(account) is not None:
+            since_ids.append(checkpoint.get(account))
+        if start >= TWITTER_EPOCH:
+            since_ids.append(datetime_to_snowflake(start) - 1)
+        kargs["since_id"] = max(since_ids) or None
+        if end >= TWITTER_EPOCH:
+            max_id = datetime_to_snowflake(end) - 1
+            kargs["max_id"] = max_id if kargs.get("max_id") is None else min(kargs["max_id"], max_id)
+        if lean:
+            kargs.setdefault("trim_user", True)
+            if server_filter and not retweets:
+                kargs.setdefault("include_rts", False)
+        newest_id = None
+        for tweet in self._iter_timeline(account, lean, **kargs):
+            if tweet.created_at < start:
+                break
+            if tweet.created_at < end:
+                if newest_id is None:
+                    newest_id = tweet.id
+                if retweets or "RT @" not in tweet.full_text:
+                    yield tweet
+        if checkpoint is not None and newest_id is not None:
+            checkpoint.update(account, newest_id)
+
+    def _iter_timeline(self, account, lean = False, **kargs):
+        """
+        Description
+        -----------
+        Yields the tweets of an account timeline page by page, using the max_id of the previous page to request the next one
+        (the same id based pagination tweepy.Cursor does, but without its parser hacks, so any user_timeline callable works).
+        If lean: The pages are requested as plain json and turned into LeanStatus objects instead of tweepy models.
+        """
+        kargs.setdefault("count", 200)
+        max_id = kargs.pop("max_id", None)
+        if kargs.get("since_id") is None:
+            kargs.pop("since_id", None)
+        if lean:
+            kargs["parser"] = tweepy.parsers.JSONParser()
+        # whether the previous page was a full one, i.e. the timeline may go on beyond it
+        full = False
+        while True:
+            if max_id is not None:
+                if kargs.get("since_id") is not None and max_id <= kargs["since_id"]:
+                    return
+                kargs["max_id"] = max_id
+            page = self._call("user_timeline", id = account, tweet_mode = "extended", **kargs)
+            if not page and full and kargs.get("include_rts") is False:
+                # twitter counts the excluded retweets into count, so after a full page the next one may come back empty before the end of the timeline:
+                # the same page with retweets tells where the next one starts (it only holds retweets, as the page without them was empty)
+                page = self._call("user_timeline", id = account, tweet_mode = "extended", **dict(kargs, include_rts = True, trim_user = True))
+                if len(page) < kargs["count"]:
+                    return
+                max_id = min(tweet["id"] if lean else tweet.id for tweet in page) - 1
+                continue
+            if not page:
+                return
+            full = len(page) >= kargs["count"]
+            if lean:
+                page = [LeanStatus(tweet, account) for tweet in page]
+            for tweet in page:
+                yield tweet
+            max_id = min(tweet.id for tweet in page) - 1
+
+    def get_user_data(self, workers = 1, **kargs):
         """
         Description
         -----------
         This function returns the user data, using the tweepy package accesing the twitter API.
+        The accounts are requested in bulk, up to LOOKUP_CHUNK_SIZE (100) per request.
 
         Parameters
         ----------
-        **kargs:                    Other parameters the tweepy cursor accepts
+        workers:                    type = int
+                                    description = Number of lookup requests (chunks of 100 accounts) which are sent in parallel.
+                                                  All of them are paced by the rate limit scheduler.
+                                    default = 1
+
+        **kargs:                    Other parameters the tweepy lookup_users method accepts
                                     description = See documentation at: http://docs.tweepy.org/en/v3.5.0/
 
         Returns
         -------
         <class 'list'>
 
-            --> A list by using the tweepy package obtaining the raw user data via the twitter API
+            --> A list by using the tweepy package obtaining the raw user data via the twitter API,
+                in the order of twitter_user. Accounts which do not exist (anymore) or are suspended are left out.
 
         Example(s)
         ----------
@@ -174,7 +941,28 @@ class TwitterClient:
             >>>> twitter_client = TwitterClient(consumer_key, consumer_secret,access_token, access_token_secret, ["realDonaldTrump"])
             >>>> tweets = twitter_client.get_user_data()
         """
-        L = []
-        for i in self.twitter_user:
-            L.append(self.twitter_client.get_user(i, **kargs))
-        return L
+        accounts = list(self.twitter_user)
+        chunks = [accounts[i:i + self.LOOKUP_CHUNK_SIZE] for i in range(0, len(accounts), self.LOOKUP_CHUNK_SIZE)]
+
+        def lookup(chunk):
+            try:
+                return self._call("lookup_users", screen_names = chunk, **kargs)
+            except tweepy.TweepError as e:
+                # twitter answers HTTP 404 if none of the accounts of a chunk exists, the other chunks are still looked up
+                response = getattr(e, "response", None)
+                if response is not None and response.status_code == 404:
+                    return []
+                raise
+
+        if workers > 1 and len(chunks) > 1:
+            with ThreadPoolExecutor(max_workers = workers) as executor:
+                results = list(executor.map(lookup, chunks))
+        else:
+            results = [lookup(chunk) for chunk in chunks]
+
+        # the lookup endpoint answers in no particular order
+        users = {}
+        for result in results:
+            for user in result:
+                users[user.screen_name.lower()] = user
+        return [users[i.lower()] for i in accounts if i.lower() in users]